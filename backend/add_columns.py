@@ -13,3 +13,87 @@ with engine.connect() as conn:
         print("Added chain_hash column to receipts table")
     except Exception as e:
         print(f"Error adding chain_hash: {e}")
+
+    try:
+        conn.execute(text("ALTER TABLE receipts ADD COLUMN sequence INTEGER"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_receipts_kiosk_sequence ON receipts (kiosk_id, sequence)"))
+        print("Added sequence column to receipts table")
+    except Exception as e:
+        print(f"Error adding sequence: {e}")
+
+    try:
+        conn.execute(text("ALTER TABLE receipts ADD COLUMN batch_id INTEGER REFERENCES receipt_batches(id)"))
+        conn.execute(text("ALTER TABLE receipts ADD COLUMN leaf_index INTEGER"))
+        conn.execute(text("ALTER TABLE receipts ADD COLUMN merkle_proof JSON"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_receipts_batch_id ON receipts (batch_id)"))
+        print("Added Merkle batch columns to receipts table")
+    except Exception as e:
+        print(f"Error adding Merkle batch columns: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_submissions_lat_lng ON submissions (latitude, longitude)"))
+        print("Added latitude/longitude index to submissions table")
+    except Exception as e:
+        print(f"Error adding ix_submissions_lat_lng: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_submissions_created_at_id ON submissions (created_at, id)"))
+        print("Added created_at/id index to submissions table")
+    except Exception as e:
+        print(f"Error adding ix_submissions_created_at_id: {e}")
+
+    try:
+        conn.execute(text("ALTER TABLE submissions ADD COLUMN escalated BOOLEAN DEFAULT FALSE"))
+        print("Added escalated column to submissions table")
+    except Exception as e:
+        print(f"Error adding escalated: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_submissions_cluster_id ON submissions (cluster_id)"))
+        print("Added cluster_id index to submissions table")
+    except Exception as e:
+        print(f"Error adding ix_submissions_cluster_id: {e}")
+
+    try:
+        conn.execute(text("ALTER TABLE clusters ADD COLUMN cost_hourly_rate FLOAT"))
+        conn.execute(text("ALTER TABLE clusters ADD COLUMN cost_checkpoint_at TIMESTAMP"))
+        print("Added cost accumulator columns to clusters table")
+    except Exception as e:
+        print(f"Error adding cost accumulator columns: {e}")
+
+    try:
+        conn.execute(text("ALTER TABLE citizen_scores ADD COLUMN recent_submissions JSON"))
+        print("Added recent_submissions column to citizen_scores table")
+    except Exception as e:
+        print(f"Error adding recent_submissions: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_thread_created_at ON messages (thread_id, created_at, id)"))
+        print("Added thread history index to messages table")
+    except Exception as e:
+        print(f"Error adding ix_messages_thread_created_at: {e}")
+
+    if engine.dialect.name == "postgresql":  # SQLite does not enforce foreign keys by default
+        try:
+            conn.execute(text("ALTER TABLE citizen_scores DROP CONSTRAINT IF EXISTS citizen_scores_user_id_fkey"))
+            conn.execute(text(
+                "ALTER TABLE citizen_scores ADD CONSTRAINT citizen_scores_user_id_fkey "
+                "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+            ))
+            print("Made citizen_scores.user_id cascade on user delete")
+        except Exception as e:
+            print(f"Error updating citizen_scores_user_id_fkey: {e}")
+
+    conn.commit()
+
+# Number pre-existing receipts so verification never has to count the chain
+from app.database import SessionLocal
+from app.receipt import backfill_chain_sequences
+from app.clustering import link_cluster_submissions
+
+db = SessionLocal()
+try:
+    print(f"Backfilled sequence numbers for {backfill_chain_sequences(db)} receipts")
+    print(f"Linked {link_cluster_submissions(db)} submissions to their clusters")
+finally:
+    db.close()
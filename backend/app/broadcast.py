@@ -0,0 +1,365 @@
+"""
+Pub/sub fan-out for WebSocket clients across uvicorn workers.
+
+    subscriber = broadcaster.subscribe("thread:abc", websocket)
+    await broadcaster.publish("thread:abc", {...})
+    broadcaster.unsubscribe(subscriber)
+
+publish() hands the event to a backend, which delivers it to every worker
+(including this one); each worker then queues it for its local subscribers:
+
+- memory: in-process only (single worker, tests)
+- redis: Redis PUBLISH / PSUBSCRIBE, when REDIS_URL is set
+- postgres: LISTEN/NOTIFY on the application database - no Redis needed
+
+settings.BROADCAST_BACKEND picks one; by default Postgres LISTEN/NOTIFY is used
+when the database is Postgres, then Redis when configured, else memory.
+
+Every subscriber has a bounded queue drained by its own sender task, so sends
+run concurrently and one slow client cannot stall the rest. A subscriber whose
+queue is full is dropped (closed with 1013, try again later); clients reconnect
+and resync. Publish-to-send latency is recorded for /admin/broadcast.
+
+publish() never raises: events are published after the write they announce has
+committed, so a backend outage is logged and counted, and the event still
+reaches this worker's subscribers. Events too large for the backend (Postgres
+NOTIFY) are sent as the caller's `reference` - e.g. just a message id for
+clients to fetch.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+# Events buffered per WebSocket before it counts as a slow consumer
+SUBSCRIBER_QUEUE_SIZE = settings.BROADCAST_QUEUE_SIZE
+# Latency samples kept for percentiles
+LATENCY_SAMPLES = 1000
+# Postgres NOTIFY payloads must stay under 8000 bytes
+PG_NOTIFY_CHANNEL = "broadcast"
+PG_NOTIFY_MAX_BYTES = 7900
+REDIS_CHANNEL_PREFIX = "broadcast:"
+
+
+class Subscriber:
+    """One WebSocket with its bounded queue and sender task."""
+
+    def __init__(self, channel: str, websocket: WebSocket, on_sent: Callable[[float], None]):
+        self.channel = channel
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._on_sent = on_sent
+        self._task = asyncio.create_task(self._send_loop())
+
+    async def _send_loop(self):
+        while True:
+            envelope = await self.queue.get()
+            try:
+                await self.websocket.send_json(envelope["data"])
+            except Exception:
+                return  # Socket is gone; the endpoint unsubscribes on disconnect
+            self._on_sent(time.time() - envelope["sent_at"])
+
+    def close(self, code: Optional[int] = None) -> None:
+        self._task.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class MemoryBackend:
+    """Delivers straight to this worker's subscribers."""
+
+    name = "memory"
+
+    def fits(self, channel: str, envelope: dict) -> bool:
+        return True
+
+    async def start(self, deliver: Callable[[str, dict], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, channel: str, envelope: dict) -> None:
+        self._deliver(channel, envelope)
+
+
+class RedisBackend:
+    """Redis pub/sub: one pattern subscription per worker."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # Optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+
+    def fits(self, channel: str, envelope: dict) -> bool:
+        return True
+
+    async def start(self, deliver: Callable[[str, dict], None]) -> None:
+        pubsub = self._client.pubsub()
+        await pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+        self._task = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                    deliver(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Broadcast Redis Error: {e}")
+                await asyncio.sleep(1)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        await self._client.aclose()
+
+    async def publish(self, channel: str, envelope: dict) -> None:
+        await self._client.publish(f"{REDIS_CHANNEL_PREFIX}{channel}", json.dumps(envelope))
+
+
+class PostgresBackend:
+    """
+    LISTEN/NOTIFY on the application database. A dedicated psycopg2 connection
+    listens and is polled from the event loop when its socket is readable;
+    NOTIFY goes through the regular engine pool. If the listening connection
+    fails it is replaced and LISTEN re-issued.
+    """
+
+    name = "postgres"
+
+    def __init__(self, engine):
+        import psycopg2  # Optional dependency, only needed for this backend
+
+        self._engine = engine
+        self._psycopg2 = psycopg2
+        self._conn = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Callable[[str, dict], None]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[str, dict], None]) -> None:
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._listen()
+
+    def _listen(self) -> None:
+        dsn = self._engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = self._psycopg2.connect(dsn)
+        try:
+            conn.set_isolation_level(self._psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {PG_NOTIFY_CHANNEL}")
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        self._loop.add_reader(conn.fileno(), self._on_readable)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._loop.remove_reader(self._conn.fileno())
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    async def _reconnect(self):
+        while True:
+            await asyncio.sleep(1)
+            try:
+                self._listen()
+                print("🔁 Broadcast Postgres listener reconnected")
+                return
+            except Exception as e:
+                print(f"❌ Broadcast Postgres Error: {e}")
+
+    def _on_readable(self):
+        try:
+            self._conn.poll()
+        except Exception as e:
+            print(f"❌ Broadcast Postgres Error: {e}")
+            self._close()
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            message = json.loads(notify.payload)
+            self._deliver(message["channel"], message["envelope"])
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._close()
+
+    @staticmethod
+    def _payload(channel: str, envelope: dict) -> str:
+        return json.dumps({"channel": channel, "envelope": envelope})
+
+    def fits(self, channel: str, envelope: dict) -> bool:
+        return len(self._payload(channel, envelope).encode()) <= PG_NOTIFY_MAX_BYTES
+
+    async def publish(self, channel: str, envelope: dict) -> None:
+        from sqlalchemy import text
+
+        payload = self._payload(channel, envelope)
+        if len(payload.encode()) > PG_NOTIFY_MAX_BYTES:
+            raise ValueError(f"Broadcast payload of {len(payload)} bytes exceeds the NOTIFY limit")
+
+        def notify():
+            with self._engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": PG_NOTIFY_CHANNEL, "payload": payload})
+
+        await asyncio.get_running_loop().run_in_executor(None, notify)
+
+
+def create_backend():
+    """The configured backend, falling back to memory if its driver is missing."""
+    from app.database import engine
+
+    choice = settings.BROADCAST_BACKEND
+    if choice == "auto":
+        if engine.dialect.name == "postgresql":
+            choice = "postgres"
+        elif settings.REDIS_URL:
+            choice = "redis"
+        else:
+            choice = "memory"
+    try:
+        if choice == "postgres":
+            return PostgresBackend(engine)
+        if choice == "redis":
+            return RedisBackend(settings.REDIS_URL)
+    except ImportError:
+        print(f"⚠️ Broadcast backend '{choice}' needs a driver that is not installed - using in-process fan-out")
+    return MemoryBackend()
+
+
+class Broadcaster:
+    """Channel subscriptions for this worker plus delivery metrics."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend()
+        self.channels: Dict[str, Set[Subscriber]] = {}
+        self._started = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.publish_errors = 0
+        self.oversized = 0
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    async def start(self) -> None:
+        try:
+            await self.backend.start(self._deliver)
+            self._started = True
+        except Exception as e:
+            print(f"❌ Broadcast backend '{self.backend.name}' failed to start, using in-process fan-out: {e}")
+
+    async def stop(self) -> None:
+        if self._started:
+            self._started = False
+            await self.backend.stop()
+
+    def subscribe(self, channel: str, websocket: WebSocket) -> Subscriber:
+        subscriber = Subscriber(channel, websocket, self._record_latency)
+        self.channels.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber, close_code: Optional[int] = None) -> None:
+        subscribers = self.channels.get(subscriber.channel)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.channels[subscriber.channel]
+        subscriber.close(close_code)
+
+    async def publish(self, channel: str, data: Any, reference: Any = None) -> None:
+        """
+        Send `data` to every subscriber of `channel` on every worker, or
+        `reference` if `data` is too large for the backend. Never raises.
+        """
+        envelope = {"data": jsonable_encoder(data), "sent_at": time.time()}
+        self.published += 1
+        if not self._started:
+            # Not started (scripts, tests): this worker's subscribers only
+            self._deliver(channel, envelope)
+            return
+
+        if not self.backend.fits(channel, envelope):
+            self.oversized += 1
+            if reference is None:
+                print(f"⚠️ Broadcast event on '{channel}' is too large for {self.backend.name}; delivered to this worker only")
+                self._deliver(channel, envelope)
+                return
+            envelope = {"data": jsonable_encoder(reference), "sent_at": envelope["sent_at"]}
+        try:
+            await self.backend.publish(channel, envelope)
+        except Exception as e:
+            # The announced write is already committed: degrade to this worker's subscribers
+            self.publish_errors += 1
+            print(f"❌ Broadcast Publish Error: {e}")
+            self._deliver(channel, envelope)
+
+    def _deliver(self, channel: str, envelope: dict) -> None:
+        """Queue an event for this worker's subscribers; never awaits a socket."""
+        for subscriber in list(self.channels.get(channel, ())):
+            try:
+                subscriber.queue.put_nowait(envelope)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it rather than buffer without bound
+                self.dropped += 1
+                self.unsubscribe(subscriber, close_code=1013)
+
+    def _record_latency(self, seconds: float) -> None:
+        self.delivered += 1
+        self._latencies.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Delivery counters and publish-to-send latency, for /admin/broadcast."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 2)
+
+        return {
+            "backend": self.backend.name if self._started else MemoryBackend.name,
+            "channels": len(self.channels),
+            "subscribers": sum(len(s) for s in self.channels.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_slow_consumers": self.dropped,
+            "publish_errors": self.publish_errors,
+            "oversized_events": self.oversized,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                           "max": percentile(1.0)},
+        }
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,282 @@
+"""
+TTL response cache for read-heavy endpoints.
+
+    @router.get("/metrics/public")
+    @cached("transparency", ttl=60)
+    async def get_public_metrics(...): ...
+
+Responses are keyed by namespace, endpoint and scalar query parameters. Each
+namespace has a generation number that is part of every key: bumping it (an
+explicit invalidate(), or committing a write to one of the `invalidate_on`
+models) means old entries are never read again and simply age out. Concurrent
+misses for the same key share a single recomputation (per process, and across
+workers when Redis is used).
+
+Aggregate endpoints over submissions rely on their TTL alone: new submissions
+arrive more often than the TTL, so invalidating on every write would make
+those caches miss almost every time. Keep `invalidate_on` for models that are
+written rarely. Generations live in the backend, so with the in-process LRU a
+bump only reaches the worker that made it; other workers catch up at the TTL.
+
+The backend is an in-process LRU unless settings.REDIS_URL is set, in which case
+entries are shared between workers through Redis. Cache failures never fail a
+request - the endpoint is just computed uncached.
+"""
+import asyncio
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+# How long a worker holding the Redis recompute lock may take before others give up waiting
+LOCK_SECONDS = 10
+LOCK_POLL_SECONDS = 0.05
+
+_MISS = object()
+
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry expiry, local to this process."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def acquire(self, key: str) -> bool:
+        return True  # In-process single-flight already covers a single worker
+
+    def release(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Shared cache in Redis; values are stored as JSON with a server-side TTL."""
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed when REDIS_URL is set
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self._client.get(key)
+        except self._errors:
+            return _MISS
+        return _MISS if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            self._client.set(key, json.dumps(value), ex=ttl)
+        except self._errors:
+            pass
+
+    def generation(self, namespace: str) -> int:
+        try:
+            return int(self._client.get(f"cache-gen:{namespace}") or 0)
+        except self._errors:
+            return 0
+
+    def bump_generation(self, namespace: str) -> None:
+        try:
+            self._client.incr(f"cache-gen:{namespace}")
+        except self._errors:
+            pass
+
+    def acquire(self, key: str) -> bool:
+        try:
+            return bool(self._client.set(f"{key}:lock", "1", nx=True, ex=LOCK_SECONDS))
+        except self._errors:
+            return True
+
+    def release(self, key: str) -> None:
+        try:
+            self._client.delete(f"{key}:lock")
+        except self._errors:
+            pass
+
+    def clear(self) -> None:
+        try:
+            for key in self._client.scan_iter("cache:*"):
+                self._client.delete(key)
+        except self._errors:
+            pass
+
+
+def create_backend():
+    """Redis when configured and importable, otherwise the in-process LRU."""
+    if settings.REDIS_URL:
+        try:
+            return RedisCache(settings.REDIS_URL)
+        except ImportError:
+            print("⚠️ REDIS_URL is set but the redis package is not installed - using in-process cache")
+    return MemoryCache(settings.CACHE_MAX_ENTRIES)
+
+
+class ResponseCache:
+    """Read-through cache with per-key single-flight recomputation."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Model class -> namespaces to invalidate when it is written
+        self._dependents: Dict[type, Set[str]] = {}
+
+    def make_key(self, namespace: str, endpoint: str, params: Dict[str, Any]) -> str:
+        query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"cache:{namespace}:{self.backend.generation(namespace)}:{endpoint}?{query}"
+
+    async def get_or_compute(self, key: str, ttl: int, compute: Callable) -> Any:
+        value = self.backend.get(key)
+        if value is not _MISS:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute_once(key, ttl, compute)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _compute_once(self, key: str, ttl: int, compute: Callable) -> Any:
+        """Let one worker recompute while the others wait briefly for its result."""
+        locked = self.backend.acquire(key)
+        if not locked:
+            deadline = time.monotonic() + LOCK_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                value = self.backend.get(key)
+                if value is not _MISS:
+                    return value
+        try:
+            value = jsonable_encoder(await compute())
+            self.backend.set(key, value, ttl)
+            return value
+        finally:
+            if locked:
+                self.backend.release(key)
+
+    def register(self, namespace: str, models: Iterable[type]) -> None:
+        for model in models:
+            self._dependents.setdefault(model, set()).add(namespace)
+
+    def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self.backend.bump_generation(namespace)
+
+    def invalidate_models(self, models: Iterable[type]) -> None:
+        namespaces = set()
+        for model in models:
+            namespaces |= self._dependents.get(model, set())
+        self.invalidate(*namespaces)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+response_cache = ResponseCache(create_backend())
+
+
+def cached(namespace: str, ttl: int, invalidate_on: Iterable[type] = ()):
+    """
+    Cache an async endpoint's response for `ttl` seconds.
+    Keys use the endpoint's scalar arguments (query/path params); dependencies
+    such as the DB session are ignored.
+    """
+    response_cache.register(namespace, invalidate_on)
+
+    def decorator(fn):
+        endpoint = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            params = {k: v for k, v in kwargs.items() if v is None or isinstance(v, (str, int, float, bool))}
+            key = response_cache.make_key(namespace, endpoint, params)
+            return await response_cache.get_or_compute(key, ttl, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, "after_flush")
+def _record_written_models(session: Session, flush_context):
+    written = session.info.setdefault("cache_written_models", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        written.add(type(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_models(session: Session):
+    written: Optional[Set[type]] = session.info.pop("cache_written_models", None)
+    if written:
+        response_cache.invalidate_models(written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_models(session: Session):
+    session.info.pop("cache_written_models", None)
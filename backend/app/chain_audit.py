@@ -0,0 +1,218 @@
+"""
+Full-chain audit for kiosk receipt hash chains.
+
+Streams each kiosk's chain in sequence order through a server-side cursor and
+re-computes every link with compute_receipt_hash, so memory stays bounded no
+matter how long the chain is. Independent kiosks are audited in parallel across
+a process pool.
+
+Usage:
+    python -m app.chain_audit                  # all kiosks
+    python -m app.chain_audit --kiosk kiosk-001 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, union_all, literal, cast, null, Integer, String
+from sqlalchemy.engine import Connection
+
+from app.database import engine
+from app.merkle import merkle_root
+from app.models import Receipt, ReceiptBatch, Submission, KioskChainHead
+from app.receipt import compute_receipt_hash, build_receipt_payload, batch_anchor_payload
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH_SIZE = 5000
+
+
+def _chain_links(kiosk_id: str):
+    """
+    One ordered stream over a kiosk's chain: linear receipts and sealed Merkle
+    batch anchors share the same sequence space.
+    """
+    receipts = select(
+        literal("receipt").label("kind"),
+        Receipt.receipt_id.label("ref"),
+        Receipt.sequence,
+        Receipt.prev_hash,
+        Receipt.receipt_hash.label("link_hash"),
+        Submission.id.label("id"),
+        Submission.intent,
+        Submission.text,
+        Submission.created_at,
+        cast(null(), String).label("merkle_root"),
+        cast(null(), Integer).label("leaf_count"),
+    ).join(
+        Submission, Submission.id == Receipt.submission_id
+    ).where(
+        Receipt.kiosk_id == kiosk_id,
+        Receipt.batch_id.is_(None),
+        Receipt.sequence.isnot(None),
+    )
+    batches = select(
+        literal("batch").label("kind"),
+        cast(ReceiptBatch.id, String).label("ref"),
+        ReceiptBatch.sequence,
+        ReceiptBatch.prev_hash,
+        ReceiptBatch.anchor_hash.label("link_hash"),
+        ReceiptBatch.id.label("id"),
+        cast(null(), String).label("intent"),
+        cast(null(), String).label("text"),
+        ReceiptBatch.created_at,
+        ReceiptBatch.merkle_root,
+        ReceiptBatch.leaf_count,
+    ).where(
+        ReceiptBatch.kiosk_id == kiosk_id,
+        ReceiptBatch.status == "sealed",
+    )
+    links = union_all(receipts, batches).subquery()
+    return select(links).order_by(links.c.sequence)
+
+
+def _check_batch(conn: Connection, link) -> Optional[str]:
+    """Re-hash every leaf of a sealed batch and rebuild its Merkle root."""
+    leaves = conn.execute(
+        select(
+            Receipt.receipt_hash,
+            Submission.id,
+            Submission.intent,
+            Submission.text,
+            Submission.created_at,
+        ).join(
+            Submission, Submission.id == Receipt.submission_id
+        ).where(Receipt.batch_id == link.id).order_by(Receipt.id)
+    ).all()
+
+    for leaf in leaves:
+        if compute_receipt_hash(build_receipt_payload(leaf), None) != leaf.receipt_hash:
+            return f"leaf for submission {leaf.id} does not match its receipt hash"
+    if len(leaves) != link.leaf_count:
+        return f"batch has {len(leaves)} leaves, anchor committed to {link.leaf_count}"
+    if not leaves or merkle_root([leaf.receipt_hash for leaf in leaves]) != link.merkle_root:
+        return "Merkle root does not match batch leaves"
+    return None
+
+
+def audit_kiosk_chain(kiosk_id: str) -> Dict[str, Any]:
+    """
+    Verify one kiosk's chain link by link and report the first break.
+    Checks contiguous sequences, prev_hash linkage, each recomputed hash,
+    and that the final link matches the kiosk's chain head.
+    """
+    started = time.perf_counter()
+    links_verified = 0
+    receipts_verified = 0
+    first_break = None
+    expected_sequence = 1
+    prev_hash = None
+
+    with engine.connect() as conn:
+        stream = conn.execution_options(
+            stream_results=True, yield_per=STREAM_BATCH_SIZE
+        ).execute(_chain_links(kiosk_id))
+
+        for link in stream:
+            if link.sequence != expected_sequence:
+                reason = f"expected sequence {expected_sequence}, found {link.sequence}"
+            elif link.prev_hash != prev_hash:
+                reason = "prev_hash does not match the previous link"
+            elif link.kind == "batch":
+                anchor = SimpleNamespace(id=link.id, merkle_root=link.merkle_root, leaf_count=link.leaf_count)
+                if compute_receipt_hash(batch_anchor_payload(anchor), link.prev_hash) != link.link_hash:
+                    reason = "batch anchor hash mismatch"
+                else:
+                    reason = _check_batch(conn, link)
+            elif compute_receipt_hash(build_receipt_payload(link), link.prev_hash) != link.link_hash:
+                reason = "receipt hash mismatch"
+            else:
+                reason = None
+
+            if reason:
+                first_break = {"sequence": link.sequence, "kind": link.kind, "ref": link.ref, "reason": reason}
+                break
+
+            links_verified += 1
+            receipts_verified += link.leaf_count if link.kind == "batch" else 1
+            expected_sequence += 1
+            prev_hash = link.link_hash
+        stream.close()
+
+        head = conn.execute(
+            select(KioskChainHead.head_hash, KioskChainHead.sequence).where(KioskChainHead.kiosk_id == kiosk_id)
+        ).first()
+        unsequenced = conn.execute(
+            select(Receipt.id).where(
+                Receipt.kiosk_id == kiosk_id,
+                Receipt.batch_id.is_(None),
+                Receipt.sequence.is_(None),
+            ).limit(1)
+        ).first() is not None
+
+    head_ok = head is None or (head.sequence == links_verified and head.head_hash == prev_hash)
+    if first_break is None and not head_ok:
+        first_break = {"sequence": links_verified, "kind": "head", "ref": kiosk_id,
+                       "reason": "chain head does not match the last verified link"}
+
+    elapsed = time.perf_counter() - started
+    return {
+        "kiosk_id": kiosk_id,
+        "status": "OK" if first_break is None else "BROKEN",
+        "links_verified": links_verified,
+        "receipts_verified": receipts_verified,
+        "chain_length": head.sequence if head else links_verified,
+        "first_break": first_break,
+        "has_unsequenced_receipts": unsequenced,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+def _init_worker():
+    """Drop pooled connections inherited from the parent process."""
+    engine.dispose(close=False)
+
+
+def audit_chains(kiosk_ids: Optional[List[str]] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Audit many kiosk chains, one kiosk per task, across a process pool.
+    With workers=1 everything runs in the current process.
+    """
+    started = time.perf_counter()
+    if kiosk_ids is None:
+        with engine.connect() as conn:
+            kiosk_ids = [k for (k,) in conn.execute(select(Receipt.kiosk_id).distinct().order_by(Receipt.kiosk_id))]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(kiosk_ids) or 1))
+    if workers == 1:
+        reports = [audit_kiosk_chain(k) for k in kiosk_ids]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            reports = list(pool.map(audit_kiosk_chain, kiosk_ids))
+
+    elapsed = time.perf_counter() - started
+    receipts_verified = sum(r["receipts_verified"] for r in reports)
+    return {
+        "status": "OK" if all(r["status"] == "OK" for r in reports) else "BROKEN",
+        "kiosks_checked": len(reports),
+        "broken_kiosks": [r["kiosk_id"] for r in reports if r["status"] != "OK"],
+        "receipts_verified": receipts_verified,
+        "elapsed_seconds": round(elapsed, 3),
+        "receipts_per_second": round(receipts_verified / elapsed, 1) if elapsed > 0 else 0,
+        "workers": workers,
+        "kiosks": reports,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify kiosk receipt hash chains end to end.")
+    parser.add_argument("--kiosk", action="append", dest="kiosks", help="Kiosk ID to audit (repeatable, default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    report = audit_chains(args.kiosks, args.workers)
+    print(json.dumps(report, indent=2, default=str))
+    raise SystemExit(0 if report["status"] == "OK" else 1)
@@ -0,0 +1,430 @@
+"""
+Citizen score projection for gamification.
+
+citizen_scores holds one row per (citizen, ward) plus a city-wide row
+(ward ""), with the counters, streak, recent-submission window, badge bitmask
+and points the gamification endpoints need:
+
+- leaderboards are one indexed scan: WHERE ward = ? ORDER BY points DESC LIMIT n
+- a citizen profile is one row lookup, however many submissions they filed
+
+Rows are kept current by session flush hooks, in the same transaction as the
+submission write: counter changes are atomic upsert increments, then only the
+touched rows get their streak, window, badges and points recomputed. Badges
+are sticky bits, and only badges reading a stat that changed (and not yet
+earned) have their conditions evaluated.
+
+Bulk Query.update()/delete() bypass the hooks; rebuild with backfill_citizen_scores().
+The scheduler's hourly drift check (score_drift) does so automatically.
+
+Usage:
+    python -m app.citizen_scores    # rebuild all scores from history
+"""
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Submission, CitizenScore
+from app.rollups import BACKFILL_BATCH_SIZE, committed_values, current_values, upsert_increment
+
+# Submission fields that feed the counters
+TRACKED_FIELDS = ("user_id", "ward", "status", "uploaded_files", "joined_cluster")
+# Counter column -> badge stat it feeds
+COUNTER_STATS = {
+    "submissions": "total_submissions",
+    "resolved": "resolved_count",
+    "with_photos": "with_photos",
+    "joined": "joined_count",
+}
+COUNTERS = tuple(COUNTER_STATS)
+# Stats refreshed by every new submission
+ACTIVITY_STATS = ("submissions_24h", "streak_days", "is_verified")
+
+# Window behind submissions_24h (Quick Responder badge)
+RECENT_WINDOW = timedelta(hours=24)
+# Cap on timestamps kept in recent_submissions
+RECENT_KEPT = 50
+
+
+# Badge definitions
+BADGES = {
+    "first_report": {
+        "id": "first_report",
+        "name": "First Voice",
+        "description": "Submitted your first complaint",
+        "icon": "🎤",
+        "points": 50,
+        "counter": "total_submissions",  # Stat the condition reads
+        "condition": lambda stats: stats["total_submissions"] >= 1
+    },
+    "neighborhood_hero": {
+        "id": "neighborhood_hero",
+        "name": "Neighborhood Hero",
+        "description": "5 complaints resolved in your ward",
+        "icon": "🦸",
+        "points": 200,
+        "counter": "resolved_count",
+        "condition": lambda stats: stats["resolved_count"] >= 5
+    },
+    "quick_responder": {
+        "id": "quick_responder",
+        "name": "Quick Responder",
+        "description": "Reported 3 issues within 24 hours",
+        "icon": "⚡",
+        "points": 100,
+        "counter": "submissions_24h",
+        "condition": lambda stats: stats["submissions_24h"] >= 3
+    },
+    "photo_pro": {
+        "id": "photo_pro",
+        "name": "Photo Pro",
+        "description": "Attached photos to 5 complaints",
+        "icon": "📸",
+        "points": 75,
+        "counter": "with_photos",
+        "condition": lambda stats: stats["with_photos"] >= 5
+    },
+    "verified_citizen": {
+        "id": "verified_citizen",
+        "name": "Verified Citizen",
+        "description": "Phone number verified",
+        "icon": "✓",
+        "points": 25,
+        "counter": "is_verified",
+        "condition": lambda stats: stats["is_verified"]
+    },
+    "community_voice": {
+        "id": "community_voice",
+        "name": "Community Voice",
+        "description": "10 total submissions",
+        "icon": "📢",
+        "points": 150,
+        "counter": "total_submissions",
+        "condition": lambda stats: stats["total_submissions"] >= 10
+    },
+    "impact_maker": {
+        "id": "impact_maker",
+        "name": "Impact Maker",
+        "description": "Joined 3 existing complaints",
+        "icon": "🤝",
+        "points": 100,
+        "counter": "joined_count",
+        "condition": lambda stats: stats["joined_count"] >= 3
+    },
+    "streak_master": {
+        "id": "streak_master",
+        "name": "Streak Master",
+        "description": "Active for 7 consecutive days",
+        "icon": "🔥",
+        "points": 300,
+        "counter": "streak_days",
+        "condition": lambda stats: stats["streak_days"] >= 7
+    },
+}
+
+
+def calculate_earned_badges(stats: dict) -> List[dict]:
+    """Determine which badges a user has earned."""
+    earned = []
+    for badge_id, badge in BADGES.items():
+        if badge["condition"](stats):
+            earned.append({
+                "id": badge["id"],
+                "name": badge["name"],
+                "description": badge["description"],
+                "icon": badge["icon"],
+                "points": badge["points"],
+                "earned": True
+            })
+    return earned
+
+
+# Bit per badge in the citizen_scores.badges mask (definition order)
+BADGE_BITS = {badge_id: 1 << i for i, badge_id in enumerate(BADGES)}
+
+
+def badge_mask(stats: dict, earned: int = 0, changed: Optional[set] = None) -> int:
+    """
+    `earned` plus the badges whose conditions `stats` meets. With `changed`
+    (stat names), only badges reading one of those stats are evaluated.
+    """
+    mask = earned
+    for badge_id, badge in BADGES.items():
+        bit = BADGE_BITS[badge_id]
+        if mask & bit or (changed is not None and badge["counter"] not in changed):
+            continue
+        if badge["condition"](stats):
+            mask |= bit
+    return mask
+
+
+def badges_from_mask(mask: int) -> List[dict]:
+    """Earned badges for a stored bitmask, in the same shape as calculate_earned_badges()."""
+    return [
+        {
+            "id": badge["id"],
+            "name": badge["name"],
+            "description": badge["description"],
+            "icon": badge["icon"],
+            "points": badge["points"],
+            "earned": True
+        }
+        for badge_id, badge in BADGES.items() if mask & BADGE_BITS[badge_id]
+    ]
+
+
+def calculate_total_points(badges: List[dict], stats: dict) -> int:
+    """Calculate total points from badges and activities."""
+    badge_points = sum(b["points"] for b in badges)
+    activity_points = stats.get("total_submissions", 0) * 10  # 10 pts per submission
+    activity_points += stats.get("resolved_count", 0) * 25  # 25 pts per resolution
+    return badge_points + activity_points
+
+
+def _activity_time(created_at: Optional[datetime]) -> datetime:
+    """Naive UTC time a submission counts at (now if the database has not filled created_at yet)."""
+    if created_at is None:
+        return datetime.utcnow()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at
+
+
+def _score_keys(values) -> Tuple[tuple, ...]:
+    """(user_id, ward) rows a submission counts towards: city-wide and its ward."""
+    if values["user_id"] is None:
+        return ()
+    if values["ward"]:
+        return ((values["user_id"], ""), (values["user_id"], values["ward"]))
+    return ((values["user_id"], ""),)
+
+
+def _counters(values) -> Counter:
+    return Counter({
+        "submissions": 1,
+        "resolved": int(values["status"] == "resolved"),
+        "with_photos": int(bool(values["uploaded_files"])),
+        "joined": int(bool(values["joined_cluster"])),
+    })
+
+
+def advance_streak(streak: int, last_active: Optional[date], day: date) -> Tuple[int, Optional[date]]:
+    """Streak after activity on `day`; earlier days than last_active do not change it."""
+    if last_active is None or day > last_active + timedelta(days=1):
+        return 1, day
+    if day == last_active + timedelta(days=1):
+        return streak + 1, day
+    return streak, last_active
+
+
+def current_streak(streak: int, last_active: Optional[date], today: date) -> int:
+    """Consecutive active days ending today (0 if the citizen has not been active today)."""
+    return streak if last_active == today else 0
+
+
+def recent_window(recent: Optional[List[str]], times: Iterable[datetime]) -> List[str]:
+    """recent_submissions after adding `times`: those within RECENT_WINDOW of the latest."""
+    merged = sorted([datetime.fromisoformat(t) for t in recent or ()] + list(times))
+    if not merged:
+        return []
+    start = merged[-1] - RECENT_WINDOW
+    return [t.isoformat() for t in merged if t > start][-RECENT_KEPT:]
+
+
+def recent_count(recent: Optional[List[str]], since: datetime) -> int:
+    """Submissions in `recent` after `since`."""
+    return sum(1 for t in recent or () if datetime.fromisoformat(t) > since)
+
+
+def score_stats(counters: Mapping, streak_days: int, submissions_24h: int = 0) -> dict:
+    """Badge condition inputs for one score row's counters."""
+    return {
+        "total_submissions": counters["submissions"],
+        "resolved_count": counters["resolved"],
+        "submissions_24h": submissions_24h,
+        "with_photos": counters["with_photos"],
+        "is_verified": True,  # Every citizen signs in with an OTP-verified phone
+        "joined_count": counters["joined"],
+        "streak_days": streak_days,
+    }
+
+
+def score(stats: dict, badges: int = 0, changed: Optional[Set[str]] = None) -> Tuple[int, int]:
+    """(badge mask, points) for `stats`, keeping badges already earned."""
+    badges = badge_mask(stats, badges, changed)
+    return badges, calculate_total_points(badges_from_mask(badges), stats)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_score_deltas(session: Session, flush_context, instances):
+    """Work out counter deltas and activity times while old values are still readable."""
+    deltas = defaultdict(Counter)
+    activity = defaultdict(list)
+
+    for obj in session.new:
+        if isinstance(obj, Submission):
+            values = current_values(obj, TRACKED_FIELDS)
+            for key in _score_keys(values):
+                deltas[key].update(_counters(values))
+                activity[key].append(_activity_time(values["created_at"]))
+
+    for obj in session.deleted:
+        if isinstance(obj, Submission):
+            values = committed_values(session, obj, TRACKED_FIELDS)
+            for key in _score_keys(values):
+                deltas[key].subtract(_counters(values))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Submission) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[f].history.has_changes() for f in TRACKED_FIELDS):
+            continue
+        old = committed_values(session, obj, TRACKED_FIELDS)
+        new = current_values(obj, TRACKED_FIELDS)
+        for key in _score_keys(old):
+            deltas[key].subtract(_counters(old))
+        for key in _score_keys(new):
+            deltas[key].update(_counters(new))
+
+    if deltas:
+        session.info["score_deltas"] = (deltas, activity)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_score_deltas(session: Session, flush_context):
+    """Apply counter deltas, then rescore the touched rows, inside the flushing transaction."""
+    pending = session.info.pop("score_deltas", None)
+    if not pending:
+        return
+    deltas, activity = pending
+    conn = session.connection()
+    table = CitizenScore.__table__
+    # Fixed order so concurrent writers lock shared rows in the same sequence
+    for (user_id, ward), counts in sorted(deltas.items()):
+        increments = {column: counts[column] for column in COUNTERS if counts[column]}
+        times = sorted(activity.get((user_id, ward), ()))
+        if not increments and not times:
+            continue
+        upsert_increment(conn, CitizenScore, {"user_id": user_id, "ward": ward}, increments or {"submissions": 0})
+
+        # The upsert holds the row lock, so this read-modify-write is safe
+        row = conn.execute(
+            select(table).where(table.c.user_id == user_id, table.c.ward == ward)
+        ).first()
+        changes = {}
+        changed = {COUNTER_STATS[column] for column in increments}
+        streak, recent = row.streak_days or 0, row.recent_submissions
+        if times:
+            last_active = row.last_active_date
+            for t in times:
+                streak, last_active = advance_streak(streak, last_active, t.date())
+            recent = recent_window(recent, times)
+            changes.update(streak_days=streak, last_active_date=last_active, recent_submissions=recent)
+            changed.update(ACTIVITY_STATS)
+
+        stats = score_stats(row._mapping, streak, len(recent or ()))
+        badges, points = score(stats, row.badges or 0, changed)
+        changes.update(badges=badges, points=points)
+        conn.execute(update(table).where(table.c.id == row.id).values(**changes))
+
+
+def backfill_citizen_scores(db: Session) -> int:
+    """
+    Rebuild citizen_scores from all submissions in one transaction, streaming
+    them in time order. Streak and Quick Responder badges are awarded if they
+    were ever reached. Returns rows written.
+    """
+    now = datetime.utcnow()
+    counts = defaultdict(Counter)
+    streaks = {}  # key -> (streak, longest, last_active)
+    bursts = defaultdict(lambda: deque(maxlen=3))  # Last 3 submissions, for Quick Responder
+    burst_reached = set()
+    recent = defaultdict(list)
+
+    columns = [Submission.__table__.c[f] for f in ("created_at",) + TRACKED_FIELDS]
+    stream = db.execute(
+        select(*columns).order_by(Submission.created_at, Submission.id)
+        .execution_options(stream_results=True, yield_per=BACKFILL_BATCH_SIZE)
+    )
+    for row in stream:
+        values = row._mapping
+        at = _activity_time(values["created_at"])
+        for key in _score_keys(values):
+            counts[key].update(_counters(values))
+            streak, longest, last_active = streaks.get(key, (0, 0, None))
+            streak, last_active = advance_streak(streak, last_active, at.date())
+            streaks[key] = (streak, max(longest, streak), last_active)
+            bursts[key].append(at)
+            if len(bursts[key]) == 3 and bursts[key][-1] - bursts[key][0] <= RECENT_WINDOW:
+                burst_reached.add(key)
+            if at > now - RECENT_WINDOW:
+                recent[key].append(at)
+
+    rows = []
+    for key, counters in counts.items():
+        streak, longest, last_active = streaks[key]
+        window = recent_window(None, recent[key])
+        badges, _ = score(score_stats(counters, longest, 3 if key in burst_reached else 0))
+        _, points = score(score_stats(counters, streak, len(window)), badges)
+        rows.append({
+            "user_id": key[0], "ward": key[1], **{c: counters[c] for c in COUNTERS},
+            "streak_days": streak, "last_active_date": last_active, "recent_submissions": window,
+            "badges": badges, "points": points,
+        })
+
+    db.execute(delete(CitizenScore))
+    if rows:
+        db.execute(insert(CitizenScore), rows)
+    db.commit()
+    return len(rows)
+
+
+def score_drift(db: Session) -> int:
+    """
+    Score rows whose submission or resolved counts differ from the submissions
+    table (non-zero means drift, e.g. after bulk SQL on submissions).
+    """
+    ward = func.coalesce(Submission.ward, "")
+    resolved = func.sum(case((Submission.status == "resolved", 1), else_=0))
+    source = Counter()
+    for row in db.query(Submission.user_id, ward, func.count(), resolved).filter(
+        Submission.user_id.isnot(None)
+    ).group_by(Submission.user_id, ward):
+        user_id, row_ward, count, resolved_count = row
+        keys = [(user_id, "")] + ([(user_id, row_ward)] if row_ward else [])
+        for key in keys:
+            source[key + ("submissions",)] += count
+            source[key + ("resolved",)] += resolved_count or 0
+
+    scores = Counter()
+    for row in db.query(CitizenScore.user_id, CitizenScore.ward, CitizenScore.submissions, CitizenScore.resolved):
+        scores[(row.user_id, row.ward, "submissions")] = row.submissions
+        scores[(row.user_id, row.ward, "resolved")] = row.resolved
+
+    return len({key[:2] for key in set(source) | set(scores) if source[key] != scores[key]})
+
+
+async def initialize_citizen_scores():
+    """Startup task: populate citizen_scores from history on first deploy."""
+    db = SessionLocal()
+    try:
+        if db.query(CitizenScore.id).first() is None and db.query(Submission.id).first() is not None:
+            print(f"🏅 Backfilled {backfill_citizen_scores(db)} citizen scores")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Citizen Score Backfill Error: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Backfilled {backfill_citizen_scores(db)} citizen scores")
+    finally:
+        db.close()
@@ -17,16 +17,20 @@ class ComplaintClustering:
     def __init__(self):
         self.vectorizer = TfidfVectorizer(max_features=200, stop_words="english")
     
-    def cluster_submissions(self, db: Session, window_minutes: int = 60) -> List[Dict[str, Any]]:
+    def cluster_submissions(self, db: Session, window_minutes: int = 60, unclustered_only: bool = False) -> List[Dict[str, Any]]:
         """
         Cluster recent submissions and detect escalation patterns.
+        With unclustered_only, submissions already in a cluster are left out.
         Returns list of cluster dictionaries.
         """
         # Get recent submissions
         cutoff_time = datetime.utcnow() - timedelta(minutes=window_minutes)
-        recent_submissions = db.query(Submission).filter(
+        query = db.query(Submission).filter(
             Submission.created_at >= cutoff_time
-        ).all()
+        )
+        if unclustered_only:
+            query = query.filter(Submission.cluster_id.is_(None))
+        recent_submissions = query.all()
         
         if len(recent_submissions) < 2:
             return []
@@ -141,7 +145,25 @@ class ComplaintClustering:
                 severity_score=float(cluster_data["size"]) * 10.0,
             )
             db.add(cluster)
+            db.flush()
+            # Indexed back-reference so lookups don't scan submission_ids JSON
+            db.query(Submission).filter(Submission.id.in_(cluster_data["submission_ids"])).update(
+                {Submission.cluster_id: cluster.id}, synchronize_session=False
+            )
         db.commit()
 
 
+def link_cluster_submissions(db: Session) -> int:
+    """Backfill Submission.cluster_id from clusters saved before it was set. Returns rows linked."""
+    linked = 0
+    for cluster in db.query(Cluster.id, Cluster.submission_ids).filter(Cluster.submission_ids.isnot(None)):
+        if cluster.submission_ids:
+            linked += db.query(Submission).filter(
+                Submission.id.in_(cluster.submission_ids),
+                Submission.cluster_id.is_(None)
+            ).update({Submission.cluster_id: cluster.id}, synchronize_session=False)
+    db.commit()
+    return linked
+
+
 clustering_service = ComplaintClustering()
@@ -28,6 +28,21 @@ class Settings:
     # Kiosk
     DEFAULT_KIOSK_ID: str = os.getenv("DEFAULT_KIOSK_ID", "kiosk-001")
     
+    # Receipt chain: "linear" links every receipt, "merkle" anchors one batch per window
+    RECEIPT_CHAIN_MODE: str = os.getenv("RECEIPT_CHAIN_MODE", "linear")
+    RECEIPT_BATCH_WINDOW_SECONDS: int = int(os.getenv("RECEIPT_BATCH_WINDOW_SECONDS", "60"))
+    
+    # Response cache: in-process LRU by default, shared Redis when REDIS_URL is set
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    
+    # WebSocket fan-out across workers: auto, memory, redis or postgres (LISTEN/NOTIFY)
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "auto")
+    BROADCAST_QUEUE_SIZE: int = int(os.getenv("BROADCAST_QUEUE_SIZE", "100"))
+    
+    # Where daily Parquet snapshots of the open-data feed are published
+    OPEN_DATA_SNAPSHOT_DIR: str = os.getenv("OPEN_DATA_SNAPSHOT_DIR", "open_data_snapshots")
+    
     # Demo OTP bypass code
     DEMO_OTP_BYPASS: str = "000000"
     
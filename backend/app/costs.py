@@ -0,0 +1,262 @@
+"""
+Incremental cost-of-delay accounting.
+
+Every cluster carries a running accumulator:
+
+    cost(t) = cost_estimate + cost_hourly_rate * (t - cost_checkpoint_at)
+
+A session flush hook checkpoints it whenever the cluster's size, intent,
+priority, ward or resolution changes: cost accrued at the old rate is folded
+into cost_estimate and the new rate starts at the checkpoint (0 once resolved).
+
+cost_totals keeps the same figures summed per (ward, intent). Each active
+cluster contributes the line rate * h + (cost_estimate - rate * h_checkpoint),
+where h is hours since COST_EPOCH, so a totals row is just (sum of rates,
+sum of intercepts) and every transition is an atomic increment - no row has
+to be read or re-timed. Resolved clusters move their final cost into
+resolved_cost. Dashboards read the totals instead of recomputing each cluster.
+
+Bulk Query.update()/delete() bypass the hooks; rebuild with backfill_costs().
+The scheduler's hourly drift check (cost_drift) does so automatically.
+
+Usage:
+    python -m app.costs    # rebuild accumulators and totals for every cluster
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, case, delete, event, func, inspect, insert, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Cluster, CostTotal
+from app.rollups import committed_values, current_values, upsert_increment
+from app.sla import get_hourly_rate
+
+COST_EPOCH = datetime(2024, 1, 1)
+
+# Cluster fields whose change checkpoints the accumulator
+TRACKED_FIELDS = ("ward", "intent", "size", "priority", "resolved_at")
+ACCUMULATOR_FIELDS = ("cost_estimate", "cost_hourly_rate", "cost_checkpoint_at")
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def epoch_hours(value: datetime) -> float:
+    return (value - COST_EPOCH).total_seconds() / 3600
+
+
+def cost_at(cost_estimate: float, hourly_rate: float, checkpoint_at: datetime, now: datetime) -> float:
+    """Accumulator value at `now`."""
+    return (cost_estimate or 0.0) + (hourly_rate or 0.0) * max((now - checkpoint_at).total_seconds(), 0) / 3600
+
+
+def total_cost_at(total, now: datetime) -> float:
+    """Active cost of one cost_totals row at `now`."""
+    return total.hourly_rate * epoch_hours(now) + total.intercept
+
+
+def initial_accumulator(values: dict, now: datetime) -> dict:
+    """Accumulator for a cluster never accounted before: its current rate since created_at."""
+    created_at = _naive_utc(values.get("created_at")) or now
+    resolved_at = _naive_utc(values.get("resolved_at"))
+    end = max(resolved_at or now, created_at)
+    rate = get_hourly_rate(values.get("intent"), values.get("size") or 1)
+    return {
+        "cost_estimate": rate * (end - created_at).total_seconds() / 3600,
+        "cost_hourly_rate": 0.0 if resolved_at else rate,
+        "cost_checkpoint_at": end,
+    }
+
+
+def checkpoint(old: dict, new: dict, now: datetime) -> dict:
+    """Accumulator after a transition from `old` to `new` field values."""
+    checkpoint_at = _naive_utc(old["cost_checkpoint_at"])
+    newly_resolved = _naive_utc(new.get("resolved_at")) if not old.get("resolved_at") else None
+    at = max(min(newly_resolved or now, now), checkpoint_at)
+    accrued = cost_at(old["cost_estimate"], old["cost_hourly_rate"], checkpoint_at, at)
+    resolved = new.get("resolved_at") is not None
+    return {
+        "cost_estimate": accrued,
+        "cost_hourly_rate": 0.0 if resolved else get_hourly_rate(new.get("intent"), new.get("size") or 1),
+        "cost_checkpoint_at": at,
+    }
+
+
+def _totals_key(values: dict) -> tuple:
+    return (values.get("ward") or "", values.get("intent") or "")
+
+
+def _contribution(values: dict, accumulator: dict) -> dict:
+    """What one cluster adds to its cost_totals row."""
+    if values.get("resolved_at") is not None:
+        return {"resolved_clusters": 1, "resolved_cost": accumulator["cost_estimate"]}
+    rate = accumulator["cost_hourly_rate"]
+    return {
+        "active_clusters": 1,
+        "active_citizens": values.get("size") or 1,
+        "hourly_rate": rate,
+        "intercept": accumulator["cost_estimate"] - rate * epoch_hours(accumulator["cost_checkpoint_at"]),
+    }
+
+
+def _add(deltas, key, contribution, sign):
+    for column, value in contribution.items():
+        deltas[key][column] += sign * value
+
+
+@event.listens_for(Session, "before_flush")
+def _checkpoint_clusters(session: Session, flush_context, instances):
+    """Checkpoint changed clusters and collect their cost_totals deltas."""
+    now = datetime.utcnow()
+    deltas = defaultdict(lambda: defaultdict(float))
+
+    for obj in session.new:
+        if isinstance(obj, Cluster):
+            values = current_values(obj, TRACKED_FIELDS)
+            accumulator = initial_accumulator(values, now)
+            for field, value in accumulator.items():
+                setattr(obj, field, value)
+            _add(deltas, _totals_key(values), _contribution(values, accumulator), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Cluster):
+            old = committed_values(session, obj, TRACKED_FIELDS + ACCUMULATOR_FIELDS)
+            if old["cost_checkpoint_at"] is not None:
+                _add(deltas, _totals_key(old), _contribution(old, old), -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Cluster) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[f].history.has_changes() for f in TRACKED_FIELDS):
+            continue
+        old = committed_values(session, obj, TRACKED_FIELDS + ACCUMULATOR_FIELDS)
+        new = current_values(obj, TRACKED_FIELDS)
+        if old["cost_checkpoint_at"] is None:
+            # Never accounted (created before accumulators existed): start from scratch
+            accumulator = initial_accumulator(new, now)
+        else:
+            _add(deltas, _totals_key(old), _contribution(old, old), -1)
+            accumulator = checkpoint(old, new, now)
+        for field, value in accumulator.items():
+            setattr(obj, field, value)
+        _add(deltas, _totals_key(new), _contribution(new, accumulator), 1)
+
+    if deltas:
+        session.info["cost_deltas"] = deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_cost_deltas(session: Session, flush_context):
+    deltas = session.info.pop("cost_deltas", None)
+    if not deltas:
+        return
+    conn = session.connection()
+    # Fixed order so concurrent writers lock shared rows in the same sequence
+    for (ward, intent), increments in sorted(deltas.items()):
+        increments = {column: value for column, value in increments.items() if value}
+        if increments:
+            upsert_increment(conn, CostTotal, {"ward": ward, "intent": intent}, increments)
+
+
+def backfill_costs(db: Session) -> int:
+    """
+    Recompute every cluster's accumulator from its current fields (as if its
+    size and intent never changed) and rebuild cost_totals. Returns clusters.
+    """
+    now = datetime.utcnow()
+    columns = [Cluster.id, Cluster.created_at] + [getattr(Cluster, f) for f in TRACKED_FIELDS]
+    totals = defaultdict(lambda: defaultdict(float))
+    updates = []
+    for row in db.query(*columns):
+        values = dict(row._mapping)
+        accumulator = initial_accumulator(values, now)
+        updates.append({"cluster_pk": row.id, **accumulator})
+        _add(totals, _totals_key(values), _contribution(values, accumulator), 1)
+
+    if updates:
+        # Core executemany: bypasses the flush hooks on purpose
+        db.execute(
+            update(Cluster.__table__).where(Cluster.__table__.c.id == bindparam("cluster_pk")),
+            updates,
+        )
+    db.execute(delete(CostTotal))
+    rows = [{"ward": ward, "intent": intent, **dict(columns)} for (ward, intent), columns in totals.items()]
+    if rows:
+        db.execute(insert(CostTotal), rows)
+    db.commit()
+    return len(updates)
+
+
+def cost_drift(db: Session) -> int:
+    """
+    (ward, intent) rows of cost_totals whose cluster counts or citizens differ
+    from the clusters table, plus clusters never accounted (non-zero means drift,
+    e.g. after bulk SQL on clusters).
+    """
+    ward = func.coalesce(Cluster.ward, "")
+    intent = func.coalesce(Cluster.intent, "")
+    resolved = Cluster.resolved_at.isnot(None)
+    source = {
+        (row.ward, row.intent): (row.active, row.citizens, row.resolved)
+        for row in db.query(
+            ward.label("ward"), intent.label("intent"),
+            func.sum(case((resolved, 0), else_=1)).label("active"),
+            # Same as _contribution's `size or 1`
+            func.sum(case((resolved, 0), else_=func.coalesce(func.nullif(Cluster.size, 0), 1))).label("citizens"),
+            func.sum(case((resolved, 1), else_=0)).label("resolved"),
+        ).group_by(ward, intent)
+    }
+    totals = {
+        (t.ward, t.intent): (t.active_clusters, t.active_citizens, t.resolved_clusters)
+        for t in db.query(CostTotal)
+    }
+    empty = (0, 0, 0)
+    drifted = sum(
+        1 for key in set(source) | set(totals)
+        if tuple(v or 0 for v in source.get(key, empty)) != tuple(v or 0 for v in totals.get(key, empty))
+    )
+    return drifted + db.query(Cluster.id).filter(Cluster.cost_checkpoint_at.is_(None)).count()
+
+
+async def initialize_costs():
+    """Startup task: account clusters that predate the accumulators."""
+    db = SessionLocal()
+    try:
+        if db.query(Cluster.id).filter(Cluster.cost_checkpoint_at.is_(None)).first() is not None:
+            print(f"💰 Backfilled cost accumulators for {backfill_costs(db)} clusters")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Cost Backfill Error: {e}")
+    finally:
+        db.close()
+
+
+def cost_summary(db: Session, now: Optional[datetime] = None) -> Dict[str, dict]:
+    """Active cost per (ward, intent) at `now` from cost_totals (one small query)."""
+    now = now or datetime.utcnow()
+    return {
+        (t.ward, t.intent): {
+            "cost": total_cost_at(t, now),
+            "hourly_rate": t.hourly_rate,
+            "clusters": t.active_clusters,
+            "citizens": t.active_citizens,
+            "resolved_cost": t.resolved_cost,
+            "resolved_clusters": t.resolved_clusters,
+        }
+        for t in db.query(CostTotal)
+    }
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Backfilled {backfill_costs(db)} clusters")
+    finally:
+        db.close()
@@ -0,0 +1,264 @@
+"""
+In-memory spatial index of field crews for dispatch recommendations.
+
+Crews with a known position are bucketed into a uniform lat/lng grid
+(CELL_DEGREES, about 1 km), once overall and once per specialty. A k-nearest
+query scans rings of cells outwards from the query point and stops as soon as
+no unscanned ring can hold anything closer than the k-th best match, so a
+lookup touches a handful of cells instead of every crew.
+
+The index is loaded lazily, updated from committed Crew changes in this worker
+(status, position, specialty), and reloaded every RELOAD_SECONDS to pick up
+changes committed by other workers.
+"""
+import heapq
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Crew
+from app.similarity import haversine_distance
+
+CELL_DEGREES = 0.01
+METERS_PER_DEGREE = 111320
+# Full reload interval, for crews changed by other workers
+RELOAD_SECONDS = 60
+
+INDEXED_FIELDS = ("crew_id", "name", "specialty", "capacity", "current_status",
+                  "current_latitude", "current_longitude")
+
+
+def specialty_for_intent(intent: Optional[str]) -> Optional[str]:
+    """Crew specialty that handles a cluster intent (water_outage -> water)."""
+    return intent.replace("_outage", "") if intent else None
+
+
+@dataclass
+class CrewPoint:
+    id: int
+    crew_id: str
+    name: str
+    specialty: Optional[str]
+    capacity: int
+    status: str
+    latitude: float
+    longitude: float
+
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+class Grid:
+    """Cell -> crew ids, with the occupied cell range for bounding ring scans."""
+
+    def __init__(self):
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        # Bounds of every cell ever occupied (never shrunk; only used to stop ring scans)
+        self.bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def add(self, point: CrewPoint) -> None:
+        i, j = _cell(point.latitude, point.longitude)
+        self.cells.setdefault((i, j), set()).add(point.id)
+        if self.bounds is None:
+            self.bounds = (i, i, j, j)
+        else:
+            min_i, max_i, min_j, max_j = self.bounds
+            self.bounds = (min(min_i, i), max(max_i, i), min(min_j, j), max(max_j, j))
+
+    def discard(self, point: CrewPoint) -> None:
+        cell = _cell(point.latitude, point.longitude)
+        ids = self.cells.get(cell)
+        if ids is not None:
+            ids.discard(point.id)
+            if not ids:
+                del self.cells[cell]
+
+    def max_ring(self, center: Tuple[int, int]) -> int:
+        """Ring radius beyond which no occupied cell exists."""
+        if self.bounds is None:
+            return -1
+        min_i, max_i, min_j, max_j = self.bounds
+        ci, cj = center
+        return max(ci - min_i, max_i - ci, cj - min_j, max_j - cj, 0)
+
+    def ring(self, center: Tuple[int, int], radius: int):
+        ci, cj = center
+        if radius == 0:
+            yield from self.cells.get(center, ())
+            return
+        for i in range(ci - radius, ci + radius + 1):
+            for j in (cj - radius, cj + radius):
+                yield from self.cells.get((i, j), ())
+        for j in range(cj - radius + 1, cj + radius):
+            for i in (ci - radius, ci + radius):
+                yield from self.cells.get((i, j), ())
+
+
+class CrewSpatialIndex:
+    """Grid index over crew positions with k-nearest queries."""
+
+    def __init__(self, reload_seconds: float = RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self.points: Dict[int, CrewPoint] = {}
+        self._all = Grid()
+        self._by_specialty: Dict[Optional[str], Grid] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def load(self, db: Session) -> int:
+        """Rebuild from the crews table."""
+        rows = db.query(Crew.id, *[getattr(Crew, f) for f in INDEXED_FIELDS]).all()
+        with self._lock:
+            self.points, self._all, self._by_specialty = {}, Grid(), {}
+            for row in rows:
+                self._put(row.id, row._mapping)
+            self._loaded_at = time.monotonic()
+        return len(self.points)
+
+    def ensure_loaded(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_seconds:
+            return
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def invalidate(self) -> None:
+        """Reload from the database on next use."""
+        self._loaded_at = None
+
+    def update(self, crew_pk: int, values: Optional[dict]) -> None:
+        """Apply one crew's committed values (None when deleted)."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # Loaded from the database on first use
+            self._remove(crew_pk)
+            if values is not None:
+                self._put(crew_pk, values)
+
+    def move(self, crew_pk: int, latitude: float, longitude: float) -> None:
+        """Apply a position written outside the ORM (live tracking)."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            point = self.points.get(crew_pk)
+            if point is None:
+                self.invalidate()  # First known position: the other fields come from a reload
+                return
+            self._remove(crew_pk)
+            point.latitude, point.longitude = latitude, longitude
+            self.points[crew_pk] = point
+            self._all.add(point)
+            self._by_specialty.setdefault(point.specialty, Grid()).add(point)
+
+    def _put(self, crew_pk: int, values) -> None:
+        if values["current_latitude"] is None or values["current_longitude"] is None:
+            return  # Position unknown: cannot be ranked by distance
+        point = CrewPoint(
+            id=crew_pk, crew_id=values["crew_id"], name=values["name"], specialty=values["specialty"],
+            capacity=values["capacity"] or 1, status=values["current_status"] or "available",
+            latitude=values["current_latitude"], longitude=values["current_longitude"],
+        )
+        self.points[crew_pk] = point
+        self._all.add(point)
+        self._by_specialty.setdefault(point.specialty, Grid()).add(point)
+
+    def _remove(self, crew_pk: int) -> None:
+        point = self.points.pop(crew_pk, None)
+        if point is not None:
+            self._all.discard(point)
+            self._by_specialty[point.specialty].discard(point)
+
+    @staticmethod
+    def _meters_per_cell(latitude: float, radius: int) -> float:
+        """Lower bound on one cell's width within `radius` rings (longitude degrees shrink poleward)."""
+        return CELL_DEGREES * METERS_PER_DEGREE * math.cos(math.radians(min(abs(latitude) + radius * CELL_DEGREES, 89)))
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1, specialty: Optional[str] = None,
+                status: Optional[str] = "available") -> List[Tuple[CrewPoint, float]]:
+        """Up to k (crew, meters) pairs nearest to the point, closest first."""
+        self.ensure_loaded()
+        with self._lock:
+            grid = self._all if specialty is None else self._by_specialty.get(specialty)
+            if grid is None or k <= 0:
+                return []
+            center = _cell(latitude, longitude)
+            last_ring = grid.max_ring(center)
+
+            best: List[Tuple[float, int]] = []  # Max-heap of (-meters, id) holding the k best
+
+            def consider(crew_pks):
+                for crew_pk in crew_pks:
+                    point = self.points[crew_pk]
+                    if status is not None and point.status != status:
+                        continue
+                    meters = haversine_distance(latitude, longitude, point.latitude, point.longitude)
+                    if len(best) < k:
+                        heapq.heappush(best, (-meters, crew_pk))
+                    elif meters < -best[0][0]:
+                        heapq.heapreplace(best, (-meters, crew_pk))
+
+            radius = 0
+            while radius <= last_ring:
+                if len(best) == k and (radius - 1) * self._meters_per_cell(latitude, radius) > -best[0][0]:
+                    break  # Nothing in this ring or beyond can be closer
+                if (2 * radius + 1) ** 2 > 4 * len(grid.cells) + 8:
+                    # Sparse grid: walking empty rings costs more than checking every occupied cell
+                    best.clear()
+                    consider(crew_pk for ids in grid.cells.values() for crew_pk in ids)
+                    break
+                consider(grid.ring(center, radius))
+                radius += 1
+
+            return [(self.points[crew_pk], -neg) for neg, crew_pk in sorted(best, reverse=True)]
+
+
+crew_index = CrewSpatialIndex()
+
+_RELOAD = object()
+
+
+# ============== Session hooks ==============
+
+@event.listens_for(Session, "after_flush")
+def _collect_crew_changes(session: Session, flush_context):
+    if crew_index._loaded_at is None:
+        return
+    changes = session.info.setdefault("crew_index_changes", {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Crew):
+            # Read loaded values only; never trigger a refresh from inside a flush
+            state = obj.__dict__
+            if any(f not in state for f in INDEXED_FIELDS):
+                changes[obj.id] = _RELOAD
+            else:
+                changes[obj.id] = {f: state[f] for f in INDEXED_FIELDS}
+    for obj in session.deleted:
+        if isinstance(obj, Crew):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_crew_changes(session: Session):
+    changes = session.info.pop("crew_index_changes", None)
+    for crew_pk, values in (changes or {}).items():
+        if values is _RELOAD:
+            crew_index.invalidate()
+            return
+        crew_index.update(crew_pk, values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_crew_changes(session: Session):
+    session.info.pop("crew_index_changes", None)
@@ -0,0 +1,182 @@
+"""
+Live crew GPS tracking from the field app.
+
+POST /crews/location takes batches of pings. Nothing is written per ping:
+
+- pending positions are coalesced in memory, keeping only each crew's newest
+- every FLUSH_SECONDS one executemany UPDATE writes the pending positions to
+  crews.current_latitude/longitude (one row per moving crew, not per ping) and
+  moves the crews in the dispatch index
+- each crew's recent pings are kept in a fixed-size ring buffer (TRACK_POINTS
+  positions, 24 bytes each) for GET /crews/{id}/track playback
+
+Pings, buffers and the flush loop are per worker: a track covers the pings
+this worker received. Pending positions are flushed on shutdown; a crashed
+worker loses at most FLUSH_SECONDS of positions.
+"""
+import asyncio
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+from app.crew_index import crew_index
+from app.database import SessionLocal
+from app.models import Crew
+
+FLUSH_SECONDS = 5
+# Ring buffer size per crew: an hour of pings at one every 5 seconds
+TRACK_POINTS = 720
+MAX_PINGS_PER_BATCH = 1000
+
+Position = Tuple[float, float, float]  # (epoch seconds, latitude, longitude)
+
+
+def ping_time(recorded_at: Optional[datetime]) -> float:
+    """Epoch seconds of a ping (naive times are UTC; now if the app did not say)."""
+    if recorded_at is None:
+        return time.time()
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+    return recorded_at.timestamp()
+
+
+class TrackBuffer:
+    """Fixed-size ring of (time, latitude, longitude) in one flat float array."""
+
+    __slots__ = ("_data", "_size", "_next", "_count")
+
+    def __init__(self, size: int = TRACK_POINTS):
+        self._data = array("d", bytes(3 * 8 * size))
+        self._size = size
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_time(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._data[3 * ((self._next - 1) % self._size)]
+
+    def append(self, at: float, latitude: float, longitude: float) -> None:
+        i = 3 * self._next
+        self._data[i:i + 3] = array("d", (at, latitude, longitude))
+        self._next = (self._next + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def points(self, since: Optional[float] = None) -> List[Position]:
+        """Buffered positions oldest first, optionally only those after `since`."""
+        start = (self._next - self._count) % self._size
+        out = []
+        for k in range(self._count):
+            i = 3 * ((start + k) % self._size)
+            if since is None or self._data[i] > since:
+                out.append((self._data[i], self._data[i + 1], self._data[i + 2]))
+        return out
+
+
+class CrewTracker:
+    """Coalesces pings per crew, keeps their tracks and flushes positions in bulk."""
+
+    def __init__(self, flush_seconds: float = FLUSH_SECONDS, track_points: int = TRACK_POINTS):
+        self.flush_seconds = flush_seconds
+        self.track_points = track_points
+        self.pending: Dict[int, Position] = {}  # crew pk -> newest unflushed position
+        self.tracks: Dict[int, TrackBuffer] = {}
+        self._crew_pks: Dict[str, int] = {}  # crew_id -> pk, resolved once per crew
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def resolve(self, db, crew_ids: Iterable[str]) -> Dict[str, int]:
+        """crew_id -> pk for the known crews among `crew_ids` (queries only ids not seen before)."""
+        crew_ids = set(crew_ids)
+        missing = crew_ids - self._crew_pks.keys()
+        if missing:
+            for pk, crew_id in db.query(Crew.id, Crew.crew_id).filter(Crew.crew_id.in_(missing)):
+                self._crew_pks[crew_id] = pk
+        return {crew_id: self._crew_pks[crew_id] for crew_id in crew_ids if crew_id in self._crew_pks}
+
+    def record(self, crew_pk: int, at: float, latitude: float, longitude: float) -> None:
+        """Take one ping: extend the track and keep the position if it is the crew's newest."""
+        with self._lock:
+            track = self.tracks.get(crew_pk)
+            if track is None:
+                track = self.tracks[crew_pk] = TrackBuffer(self.track_points)
+            if track.last_time is None or at > track.last_time:
+                track.append(at, latitude, longitude)
+            pending = self.pending.get(crew_pk)
+            if pending is None or at >= pending[0]:
+                self.pending[crew_pk] = (at, latitude, longitude)
+
+    def track(self, crew_pk: int, since: Optional[float] = None) -> List[Position]:
+        with self._lock:
+            track = self.tracks.get(crew_pk)
+            return track.points(since) if track is not None else []
+
+    def forget(self, crew_pk: int) -> None:
+        """Drop a crew's pending position (its position was just written another way)."""
+        with self._lock:
+            self.pending.pop(crew_pk, None)
+
+    def flush(self) -> int:
+        """Write every pending position in one bulk UPDATE. Returns crews written."""
+        with self._lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return 0
+        db = SessionLocal()
+        try:
+            # Core executemany: bypasses the flush hooks; the dispatch index is moved below
+            db.execute(
+                update(Crew.__table__).where(Crew.__table__.c.id == bindparam("crew_pk")).values(
+                    current_latitude=bindparam("latitude"), current_longitude=bindparam("longitude"),
+                ),
+                [{"crew_pk": pk, "latitude": lat, "longitude": lng} for pk, (_, lat, lng) in batch.items()],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Retry next tick, unless a newer ping has arrived since
+                for pk, position in batch.items():
+                    if pk not in self.pending:
+                        self.pending[pk] = position
+            raise
+        finally:
+            db.close()
+        for pk, (_, lat, lng) in batch.items():
+            crew_index.move(pk, lat, lng)
+        return len(batch)
+
+    # ============== Flush loop ==============
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.flush)
+        except Exception as e:
+            print(f"❌ Crew Location Flush Error: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                print(f"❌ Crew Location Flush Error: {e}")
+
+
+crew_tracker = CrewTracker()
@@ -0,0 +1,159 @@
+"""
+Live admin dashboard feed (served as Server-Sent Events from /admin/stream).
+
+A single ticker computes deltas once per tick - new submissions, changed
+clusters, clusters that crossed their SLA deadline since the last tick, and the
+KPI block when it changed - and fans the same events out to every connected
+dashboard. Database load is therefore per tick, not per open browser. The
+ticker only runs while at least one dashboard is subscribed.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_
+
+from app.database import SessionLocal
+from app.models import Submission, Cluster
+from app.schemas import ClusterResponse
+from app.sla import SLA_TARGETS
+
+TICK_SECONDS = 5
+# Events buffered per dashboard before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 100
+# Cap on new submissions pushed per tick (the rest arrive on following ticks)
+MAX_SUBMISSIONS_PER_TICK = 500
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+class DashboardFeed:
+    """Computes dashboard deltas once per tick and fans them out to subscriber queues."""
+
+    def __init__(self, tick_seconds: float = TICK_SECONDS):
+        self.tick_seconds = tick_seconds
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.latest_metrics: Optional[Dict[str, Any]] = None  # Last published metrics event
+        self._metrics: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_submission_id: Optional[int] = None
+        self._last_tick: Optional[datetime] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if self.latest_metrics is not None:
+            queue.put_nowait(("metrics", self.latest_metrics))
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data: Any) -> None:
+        """Deliver one event to every subscriber without blocking on slow ones."""
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # Dashboard fell behind: drop its backlog and ask it to refetch full state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", {"reason": "subscriber lagged behind the feed"}))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.subscribers:
+            try:
+                events = await loop.run_in_executor(None, self.compute_deltas, datetime.utcnow())
+                for event, data in events:
+                    self.publish(event, data)
+            except Exception as e:
+                print(f"❌ Dashboard Feed Error: {e}")
+            await asyncio.sleep(self.tick_seconds)
+        # Nobody is watching: start from "now" again on the next subscription
+        self._last_submission_id = None
+        self._last_tick = None
+
+    def compute_deltas(self, now: datetime) -> List[tuple]:
+        """One round of queries shared by all subscribers."""
+        from app.routers.admin import aggregate_metrics
+
+        events = []
+        since = self._last_tick or now
+        db = SessionLocal()
+        try:
+            if self._last_submission_id is None:
+                # Start the cursor at the newest row - dashboards load history themselves
+                newest = db.query(Submission.id).order_by(Submission.id.desc()).first()
+                self._last_submission_id = newest.id if newest else 0
+
+            new_submissions = db.query(
+                Submission.id, Submission.intent, Submission.ward, Submission.status,
+                Submission.priority, Submission.latitude, Submission.longitude, Submission.created_at,
+            ).filter(
+                Submission.id > self._last_submission_id
+            ).order_by(Submission.id).limit(MAX_SUBMISSIONS_PER_TICK).all()
+            if new_submissions:
+                self._last_submission_id = new_submissions[-1].id
+                events.append(("submissions", [dict(s._mapping) for s in new_submissions]))
+
+            changed_clusters = db.query(Cluster).filter(
+                or_(Cluster.created_at >= since, Cluster.updated_at >= since)
+            ).all() if self._last_tick else []
+            if changed_clusters:
+                events.append(("clusters", [ClusterResponse.model_validate(c) for c in changed_clusters]))
+
+            breached = self._newly_breached(db, since, now) if self._last_tick else []
+            if breached:
+                events.append(("sla_breaches", breached))
+
+            metrics = aggregate_metrics(db, now)
+            if metrics != self._metrics:
+                self._metrics = metrics
+                self.latest_metrics = {**metrics, "timestamp": now.isoformat()}
+                events.append(("metrics", self.latest_metrics))
+        finally:
+            db.close()
+
+        self._last_tick = now
+        return events
+
+    @staticmethod
+    def _newly_breached(db, since: datetime, now: datetime) -> List[Dict[str, Any]]:
+        """Unresolved clusters whose SLA deadline (created_at + target) fell in (since, now]."""
+        windows = [
+            and_(
+                Cluster.priority == priority,
+                Cluster.created_at > since - timedelta(hours=hours),
+                Cluster.created_at <= now - timedelta(hours=hours),
+            )
+            for priority, hours in SLA_TARGETS.items()
+        ]
+        default_hours = SLA_TARGETS['normal']
+        windows.append(and_(
+            or_(Cluster.priority.is_(None), Cluster.priority.notin_(list(SLA_TARGETS))),
+            Cluster.created_at > since - timedelta(hours=default_hours),
+            Cluster.created_at <= now - timedelta(hours=default_hours),
+        ))
+        clusters = db.query(Cluster).filter(Cluster.resolved_at.is_(None), or_(*windows)).all()
+        return [
+            {
+                "cluster_id": c.cluster_id,
+                "intent": c.intent,
+                "ward": c.ward,
+                "priority": c.priority,
+                "size": c.size,
+                "sla_target_hours": SLA_TARGETS.get(c.priority, default_hours),
+            }
+            for c in clusters
+        ]
+
+
+dashboard_feed = DashboardFeed()
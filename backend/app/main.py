@@ -54,12 +54,31 @@ async def health():
 
 @app.on_event("startup")
 async def startup_event():
-    import asyncio
-    from app.sla_scheduler import check_sla_escalations
+    from app.rollups import initialize_rollups
+    from app.costs import initialize_costs
+    from app.citizen_scores import initialize_citizen_scores
+    from app.scheduler import job_scheduler
+    from app.broadcast import broadcaster
+    from app.crew_tracking import crew_tracker
     
-    async def run_scheduler():
-        while True:
-            await check_sla_escalations()
-            await asyncio.sleep(60) # Run every minute
-            
-    asyncio.create_task(run_scheduler())
+    await initialize_rollups()
+    await initialize_costs()
+    await initialize_citizen_scores()
+    
+    await broadcaster.start()
+    # Per worker: live crew positions are buffered where they are received
+    crew_tracker.start()
+    
+    # Every worker heartbeats; only the elected leader runs periodic jobs
+    job_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.scheduler import job_scheduler
+    from app.broadcast import broadcaster
+    from app.crew_tracking import crew_tracker
+    
+    await job_scheduler.stop()
+    await broadcaster.stop()
+    await crew_tracker.stop()
@@ -0,0 +1,65 @@
+"""
+Merkle tree helpers for batched receipt anchoring.
+Leaves and inner nodes are domain-separated so a leaf can never be replayed as a node,
+and an odd node is promoted to the next level instead of being duplicated.
+"""
+import hashlib
+from typing import List, Dict
+
+
+def hash_leaf(leaf_hash: str) -> str:
+    """Hash a receipt hash into a tree leaf."""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(leaf_hash)).hexdigest()
+
+
+def hash_node(left: str, right: str) -> str:
+    """Hash two child nodes into their parent."""
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_tree(leaf_hashes: List[str]) -> List[List[str]]:
+    """
+    Build all tree levels bottom-up.
+    levels[0] are the hashed leaves, levels[-1] is [root].
+    """
+    if not leaf_hashes:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    levels = [[hash_leaf(h) for h in leaf_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])  # Promote the odd node unchanged
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(leaf_hashes: List[str]) -> str:
+    """Compute the root over receipt hashes in leaf order."""
+    return build_tree(leaf_hashes)[-1][0]
+
+
+def inclusion_proof(levels: List[List[str]], index: int) -> List[Dict[str, str]]:
+    """
+    Sibling path from leaf `index` up to the root.
+    Each step is {"hash": sibling, "side": "left"|"right"} relative to the running node.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"hash": level[sibling], "side": "left" if sibling < index else "right"})
+        index //= 2
+    return proof
+
+
+def verify_inclusion(leaf_hash: str, proof: List[Dict[str, str]], root: str) -> bool:
+    """Recompute the root from a receipt hash and its proof - O(log n)."""
+    node = hash_leaf(leaf_hash)
+    for step in proof:
+        if step["side"] == "left":
+            node = hash_node(step["hash"], node)
+        else:
+            node = hash_node(node, step["hash"])
+    return node == root
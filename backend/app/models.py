@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -33,11 +33,21 @@ class Submission(Base):
     cluster_id = Column(Integer, ForeignKey("clusters.id"), nullable=True)
     priority_score = Column(Float, nullable=True)
     joined_cluster = Column(Boolean, default=False)
+    escalated = Column(Boolean, default=False)  # Auto-escalated by the SLA scheduler
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="submissions")
     receipt = relationship("Receipt", back_populates="submission", uselist=False)
 
+    __table_args__ = (
+        # Bounding-box lookups for heatmap tiles
+        Index("ix_submissions_lat_lng", "latitude", "longitude"),
+        # Keyset pagination for open data
+        Index("ix_submissions_created_at_id", "created_at", "id"),
+        # Cluster lookups for escalation
+        Index("ix_submissions_cluster_id", "cluster_id"),
+    )
+
 class Receipt(Base):
     __tablename__ = "receipts"
 
@@ -49,9 +59,54 @@ class Receipt(Base):
     prev_hash = Column(String(64), nullable=True)  # Previous receipt hash in chain
     chain_hash = Column(String(64), nullable=True)  # Cumulative chain hash
     kiosk_id = Column(String(50), nullable=False)  # Kiosk identifier
+    sequence = Column(Integer, nullable=True)  # 1-based position in the kiosk's chain
+    # Merkle mode: receipt is a leaf of a batch that is anchored into the chain
+    batch_id = Column(Integer, ForeignKey("receipt_batches.id"), nullable=True, index=True)
+    leaf_index = Column(Integer, nullable=True)
+    merkle_proof = Column(JSON, nullable=True)  # Sibling path to the batch root
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     submission = relationship("Submission", back_populates="receipt")
+    batch = relationship("ReceiptBatch", back_populates="receipts")
+
+    __table_args__ = (
+        # One receipt per chain position - a concurrent fork fails here instead of silently branching
+        Index("ix_receipts_kiosk_sequence", "kiosk_id", "sequence", unique=True),
+    )
+
+
+class KioskChainHead(Base):
+    """Latest link of each kiosk's receipt hash chain (O(1) chain extension)"""
+    __tablename__ = "kiosk_chain_heads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kiosk_id = Column(String(50), unique=True, index=True, nullable=False)
+    head_hash = Column(String(64), nullable=True)  # receipt_hash of the newest receipt
+    sequence = Column(Integer, nullable=False, default=0)  # Sequence of the newest receipt (== chain length)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ReceiptBatch(Base):
+    """Per-kiosk, per-time-window Merkle batch of receipts, anchored as one chain link"""
+    __tablename__ = "receipt_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kiosk_id = Column(String(50), nullable=False, index=True)
+    window_start = Column(DateTime, nullable=False)  # UTC start of the batching window
+    status = Column(String(20), default="open")  # open, sealed
+    leaf_count = Column(Integer, default=0)
+    merkle_root = Column(String(64), nullable=True)
+    anchor_hash = Column(String(64), nullable=True)  # Chain link committing to merkle_root
+    prev_hash = Column(String(64), nullable=True)
+    sequence = Column(Integer, nullable=True)  # Position of the anchor in the kiosk's chain
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sealed_at = Column(DateTime(timezone=True), nullable=True)
+
+    receipts = relationship("Receipt", back_populates="batch")
+
+    __table_args__ = (
+        UniqueConstraint("kiosk_id", "window_start", name="uq_receipt_batches_kiosk_window"),
+    )
 
 class Cluster(Base):
     __tablename__ = "clusters"
@@ -77,8 +132,10 @@ class Cluster(Base):
     assigned_crew_id = Column(Integer, ForeignKey("crews.id"), nullable=True)
     assigned_at = Column(DateTime(timezone=True), nullable=True)
     resolved_at = Column(DateTime(timezone=True), nullable=True)
-    # Cost tracking
-    cost_estimate = Column(Float, default=0.0)  # Cost-of-delay metric
+    # Cost tracking: cost at time t = cost_estimate + cost_hourly_rate * (t - cost_checkpoint_at)
+    cost_estimate = Column(Float, default=0.0)  # Cost-of-delay accrued up to the checkpoint
+    cost_hourly_rate = Column(Float, nullable=True)  # 0 once resolved
+    cost_checkpoint_at = Column(DateTime, nullable=True)  # Naive UTC
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -86,6 +143,42 @@ class Cluster(Base):
     thread = relationship("Thread", back_populates="cluster", uselist=False)
 
 
+class SubmissionRollupHourly(Base):
+    """Submission counts per hour bucket and dimension, maintained on write (see app.rollups)"""
+    __tablename__ = "submission_rollups_hourly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, nullable=False, index=True)  # UTC hour bucket of created_at
+    ward = Column(String(50), nullable=False, default="")  # "" when the submission has no ward
+    intent = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    priority = Column(String(10), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("hour", "ward", "intent", "status", "priority", name="uq_submission_rollups_bucket"),
+    )
+
+
+class ClusterRollupHourly(Base):
+    """Cluster counts per hour bucket and dimension, maintained on write (see app.rollups)"""
+    __tablename__ = "cluster_rollups_hourly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, nullable=False, index=True)  # UTC hour bucket of created_at
+    ward = Column(String(50), nullable=False, default="")
+    intent = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    priority = Column(String(10), nullable=False)
+    escalated = Column(Boolean, nullable=False, default=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("hour", "ward", "intent", "status", "priority", "escalated",
+                         name="uq_cluster_rollups_bucket"),
+    )
+
+
 class Crew(Base):
     """Field crew for task assignment"""
     __tablename__ = "crews"
@@ -139,6 +232,11 @@ class Message(Base):
     
     thread = relationship("Thread", back_populates="messages")
 
+    __table_args__ = (
+        # Keyset pages of one thread's history (/threads/{id}/messages)
+        Index("ix_messages_thread_created_at", "thread_id", "created_at", "id"),
+    )
+
 
 class AuditLog(Base):
     """Audit trail for all admin actions"""
@@ -166,6 +264,94 @@ class KioskLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class CitizenScore(Base):
+    """
+    Gamification projection per citizen and ward (maintained by app.citizen_scores).
+    ward "" holds the citizen's city-wide totals.
+    """
+    __tablename__ = "citizen_scores"
+    __table_args__ = (
+        UniqueConstraint("user_id", "ward", name="uq_citizen_scores_user_ward"),
+        # Leaderboards: WHERE ward = ? ORDER BY points DESC LIMIT n
+        Index("ix_citizen_scores_ward_points", "ward", "points"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Bulk deletes bypass the score hooks, so rows go with their user in the database
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    ward = Column(String(50), nullable=False, default="")
+    submissions = Column(Integer, nullable=False, default=0)
+    resolved = Column(Integer, nullable=False, default=0)
+    with_photos = Column(Integer, nullable=False, default=0)
+    joined = Column(Integer, nullable=False, default=0)
+    streak_days = Column(Integer, nullable=False, default=0)  # Consecutive active days ending last_active_date
+    last_active_date = Column(Date, nullable=True)  # UTC
+    recent_submissions = Column(JSON, nullable=True)  # ISO UTC times of submissions in the latest 24h window
+    badges = Column(Integer, nullable=False, default=0)  # Bitmask over BADGES, in definition order
+    points = Column(Integer, nullable=False, default=0)
+
+
+class CostTotal(Base):
+    """
+    Running cost-of-delay totals per ward and intent (maintained by app.costs).
+    Active cost at time t = hourly_rate * hours since app.costs.COST_EPOCH + intercept.
+    """
+    __tablename__ = "cost_totals"
+    __table_args__ = (
+        UniqueConstraint("ward", "intent", name="uq_cost_totals_ward_intent"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ward = Column(String(50), nullable=False, default="")  # "" when the cluster has no ward
+    intent = Column(String(50), nullable=False)
+    active_clusters = Column(Integer, nullable=False, default=0)
+    active_citizens = Column(Integer, nullable=False, default=0)
+    hourly_rate = Column(Float, nullable=False, default=0.0)
+    intercept = Column(Float, nullable=False, default=0.0)
+    resolved_clusters = Column(Integer, nullable=False, default=0)
+    resolved_cost = Column(Float, nullable=False, default=0.0)
+
+
+class WardReport(Base):
+    """Nightly precomputed ward briefing (payload of /transparency/ward/{ward}/report)"""
+    __tablename__ = "ward_reports"
+    __table_args__ = (
+        UniqueConstraint("ward", "report_date", name="uq_ward_reports_ward_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ward = Column(String(50), nullable=False)
+    report_date = Column(Date, nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SchedulerLease(Base):
+    """Leader lease for periodic jobs; one row per lease name"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)  # host:pid:nonce of the leader
+    acquired_at = Column(DateTime, nullable=False)  # Naive UTC
+    heartbeat_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class SchedulerJobStat(Base):
+    """Run metrics per periodic job (also drives scheduling across failovers)"""
+    __tablename__ = "scheduler_job_stats"
+
+    name = Column(String(50), primary_key=True)
+    runs = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    total_duration_ms = Column(Float, nullable=False, default=0.0)
+    last_duration_ms = Column(Float, nullable=True)
+    last_started_at = Column(DateTime, nullable=True)  # Naive UTC
+    last_finished_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    last_worker = Column(String(100), nullable=True)
+
+
 class OTP(Base):
     __tablename__ = "otps"
     
@@ -0,0 +1,32 @@
+"""
+Anonymized open-data record shape, shared by the /transparency open-data APIs
+and the daily Parquet snapshots (app.snapshots).
+"""
+from app.models import Submission
+
+# Columns exposed by the open-data APIs (no text, files or user references)
+PUBLIC_COLUMNS = (
+    Submission.id,
+    Submission.intent,
+    Submission.ward,
+    Submission.status,
+    Submission.priority,
+    Submission.created_at,
+    Submission.latitude,
+    Submission.longitude,
+)
+
+
+def public_record(row) -> dict:
+    """Anonymized open-data record for one projected submission row."""
+    return {
+        "id": row.id,
+        "intent": row.intent,
+        "ward": row.ward,
+        "status": row.status,
+        "priority": row.priority,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        # Round location to ward-level precision (privacy)
+        "latitude_rounded": round(row.latitude, 2) if row.latitude else None,
+        "longitude_rounded": round(row.longitude, 2) if row.longitude else None,
+    }
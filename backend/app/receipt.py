@@ -1,8 +1,22 @@
 import hashlib
 import json
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import Receipt, Submission
+from sqlalchemy.sql import func
+from app.config import settings
+from app.database import SessionLocal
+from app.merkle import build_tree, inclusion_proof
+from app.models import Receipt, Submission, KioskChainHead, ReceiptBatch
+
+# How often chain extension re-reads the head after losing a compare-and-swap race
+CHAIN_APPEND_RETRIES = 5
+
+
+class ChainConflictError(Exception):
+    """Raised when a kiosk's chain head keeps moving under concurrent appends."""
+
 
 def compute_receipt_hash(submission_json: dict, prev_hash: Optional[str]) -> str:
     """
@@ -13,14 +27,218 @@ def compute_receipt_hash(submission_json: dict, prev_hash: Optional[str]) -> str
     payload = (prev_hash or "") + s
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
+def build_receipt_payload(submission: Submission) -> dict:
+    """Canonical submission fields a receipt hash commits to (used at issue and verify time)."""
+    return {
+        "id": submission.id,
+        "intent": submission.intent,
+        "text": submission.text,
+        "created_at": submission.created_at.isoformat() if submission.created_at else None
+    }
+
 def get_prev_hash(db: Session, kiosk_id: str) -> Optional[str]:
-    """Get the last receipt hash for a kiosk"""
+    """Get the last receipt hash for a kiosk (legacy scan, used to seed chain heads)"""
     last_receipt = db.query(Receipt).filter(
-        Receipt.kiosk_id == kiosk_id
+        Receipt.kiosk_id == kiosk_id,
+        Receipt.batch_id.is_(None)
     ).order_by(Receipt.created_at.desc()).first()
-    
+
     return last_receipt.receipt_hash if last_receipt else None
 
+
+def _lock_chain_head(db: Session, kiosk_id: str) -> Optional[KioskChainHead]:
+    """Read the kiosk's head row with a row lock (SELECT ... FOR UPDATE where supported)."""
+    return db.query(KioskChainHead).filter(
+        KioskChainHead.kiosk_id == kiosk_id
+    ).populate_existing().with_for_update().first()
+
+
+def get_chain_head(db: Session, kiosk_id: str) -> KioskChainHead:
+    """
+    Get the chain head for a kiosk, creating it on first use.
+    Kiosks that already have receipts from before heads existed are seeded
+    from their newest receipt once; afterwards no receipt scan is needed.
+    """
+    head = _lock_chain_head(db, kiosk_id)
+    if head:
+        return head
+
+    legacy_length = db.query(Receipt).filter(
+        Receipt.kiosk_id == kiosk_id,
+        Receipt.batch_id.is_(None)
+    ).count()
+    head = KioskChainHead(
+        kiosk_id=kiosk_id,
+        head_hash=get_prev_hash(db, kiosk_id) if legacy_length else None,
+        sequence=legacy_length,
+    )
+    try:
+        with db.begin_nested():
+            db.add(head)
+    except IntegrityError:
+        # Another worker created the head concurrently - use theirs
+        head = _lock_chain_head(db, kiosk_id)
+    return head
+
+
+def append_to_chain(db: Session, kiosk_id: str, submission_json: dict) -> Tuple[str, Optional[str], int]:
+    """
+    Extend a kiosk's hash chain by one link in constant time.
+
+    The head row is locked for the rest of the transaction and advanced with a
+    compare-and-swap on its sequence, so two concurrent submissions from the
+    same kiosk can never link to the same predecessor.
+    Returns (receipt_hash, prev_hash, sequence).
+    """
+    for _ in range(CHAIN_APPEND_RETRIES):
+        head = get_chain_head(db, kiosk_id)
+        prev_hash = head.head_hash
+        sequence = head.sequence + 1
+        receipt_hash = compute_receipt_hash(submission_json, prev_hash)
+
+        swapped = db.query(KioskChainHead).filter(
+            KioskChainHead.id == head.id,
+            KioskChainHead.sequence == head.sequence,
+        ).update(
+            {"head_hash": receipt_hash, "sequence": sequence, "updated_at": func.now()},
+            synchronize_session=False,
+        )
+        if swapped:
+            db.expire(head)
+            return receipt_hash, prev_hash, sequence
+
+    raise ChainConflictError(f"Could not extend receipt chain for kiosk {kiosk_id}")
+
+
+def backfill_chain_sequences(db: Session) -> int:
+    """
+    Number receipts issued before sequence numbers existed, in (created_at, id) order
+    per kiosk, and seed any missing chain heads. Safe to re-run.
+    """
+    kiosk_ids = [k for (k,) in db.query(Receipt.kiosk_id).filter(
+        Receipt.sequence.is_(None),
+        Receipt.batch_id.is_(None)
+    ).distinct()]
+
+    numbered = 0
+    for kiosk_id in kiosk_ids:
+        legacy = db.query(Receipt).filter(
+            Receipt.kiosk_id == kiosk_id,
+            Receipt.sequence.is_(None),
+            Receipt.batch_id.is_(None)
+        ).order_by(Receipt.created_at, Receipt.id).all()
+        for position, receipt in enumerate(legacy, start=1):
+            receipt.sequence = position
+        numbered += len(legacy)
+        get_chain_head(db, kiosk_id)
+        db.commit()
+    return numbered
+
+
+def get_batch_window_start(now: Optional[datetime] = None) -> datetime:
+    """Start (naive UTC) of the batching window containing `now`."""
+    window = settings.RECEIPT_BATCH_WINDOW_SECONDS
+    epoch = datetime(1970, 1, 1)
+    elapsed = int(((now or datetime.utcnow()) - epoch).total_seconds())
+    return epoch + timedelta(seconds=elapsed - elapsed % window)
+
+
+def get_open_batch(db: Session, kiosk_id: str) -> Optional[ReceiptBatch]:
+    """
+    Get the kiosk's Merkle batch for the current window, creating it on first use.
+    Ingest takes no chain lock, so submissions within a window proceed in parallel.
+    Returns None if the window's batch was already sealed.
+    """
+    window_start = get_batch_window_start()
+    query = db.query(ReceiptBatch).filter(
+        ReceiptBatch.kiosk_id == kiosk_id,
+        ReceiptBatch.window_start == window_start
+    )
+    batch = query.first()
+    if not batch:
+        batch = ReceiptBatch(kiosk_id=kiosk_id, window_start=window_start, status="open")
+        try:
+            with db.begin_nested():
+                db.add(batch)
+        except IntegrityError:
+            batch = query.first()
+    return batch if batch.status == "open" else None
+
+
+def batch_anchor_payload(batch: ReceiptBatch) -> dict:
+    """Fields a batch's chain link commits to."""
+    return {
+        "batch_id": batch.id,
+        "merkle_root": batch.merkle_root,
+        "leaf_count": batch.leaf_count,
+    }
+
+
+def seal_batch(db: Session, batch: ReceiptBatch) -> None:
+    """
+    Build the batch's Merkle tree, store each receipt's inclusion proof and
+    anchor the root into the kiosk's hash chain as a single link.
+    """
+    receipts = db.query(Receipt).filter(Receipt.batch_id == batch.id).order_by(Receipt.id).all()
+    if not receipts:
+        db.delete(batch)
+        return
+
+    levels = build_tree([r.receipt_hash for r in receipts])
+    for index, receipt in enumerate(receipts):
+        receipt.leaf_index = index
+        receipt.merkle_proof = inclusion_proof(levels, index)
+
+    batch.merkle_root = levels[-1][0]
+    batch.leaf_count = len(receipts)
+    batch.anchor_hash, batch.prev_hash, batch.sequence = append_to_chain(
+        db, batch.kiosk_id, batch_anchor_payload(batch)
+    )
+    batch.status = "sealed"
+    batch.sealed_at = datetime.utcnow()
+
+
+def seal_due_batches(db: Session) -> int:
+    """
+    Seal every open batch whose window closed at least one window ago.
+    Receipts that committed into a batch after it was sealed are moved to the current window.
+    """
+    cutoff = get_batch_window_start() - timedelta(seconds=settings.RECEIPT_BATCH_WINDOW_SECONDS)
+
+    stragglers = db.query(Receipt).join(ReceiptBatch).filter(
+        ReceiptBatch.status == "sealed",
+        Receipt.leaf_index.is_(None)
+    ).all()
+    for receipt in stragglers:
+        receipt.batch_id = get_open_batch(db, receipt.kiosk_id).id
+
+    due = db.query(ReceiptBatch).filter(
+        ReceiptBatch.status == "open",
+        ReceiptBatch.window_start <= cutoff
+    ).with_for_update().all()
+    for batch in due:
+        seal_batch(db, batch)
+
+    db.commit()
+    return len(due)
+
+
+def seal_receipt_batches():
+    """Scheduled job (run in the executor): anchor closed Merkle batches into their kiosk chains."""
+    if settings.RECEIPT_CHAIN_MODE != "merkle":
+        return
+    db = SessionLocal()
+    try:
+        sealed = seal_due_batches(db)
+        if sealed:
+            print(f"🌳 Sealed {sealed} receipt batches")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Receipt Batch Seal Error: {e}")
+    finally:
+        db.close()
+
+
 def generate_receipt_id() -> str:
     """Generate a unique receipt ID"""
     import uuid
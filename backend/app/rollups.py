@@ -0,0 +1,248 @@
+"""
+Hourly rollups of submissions and clusters.
+
+Dashboards read pre-aggregated counts from submission_rollups_hourly and
+cluster_rollups_hourly instead of scanning the raw tables, so their cost grows
+with the number of (hour, ward, intent, status, priority) buckets rather than rows.
+
+Rollups are kept current by session flush hooks: every ORM insert, delete or
+change of a bucketed field is turned into +1/-1 upserts on the affected buckets
+in the same transaction as the write. Bulk Query.update()/delete() bypass the
+hooks, so rebuild with backfill_rollups() after those.
+
+Usage:
+    python -m app.rollups    # rebuild all rollups from history
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Boolean, delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Submission, Cluster, SubmissionRollupHourly, ClusterRollupHourly
+
+# Source model -> (rollup model, bucketed fields besides the hour)
+ROLLUPS = {
+    Submission: (SubmissionRollupHourly, ("ward", "intent", "status", "priority")),
+    Cluster: (ClusterRollupHourly, ("ward", "intent", "status", "priority", "escalated")),
+}
+
+# Rows per round trip while streaming history in backfill_rollups
+BACKFILL_BATCH_SIZE = 10000
+
+_MISSING = object()
+
+
+def floor_hour(value: Optional[datetime]) -> datetime:
+    """Naive UTC start of the hour containing `value` (now if None)."""
+    if value is None:
+        value = datetime.utcnow()
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _normalize(model, field: str, value):
+    """Map a field value to its bucket value; NULLs take the column default."""
+    if value is None:
+        column = model.__table__.c[field]
+        if column.default is not None and column.default.is_scalar:
+            value = column.default.arg
+        else:
+            value = False if isinstance(column.type, Boolean) else ""
+    return value
+
+
+def _bucket_key(model, fields: Tuple[str, ...], values) -> tuple:
+    """Hashable ((column, value), ...) identifying one rollup bucket."""
+    return (("hour", floor_hour(values["created_at"])),) + tuple(
+        (f, _normalize(model, f, values[f])) for f in fields
+    )
+
+
+def current_values(obj, fields):
+    """Field values as they will be written by this flush."""
+    state = inspect(obj)
+    values = {}
+    for field in ("created_at",) + fields:
+        history = state.attrs[field].load_history()
+        current = history.added or history.unchanged
+        values[field] = current[0] if current else None
+    return values
+
+
+def committed_values(session: Session, obj, fields):
+    """Field values as currently stored, reading the row if an old value was never loaded."""
+    state = inspect(obj)
+    values = {}
+    for field in ("created_at",) + fields:
+        history = state.attrs[field].load_history()
+        if history.deleted:
+            values[field] = history.deleted[0]
+        elif history.unchanged:
+            values[field] = history.unchanged[0]
+        elif history.added:
+            values[field] = _MISSING
+        else:
+            values[field] = None
+
+    missing = [f for f, v in values.items() if v is _MISSING]
+    if missing:
+        model = type(obj)
+        row = session.connection().execute(
+            select(*[model.__table__.c[f] for f in missing]).where(model.__table__.c.id == state.identity[0])
+        ).first()
+        for field in missing:
+            values[field] = getattr(row, field) if row else None
+    return values
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_rollup_deltas(session: Session, flush_context, instances):
+    """Work out bucket deltas while old values are still readable."""
+    deltas = Counter()
+    for obj in session.new:
+        if type(obj) in ROLLUPS:
+            rollup, fields = ROLLUPS[type(obj)]
+            deltas[(rollup, _bucket_key(type(obj), fields, current_values(obj, fields)))] += 1
+
+    for obj in session.deleted:
+        if type(obj) in ROLLUPS:
+            rollup, fields = ROLLUPS[type(obj)]
+            deltas[(rollup, _bucket_key(type(obj), fields, committed_values(session, obj, fields)))] -= 1
+
+    for obj in session.dirty:
+        if type(obj) in ROLLUPS and obj not in session.deleted:
+            rollup, fields = ROLLUPS[type(obj)]
+            state = inspect(obj)
+            if not any(state.attrs[f].history.has_changes() for f in ("created_at",) + fields):
+                continue
+            old = _bucket_key(type(obj), fields, committed_values(session, obj, fields))
+            new = _bucket_key(type(obj), fields, current_values(obj, fields))
+            if old != new:
+                deltas[(rollup, old)] -= 1
+                deltas[(rollup, new)] += 1
+
+    session.info["rollup_deltas"] = deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_rollup_deltas(session: Session, flush_context):
+    """Write the collected deltas inside the flushing transaction."""
+    deltas = session.info.pop("rollup_deltas", None)
+    if not deltas:
+        return
+    conn = session.connection()
+    # Fixed order so concurrent writers lock shared buckets in the same sequence
+    for (rollup, key), delta in sorted(deltas.items(), key=lambda item: (item[0][0].__tablename__, str(item[0][1]))):
+        if delta:
+            apply_rollup_delta(conn, rollup, dict(key), delta)
+
+
+def apply_rollup_delta(conn, rollup, bucket: dict, delta: int) -> None:
+    """Add `delta` to one bucket's count, creating the bucket if needed."""
+    upsert_increment(conn, rollup, bucket, {"count": delta})
+
+
+def upsert_increment(conn, model, key: dict, increments: dict) -> None:
+    """Atomically add `increments` to the row identified by `key` (unique columns), inserting it if missing."""
+    table = model.__table__
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).values(**key, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments},
+        )
+        conn.execute(stmt)
+        return
+
+    updated = conn.execute(
+        update(table).where(*[table.c[k] == v for k, v in key.items()]).values(
+            **{column: table.c[column] + value for column, value in increments.items()}
+        )
+    )
+    if not updated.rowcount:
+        conn.execute(insert(table).values(**key, **increments))
+
+
+def backfill_rollups(db: Session) -> Dict[str, int]:
+    """
+    Rebuild all rollups from the raw tables in one transaction.
+    History is streamed in batches and counted in memory per bucket, so memory
+    grows with the number of buckets, not rows. Safe to re-run.
+    """
+    buckets = {}
+    for model, (rollup, fields) in ROLLUPS.items():
+        columns = [model.__table__.c[f] for f in ("created_at",) + fields]
+        counts = Counter()
+        stream = db.execute(
+            select(*columns).execution_options(stream_results=True, yield_per=BACKFILL_BATCH_SIZE)
+        )
+        for row in stream:
+            counts[_bucket_key(model, fields, row._mapping)] += 1
+
+        db.execute(delete(rollup))
+        rows = [dict(key, count=n) for key, n in counts.items()]
+        if rows:
+            db.execute(insert(rollup), rows)
+        buckets[rollup.__tablename__] = len(rows)
+
+    db.commit()
+    return buckets
+
+
+# Bucket fields compared by rollup_drift
+DRIFT_FIELDS = ("status", "priority")
+
+
+def rollup_drift(db: Session) -> Dict[str, int]:
+    """
+    Rows the rollup counts differently from the source table, per rollup table,
+    compared per status and priority (non-zero means drift - including bulk
+    status or priority updates that leave the total unchanged).
+    """
+    drift = {}
+    for model, (rollup, _) in ROLLUPS.items():
+        source_columns = [
+            func.coalesce(model.__table__.c[f], _normalize(model, f, None)) for f in DRIFT_FIELDS
+        ]
+        source = Counter({
+            tuple(row[:-1]): row[-1]
+            for row in db.query(*source_columns, func.count()).group_by(*source_columns)
+        })
+        rolled_columns = [getattr(rollup, f) for f in DRIFT_FIELDS]
+        rolled = Counter({
+            tuple(row[:-1]): row[-1] or 0
+            for row in db.query(*rolled_columns, func.sum(rollup.count)).group_by(*rolled_columns)
+        })
+        drift[rollup.__tablename__] = sum(
+            abs(source[key] - rolled[key]) for key in set(source) | set(rolled)
+        )
+    return drift
+
+
+async def initialize_rollups():
+    """Startup task: populate rollups from history on first deploy."""
+    db = SessionLocal()
+    try:
+        if db.query(SubmissionRollupHourly.id).first() is None and db.query(Submission.id).first() is not None:
+            buckets = backfill_rollups(db)
+            print(f"📊 Backfilled rollups: {buckets}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rollup Backfill Error: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(backfill_rollups(db))
+    finally:
+        db.close()
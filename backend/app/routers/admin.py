@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import select, union_all, literal, case, and_, func, cast, Integer
 from typing import List, Optional
 from app.database import get_db
-from app.models import Submission, Cluster, User, Receipt
+from app.models import Submission, Cluster, User, Receipt, SubmissionRollupHourly, ClusterRollupHourly, CostTotal, CitizenScore
 from app.schemas import ClusterResponse, HeatmapData, AdminSimulateUpdate
 from app.clustering import clustering_service
 from app.config import settings
 from app.receipt import compute_receipt_hash, generate_receipt_id, generate_short_code
+from app.rollups import floor_hour
+from app.cache import response_cache, cached
+from app.costs import cost_at, cost_summary
+from app.dashboard_stream import dashboard_feed, format_sse
 from datetime import datetime, timedelta
+import asyncio
+import math
 import random
 import uuid
 
@@ -69,6 +77,11 @@ SAMPLE_TEXTS = {
 }
 
 
+# Estimated citizen frustration by priority for map shading (0=Good, 1=Angry)
+PRIORITY_SENTIMENT = {'CRITICAL': 0.9, 'urgent': 0.9, 'high': 0.7}
+DEFAULT_SENTIMENT = 0.3
+HIGH_PRIORITIES = ['high', 'urgent', 'CRITICAL']
+
 def verify_admin_password(password: str = None):
     """Simple admin password check (demo only)"""
     if not password or password != settings.ADMIN_PASSWORD:
@@ -105,9 +118,13 @@ async def get_clusters(
     # Get recent clusters
     clusters = db.query(Cluster).order_by(Cluster.created_at.desc()).limit(50).all()
     
-    # Get recent submissions for heatmap
+    # Get recent submissions for heatmap (only the columns the map needs)
+    # For large volumes use the pre-aggregated /admin/heatmap/{z}/{x}/{y} tiles instead
     cutoff_time = datetime.utcnow() - timedelta(hours=24)
-    submissions = db.query(Submission).filter(
+    submissions = db.query(
+        Submission.id, Submission.latitude, Submission.longitude,
+        Submission.intent, Submission.status, Submission.priority
+    ).filter(
         Submission.created_at >= cutoff_time,
         Submission.latitude.isnot(None),
         Submission.longitude.isnot(None)
@@ -121,7 +138,7 @@ async def get_clusters(
             "intent": s.intent,
             "status": s.status,
             "priority": s.priority,
-            "sentiment": random.choice([0.2, 0.4, 0.6, 0.8, 0.9]) if s.priority in ['high', 'urgent'] else random.choice([0.1, 0.3, 0.5]) # Simulated sentiment (0=Good, 1=Angry)
+            "sentiment": PRIORITY_SENTIMENT.get(s.priority, DEFAULT_SENTIMENT),
         }
         for s in submissions
     ]
@@ -132,6 +149,67 @@ async def get_clusters(
     )
 
 
+def aggregate_metrics(db: Session, now: datetime) -> dict:
+    """
+    Compute all dashboard KPIs in a single round trip over the hourly rollups.
+    One grouped pass over submission buckets (one row per intent, conditional sums per KPI)
+    is UNIONed with one aggregate row over cluster buckets, so cost tracks the number of
+    buckets rather than rows. Time windows are hour-aligned: "24h" starts at the top of the
+    hour 24 hours ago, and throughput is the last complete clock hour.
+    """
+    day_start = floor_hour(now - timedelta(hours=24))
+    last_hour = floor_hour(now - timedelta(hours=1))
+    sub = SubmissionRollupHourly
+    clu = ClusterRollupHourly
+    
+    def count_if(rollup, *conditions):
+        return func.sum(case((and_(*conditions), rollup.count), else_=0))
+    
+    submission_rows = select(
+        literal("submissions").label("source"),
+        sub.intent.label("intent"),
+        func.sum(sub.count).label("total"),
+        count_if(sub, sub.hour >= day_start).label("last_24h"),
+        count_if(sub, sub.status == 'resolved', sub.hour >= day_start).label("resolved_24h"),
+        count_if(sub, sub.status == 'pending').label("pending"),
+        count_if(sub, sub.status == 'assigned').label("assigned"),
+        count_if(sub, sub.priority.in_(['high', 'urgent']), sub.status == 'pending').label("high_priority"),
+        count_if(sub, sub.hour == last_hour).label("last_hour"),
+        literal(0).label("escalated"),
+    ).group_by(sub.intent)
+    
+    cluster_row = select(
+        literal("clusters"),
+        literal(None),
+        func.sum(clu.count),
+        literal(0), literal(0), literal(0), literal(0), literal(0), literal(0),
+        count_if(clu, clu.escalated == True),
+    ).where(clu.hour >= day_start)
+    
+    rows = db.execute(union_all(submission_rows, cluster_row)).all()
+    by_intent = {r.intent: r for r in rows if r.source == "submissions"}
+    clusters = next(r for r in rows if r.source == "clusters")
+    
+    def total(field):
+        return sum(getattr(r, field) or 0 for r in by_intent.values())
+    
+    return {
+        "total_submissions": total("total"),
+        "submissions_24h": total("last_24h"),
+        "active_clusters": clusters.total or 0,
+        "escalated_clusters": clusters.escalated or 0,
+        "high_priority_queue": total("high_priority"),
+        "resolved_24h": total("resolved_24h"),
+        "pending_count": total("pending"),
+        "assigned_count": total("assigned"),
+        "throughput_per_hour": total("last_hour"),
+        "intent_breakdown": {
+            intent: (by_intent[intent].last_24h or 0) if intent in by_intent else 0
+            for intent in INTENT_TYPES
+        },
+    }
+
+
 @router.get("/metrics")
 async def get_metrics(
     password: str = None,
@@ -144,73 +222,11 @@ async def get_metrics(
     verify_admin_password(password)
     
     now = datetime.utcnow()
-    last_24h = now - timedelta(hours=24)
-    last_hour = now - timedelta(hours=1)
-    
-    # Total submissions in last 24h
-    total_submissions_24h = db.query(Submission).filter(
-        Submission.created_at >= last_24h
-    ).count()
-    
-    # Total submissions all time
-    total_submissions = db.query(Submission).count()
-    
-    # Active clusters (last 24h)
-    active_clusters = db.query(Cluster).filter(
-        Cluster.created_at >= last_24h
-    ).count()
-    
-    # Escalated clusters
-    escalated_clusters = db.query(Cluster).filter(
-        Cluster.escalated == True,
-        Cluster.created_at >= last_24h
-    ).count()
-    
-    # High priority queue
-    high_priority_count = db.query(Submission).filter(
-        Submission.priority.in_(['high', 'urgent']),
-        Submission.status == 'pending'
-    ).count()
-    
-    # Resolution stats
-    resolved_count = db.query(Submission).filter(
-        Submission.status == 'resolved',
-        Submission.created_at >= last_24h
-    ).count()
-    
-    pending_count = db.query(Submission).filter(
-        Submission.status == 'pending'
-    ).count()
-    
-    assigned_count = db.query(Submission).filter(
-        Submission.status == 'assigned'
-    ).count()
-    
-    # Submissions in last hour (throughput)
-    throughput_hour = db.query(Submission).filter(
-        Submission.created_at >= last_hour
-    ).count()
-    
-    # Intent breakdown
-    intent_counts = {}
-    for intent in INTENT_TYPES:
-        intent_counts[intent] = db.query(Submission).filter(
-            Submission.intent == intent,
-            Submission.created_at >= last_24h
-        ).count()
+    metrics = aggregate_metrics(db, now)
     
     return {
-        "total_submissions": total_submissions,
-        "submissions_24h": total_submissions_24h,
-        "active_clusters": active_clusters,
-        "escalated_clusters": escalated_clusters,
-        "high_priority_queue": high_priority_count,
-        "resolved_24h": resolved_count,
-        "pending_count": pending_count,
-        "assigned_count": assigned_count,
-        "throughput_per_hour": throughput_hour,
+        **metrics,
         "avg_resolution_time": "45 min",  # Mock for demo
-        "intent_breakdown": intent_counts,
         "demo_mode": settings.DEMO_MODE,
         "timestamp": now.isoformat()
     }
@@ -366,7 +382,13 @@ async def reset_demo(
     db.query(Receipt).delete()
     db.query(Cluster).delete()
     db.query(Submission).delete()
+    db.query(SubmissionRollupHourly).delete()
+    db.query(ClusterRollupHourly).delete()
+    db.query(CostTotal).delete()
+    db.query(CitizenScore).delete()
     db.commit()
+    # Everything the cached dashboards aggregate is gone; don't wait out their TTLs
+    response_cache.invalidate("transparency", "gamification", "heatmap")
     
     return {"message": "Demo data reset successfully", "demo_mode": settings.DEMO_MODE}
 
@@ -411,6 +433,92 @@ async def join_submission(
     }
 
 
+# ============== HEATMAP TILES ==============
+
+# Each tile is split into HEATMAP_GRID_SIZE x HEATMAP_GRID_SIZE cells
+HEATMAP_GRID_SIZE = 32
+HEATMAP_MAX_ZOOM = 22
+HEATMAP_TILE_TTL_SECONDS = 30
+
+
+def tile_bounds(z: int, x: int, y: int) -> dict:
+    """Lat/lng bounding box of a Web Mercator (slippy map) tile."""
+    n = 2 ** z
+    
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    
+    return {"west": x / n * 360 - 180, "east": (x + 1) / n * 360 - 180, "north": lat(y), "south": lat(y + 1)}
+
+
+def _cell_index(offset):
+    """Grid cell of a fractional cell offset: floored (CAST rounds on Postgres) and kept in the grid."""
+    index = cast(func.floor(offset), Integer)
+    # Points on the south edge (or pushed over by float error) belong to the last cell
+    return case((index < 0, 0), (index >= HEATMAP_GRID_SIZE, HEATMAP_GRID_SIZE - 1), else_=index)
+
+
+@cached("heatmap", ttl=HEATMAP_TILE_TTL_SECONDS)
+async def heatmap_tile(z: int, x: int, y: int, hours: int, db: Session) -> dict:
+    """
+    Grid counts for one tile, aggregated in the database.
+    Cells are equal steps of latitude and longitude within the tile, so the payload
+    is at most HEATMAP_GRID_SIZE^2 cells however many submissions fall inside.
+    """
+    bounds = tile_bounds(z, x, y)
+    cell_width = (bounds["east"] - bounds["west"]) / HEATMAP_GRID_SIZE
+    cell_height = (bounds["north"] - bounds["south"]) / HEATMAP_GRID_SIZE
+    col = _cell_index((Submission.longitude - bounds["west"]) / cell_width).label("col")
+    row = _cell_index((bounds["north"] - Submission.latitude) / cell_height).label("row")
+    
+    cells = db.query(
+        col,
+        row,
+        func.count().label("count"),
+        func.sum(case((Submission.priority.in_(HIGH_PRIORITIES), 1), else_=0)).label("high_priority"),
+    ).filter(
+        Submission.created_at >= datetime.utcnow() - timedelta(hours=hours),
+        Submission.latitude >= bounds["south"],
+        Submission.latitude < bounds["north"],
+        Submission.longitude >= bounds["west"],
+        Submission.longitude < bounds["east"],
+    ).group_by(col, row).all()
+    
+    return {
+        "z": z, "x": x, "y": y,
+        "bounds": bounds,
+        "grid_size": HEATMAP_GRID_SIZE,
+        "hours": hours,
+        # [col, row, count, high_priority_count]; row 0 is the northern edge
+        "cells": [[c.col, c.row, c.count, c.high_priority or 0] for c in cells],
+        "total": sum(c.count for c in cells),
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+
+
+@router.get("/heatmap/{z}/{x}/{y}")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    hours: int = 24,
+    password: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Pre-aggregated submission density for one map tile (slippy map z/x/y).
+    Payload stays a few KB regardless of event volume; tiles are cached briefly.
+    """
+    verify_admin_password(password)
+    
+    if not 0 <= z <= HEATMAP_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    if not 1 <= hours <= 24 * 30:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 720")
+    
+    return await heatmap_tile(z=z, x=x, y=y, hours=hours, db=db)
+
+
 # ============== SLA & COST ENDPOINTS ==============
 
 @router.get("/sla")
@@ -424,44 +532,37 @@ async def get_sla_dashboard(
     """
     verify_admin_password(password)
     
-    from app.sla import get_sla_summary, compute_cluster_sla_status, compute_cost_of_delay, get_hours_open
-    from app.models import Crew
+    from app.sla import compute_sla_batch_for, summarize_sla_batch, sla_buckets, batch_sla_status, batch_cost_of_delay
     
     # Get active clusters (created in last 48h)
     cutoff = datetime.utcnow() - timedelta(hours=48)
-    clusters = db.query(Cluster).filter(Cluster.created_at >= cutoff).all()
-    
-    # Compute summary
-    summary = get_sla_summary(clusters)
-    
-    # Get breached clusters with details
-    breached_clusters = []
-    at_risk_clusters = []
-    
-    for cluster in clusters:
-        sla_status = compute_cluster_sla_status(cluster)
-        is_resolved = cluster.resolved_at is not None
-        
-        # Get cost info
-        citizen_count = cluster.size or 1
-        hours_open = get_hours_open(cluster.created_at, cluster.resolved_at)
-        cost_info = compute_cost_of_delay(cluster.intent, citizen_count, hours_open, is_resolved)
-        
-        cluster_info = {
+    clusters = db.query(
+        Cluster.cluster_id, Cluster.intent, Cluster.ward, Cluster.size, Cluster.priority,
+        Cluster.created_at, Cluster.resolved_at, Cluster.assigned_crew_id,
+        Cluster.cost_estimate, Cluster.cost_hourly_rate, Cluster.cost_checkpoint_at,
+    ).filter(Cluster.created_at >= cutoff).all()
+    
+    # One vectorized pass for every cluster's SLA status and cost
+    batch = compute_sla_batch_for(clusters)
+    summary = summarize_sla_batch(batch)
+    buckets = sla_buckets(batch)
+    
+    def cluster_info(i):
+        cluster = clusters[i]
+        return {
             "cluster_id": cluster.cluster_id,
             "intent": cluster.intent,
             "ward": cluster.ward,
             "size": cluster.size,
             "priority": cluster.priority,
-            "sla_status": sla_status,
-            "cost": cost_info,
+            "sla_status": batch_sla_status(batch, i, cluster),
+            "cost": batch_cost_of_delay(batch, i, cluster),
             "assigned_crew_id": cluster.assigned_crew_id,
         }
-        
-        if sla_status['is_breached'] and not is_resolved:
-            breached_clusters.append(cluster_info)
-        elif sla_status['time_remaining_hours'] < 1 and not is_resolved:
-            at_risk_clusters.append(cluster_info)
+    
+    # Only the flagged clusters are turned back into dicts
+    breached_clusters = [cluster_info(i) for i in buckets['breached'].nonzero()[0]]
+    at_risk_clusters = [cluster_info(i) for i in buckets['at_risk'].nonzero()[0]]
     
     return {
         "summary": summary,
@@ -479,83 +580,62 @@ async def get_cost_analysis(
     """
     Get comprehensive cost-of-delay analysis.
     Shows economic impact of unresolved issues.
+    Read from the running per-ward/per-intent totals (app.costs), not per cluster.
     """
     verify_admin_password(password)
     
-    from app.sla import compute_cost_of_delay, get_hours_open
-    
-    # Get all active (unresolved) clusters
-    clusters = db.query(Cluster).filter(Cluster.resolved_at.is_(None)).all()
+    totals = cost_summary(db)
     
     total_cost = 0
     total_hourly_rate = 0
+    active_clusters = 0
     by_intent = {}
     by_ward = {}
     
-    for cluster in clusters:
-        hours_open = get_hours_open(cluster.created_at, None)
-        cost_info = compute_cost_of_delay(cluster.intent, cluster.size or 1, hours_open, False)
-        
-        total_cost += cost_info['total_cost']
-        total_hourly_rate += cost_info['hourly_rate']
+    for (ward, intent), t in totals.items():
+        if not t["clusters"]:
+            continue
+        total_cost += t["cost"]
+        total_hourly_rate += t["hourly_rate"]
+        active_clusters += t["clusters"]
         
         # Aggregate by intent
-        intent = cluster.intent
         if intent not in by_intent:
             by_intent[intent] = {"cost": 0, "clusters": 0, "citizens": 0}
-        by_intent[intent]["cost"] += cost_info['total_cost']
-        by_intent[intent]["clusters"] += 1
-        by_intent[intent]["citizens"] += cluster.size or 1
+        by_intent[intent]["cost"] += t["cost"]
+        by_intent[intent]["clusters"] += t["clusters"]
+        by_intent[intent]["citizens"] += t["citizens"]
         
         # Aggregate by ward
-        ward = cluster.ward or "Unknown"
+        ward = ward or "Unknown"
         if ward not in by_ward:
             by_ward[ward] = {"cost": 0, "clusters": 0}
-        by_ward[ward]["cost"] += cost_info['total_cost']
-        by_ward[ward]["clusters"] += 1
+        by_ward[ward]["cost"] += t["cost"]
+        by_ward[ward]["clusters"] += t["clusters"]
+    
+    for bucket in list(by_intent.values()) + list(by_ward.values()):
+        bucket["cost"] = round(bucket["cost"], 2)
     
     return {
         "total_cost_incurred": round(total_cost, 2),
         "active_hourly_rate": round(total_hourly_rate, 2),
-        "active_clusters": len(clusters),
+        "active_clusters": active_clusters,
         "by_intent": by_intent,
         "by_ward": by_ward,
         "currency": "INR",
         "timestamp": datetime.utcnow().isoformat(),
-        "message": f"₹{round(total_hourly_rate, 0)}/hour being incurred due to {len(clusters)} unresolved issues",
+        "message": f"₹{round(total_hourly_rate, 0)}/hour being incurred due to {active_clusters} unresolved issues",
     }
 
 
-@router.post("/cluster/{cluster_id}/assign")
-async def assign_cluster(
-    cluster_id: str,
-    crew_id: int,
-    notes: str = None,
-    password: str = None,
-    db: Session = Depends(get_db)
-):
+def _assign_crew(db: Session, cluster: Cluster, crew, thread, notes: Optional[str] = None):
     """
-    Assign a crew to a cluster.
-    Updates cluster SLA and creates thread for communication.
+    Assign `crew` to `cluster`: SLA deadline, crew status, thread message and
+    audit entry. `thread` is the cluster's existing thread, if any. Returns the thread.
     """
-    verify_admin_password(password)
-    
-    from app.models import Crew, Thread, Message, AuditLog
+    from app.models import Thread, Message, AuditLog
     from app.sla import compute_sla_deadline, get_sla_target_hours
     
-    # Find cluster
-    cluster = db.query(Cluster).filter(
-        (Cluster.cluster_id == cluster_id) | (Cluster.id == int(cluster_id) if cluster_id.isdigit() else False)
-    ).first()
-    
-    if not cluster:
-        raise HTTPException(status_code=404, detail="Cluster not found")
-    
-    # Find crew
-    crew = db.query(Crew).filter(Crew.id == crew_id).first()
-    if not crew:
-        raise HTTPException(status_code=404, detail="Crew not found")
-    
     # Assign crew
     cluster.assigned_crew_id = crew.id
     cluster.assigned_at = datetime.utcnow()
@@ -567,8 +647,7 @@ async def assign_cluster(
     # Update crew status
     crew.current_status = "assigned"
     
-    # Create or get thread
-    thread = db.query(Thread).filter(Thread.cluster_id == cluster.id).first()
+    # Create thread if the cluster has none
     if not thread:
         thread = Thread(
             thread_id=str(uuid.uuid4()),
@@ -599,6 +678,41 @@ async def assign_cluster(
     )
     db.add(audit)
     
+    return thread
+
+
+@router.post("/cluster/{cluster_id}/assign")
+async def assign_cluster(
+    cluster_id: str,
+    crew_id: int,
+    notes: str = None,
+    password: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Assign a crew to a cluster.
+    Updates cluster SLA and creates thread for communication.
+    """
+    verify_admin_password(password)
+    
+    from app.models import Crew, Thread
+    
+    # Find cluster
+    cluster = db.query(Cluster).filter(
+        (Cluster.cluster_id == cluster_id) | (Cluster.id == int(cluster_id) if cluster_id.isdigit() else False)
+    ).first()
+    
+    if not cluster:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    
+    # Find crew
+    crew = db.query(Crew).filter(Crew.id == crew_id).first()
+    if not crew:
+        raise HTTPException(status_code=404, detail="Crew not found")
+    
+    thread = db.query(Thread).filter(Thread.cluster_id == cluster.id).first()
+    thread = _assign_crew(db, cluster, crew, thread, notes)
+    
     db.commit()
     
     return {
@@ -611,6 +725,43 @@ async def assign_cluster(
     }
 
 
+@router.post("/dispatch/batch")
+async def batch_dispatch(
+    apply: bool = False,
+    password: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Globally optimal crew assignment for every pending, unassigned cluster at once.
+    No crew is planned beyond its free capacity (see app.dispatch).
+    With apply=true the plan is committed, each pair as /cluster/{id}/assign would.
+    """
+    verify_admin_password(password)
+    
+    from app.models import Crew, Thread
+    from app.dispatch import plan_dispatch
+    
+    plan = plan_dispatch(db)
+    plan["applied"] = False
+    if not apply or not plan["assignments"]:
+        return plan
+    
+    cluster_ids = [a["cluster_id"] for a in plan["assignments"]]
+    clusters = {c.cluster_id: c for c in db.query(Cluster).filter(Cluster.cluster_id.in_(cluster_ids))}
+    crews = {c.id: c for c in db.query(Crew).filter(Crew.id.in_({a["crew_id"] for a in plan["assignments"]}))}
+    threads = {t.cluster_id: t for t in db.query(Thread).filter(Thread.cluster_id.in_([c.id for c in clusters.values()]))}
+    
+    for a in plan["assignments"]:
+        cluster = clusters[a["cluster_id"]]
+        thread = _assign_crew(db, cluster, crews[a["crew_id"]], threads.get(cluster.id), notes="batch dispatch")
+        a["thread_id"] = thread.thread_id
+        a["sla_deadline"] = cluster.sla_deadline.isoformat() if cluster.sla_deadline else None
+    
+    db.commit()
+    plan["applied"] = True
+    return plan
+
+
 @router.get("/cluster/{cluster_id}/explain")
 async def explain_cluster(
     cluster_id: str,
@@ -688,21 +839,40 @@ async def explain_cluster(
     sla_status = compute_cluster_sla_status(cluster)
     hours_open = get_hours_open(cluster.created_at, cluster.resolved_at)
     cost_info = compute_cost_of_delay(cluster.intent, cluster.size or 1, hours_open, cluster.resolved_at is not None)
+    if cluster.cost_checkpoint_at is not None:
+        # Running accumulator: accounts for size/intent changes over the cluster's life
+        cost_info['total_cost'] = round(cost_at(
+            cluster.cost_estimate, cluster.cost_hourly_rate, cluster.cost_checkpoint_at, datetime.utcnow()
+        ), 2)
+        cost_info['hourly_rate'] = round(cluster.cost_hourly_rate or 0, 2)
     
     # Suggested actions
     suggested_actions = []
     if not cluster.assigned_crew_id:
-        # Find suitable crews
-        suitable_specialty = cluster.intent.replace('_outage', '').replace('_', ' ')
-        available_crews = db.query(Crew).filter(
-            Crew.current_status == "available"
-        ).limit(3).all()
+        # Nearest available crews, preferring the matching specialty
+        if cluster.center_latitude is not None and cluster.center_longitude is not None:
+            from app.crew_index import crew_index, specialty_for_intent
+            
+            location = (cluster.center_latitude, cluster.center_longitude)
+            matches = crew_index.nearest(*location, k=3, specialty=specialty_for_intent(cluster.intent))
+            if len(matches) < 3:
+                seen = {c.id for c, _ in matches}
+                matches += [m for m in crew_index.nearest(*location, k=3 + len(seen)) if m[0].id not in seen]
+            suggested_crews = [
+                {"id": c.id, "name": c.name, "specialty": c.specialty, "distance_km": round(meters / 1000, 2)}
+                for c, meters in matches[:3]
+            ]
+        else:
+            suggested_crews = [
+                {"id": c.id, "name": c.name, "specialty": c.specialty, "distance_km": None}
+                for c in db.query(Crew).filter(Crew.current_status == "available").limit(3)
+            ]
         
-        if available_crews:
+        if suggested_crews:
             suggested_actions.append({
                 "action": "assign_crew",
                 "description": f"Assign to available crew",
-                "suggested_crews": [{"id": c.id, "name": c.name, "specialty": c.specialty} for c in available_crews],
+                "suggested_crews": suggested_crews,
             })
     
     if sla_status['is_breached']:
@@ -776,3 +946,94 @@ async def get_audit_logs(
         "count": len(logs),
         "timestamp": datetime.utcnow().isoformat(),
     }
+
+
+# ============== RECEIPT CHAIN AUDIT ==============
+
+@router.get("/chain-audit")
+async def run_chain_audit(
+    kiosk_id: Optional[str] = None,
+    workers: Optional[int] = None,
+    password: str = None,
+):
+    """
+    Verify kiosk receipt hash chains end to end.
+    Streams every link, reports the first break per kiosk and throughput in receipts/s.
+    Omit kiosk_id to audit all kiosks in parallel.
+    """
+    verify_admin_password(password)
+    
+    from app.chain_audit import audit_chains
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, audit_chains, [kiosk_id] if kiosk_id else None, workers)
+
+
+# ============== LIVE DASHBOARD STREAM ==============
+
+# Comment frame sent when no events are flowing so proxies keep the connection open
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/stream")
+async def stream_dashboard(
+    request: Request,
+    password: str = None,
+):
+    """
+    Server-Sent Events feed for the admin dashboard.
+    Events: metrics, submissions, clusters, sla_breaches, and resync (refetch full state).
+    Deltas are computed once per tick and shared by all connected dashboards.
+    """
+    verify_admin_password(password)
+    
+    async def events():
+        queue = dashboard_feed.subscribe()
+        try:
+            yield f"retry: {STREAM_KEEPALIVE_SECONDS * 1000}\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            dashboard_feed.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============== SCHEDULER ==============
+
+@router.get("/scheduler")
+async def get_scheduler_status(password: str = None):
+    """
+    Periodic job scheduler: which worker holds the leader lease, when it last
+    heartbeated, and run counts, failures and durations per job.
+    """
+    verify_admin_password(password)
+    
+    from app.scheduler import job_scheduler
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, job_scheduler.status)
+
+
+@router.get("/broadcast")
+async def get_broadcast_status(password: str = None):
+    """
+    WebSocket fan-out on this worker: backend in use, open subscriptions,
+    slow consumers dropped, and publish-to-send latency percentiles.
+    """
+    verify_admin_password(password)
+    
+    from app.broadcast import broadcaster
+    
+    return broadcaster.stats()
@@ -3,11 +3,14 @@ AI Alerts router for predictive analytics and smart notifications.
 """
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import Optional
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import Submission, Cluster
+from app.models import Submission, Cluster, SubmissionRollupHourly, ClusterRollupHourly
+from app.rollups import floor_hour
+from app.cache import cached
 from app.services.predictions import prediction_service
 
 router = APIRouter(prefix="/ai-alerts", tags=["ai-alerts"])
@@ -55,6 +58,7 @@ async def get_outbreak_alerts(
 
 
 @router.get("/forecast")
+@cached("forecast", ttl=300)
 async def get_demand_forecast(
     ward: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -85,6 +89,7 @@ async def get_smart_dispatch_recommendations(
     """
     Get AI-powered dispatch recommendations.
     Suggests optimal crew assignments based on location, skill, and urgency.
+    Crews are found with k-nearest lookups on the in-memory crew index.
     """
     now = datetime.utcnow()
     
@@ -92,54 +97,56 @@ async def get_smart_dispatch_recommendations(
     unassigned = db.query(Cluster).filter(
         Cluster.status == "pending",
         Cluster.assigned_crew_id == None
-    ).all()
+    )
     
-    # Get available crews
     from app.models import Crew
-    available = db.query(Crew).filter(Crew.current_status == "available").all()
+    from app.crew_index import crew_index, specialty_for_intent
+    available_count = db.query(Crew).filter(Crew.current_status == "available").count()
     
     recommendations = []
     
-    for cluster in unassigned[:10]:  # Top 10 recommendations
-        # Find best crew match
-        best_crew = None
-        best_score = 0
+    for cluster in unassigned.limit(10).all():  # Top 10 recommendations
+        if cluster.center_latitude is None or cluster.center_longitude is None:
+            continue  # No location to measure travel distance from
         
-        for crew in available:
-            score = 0
-            # Skill match
-            if crew.specialty == cluster.intent:
-                score += 50
-            # Priority boost
-            if cluster.priority == "urgent":
-                score += 30
-            elif cluster.priority == "high":
-                score += 20
-            # Random jitter for variety
-            import random
-            score += random.randint(0, 10)
-            
-            if score > best_score:
-                best_score = score
-                best_crew = crew
+        # Nearest available crew with the matching skill, else the nearest at all
+        specialty = specialty_for_intent(cluster.intent)
+        matches = crew_index.nearest(cluster.center_latitude, cluster.center_longitude, k=1, specialty=specialty)
+        skill_match = bool(matches)
+        if not matches:
+            matches = crew_index.nearest(cluster.center_latitude, cluster.center_longitude, k=1)
+        if not matches:
+            continue
+        best_crew, meters = matches[0]
+        distance_km = meters / 1000
         
-        if best_crew:
-            recommendations.append({
-                "cluster_id": cluster.cluster_id,
-                "cluster_intent": cluster.intent,
-                "cluster_ward": cluster.ward,
-                "cluster_priority": cluster.priority,
-                "cluster_size": cluster.size,
-                "recommended_crew_id": best_crew.id,
-                "recommended_crew_name": best_crew.name,
-                "match_score": best_score,
-                "reason": f"Best skill match for {cluster.intent}",
-            })
+        score = 50 if skill_match else 0
+        # Priority boost
+        if cluster.priority == "urgent":
+            score += 30
+        elif cluster.priority == "high":
+            score += 20
+        # Closer crews score higher, up to 20 points
+        score += max(0.0, 20 - distance_km)
+        
+        recommendations.append({
+            "cluster_id": cluster.cluster_id,
+            "cluster_intent": cluster.intent,
+            "cluster_ward": cluster.ward,
+            "cluster_priority": cluster.priority,
+            "cluster_size": cluster.size,
+            "recommended_crew_id": best_crew.id,
+            "recommended_crew_name": best_crew.name,
+            "distance_km": round(distance_km, 2),
+            "match_score": round(score, 1),
+            "reason": (f"Nearest {specialty} crew, {distance_km:.1f} km away" if skill_match
+                       else f"No {specialty} crew available; nearest crew is {distance_km:.1f} km away"),
+        })
     
     return {
         "recommendations": recommendations,
-        "unassigned_count": len(unassigned),
-        "available_crews": len(available),
+        "unassigned_count": unassigned.count(),
+        "available_crews": available_count,
         "generated_at": now.isoformat(),
     }
 
@@ -152,8 +159,12 @@ async def ai_health_check(db: Session = Depends(get_db)):
     now = datetime.utcnow()
     day_ago = now - timedelta(days=1)
     
-    submissions_24h = db.query(Submission).filter(Submission.created_at >= day_ago).count()
-    active_clusters = db.query(Cluster).filter(Cluster.status != "resolved").count()
+    submissions_24h = db.query(func.sum(SubmissionRollupHourly.count)).filter(
+        SubmissionRollupHourly.hour >= floor_hour(day_ago)
+    ).scalar() or 0
+    active_clusters = db.query(func.sum(ClusterRollupHourly.count)).filter(
+        ClusterRollupHourly.status != "resolved"
+    ).scalar() or 0
     
     return {
         "status": "healthy",
@@ -3,15 +3,21 @@ Crew router for field crew management and status updates.
 Implements the Field Crew Mobile App backend.
 """
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
+import time
 import uuid
 
 from app.database import get_db
 from app.models import Crew, Cluster, Thread, Message, AuditLog
-from app.schemas import CrewCreate, CrewResponse, CrewStatusUpdate
+from app.schemas import CrewCreate, CrewResponse, CrewStatusUpdate, CrewLocationBatch, CrewTrackPoint
 from app.config import settings
+from app.broadcast import broadcaster
+from app.crew_tracking import MAX_PINGS_PER_BATCH, crew_tracker, ping_time
+from app.routers.threads import message_payload, message_reference, thread_channel
 
 router = APIRouter(prefix="/crews", tags=["crews"])
 
@@ -77,6 +83,39 @@ async def create_crew(
     return crew
 
 
+@router.post("/location")
+async def ingest_crew_locations(
+    batch: CrewLocationBatch,
+    db: Session = Depends(get_db)
+):
+    """
+    Live GPS pings from the crew mobile app, sent in batches every few seconds.
+    Positions are coalesced in memory and written in bulk (see app.crew_tracking);
+    pings with unknown crews or impossible coordinates are skipped. Timestamps ahead of
+    the server clock (a phone with a fast clock) are clamped to the time of receipt.
+    """
+    if len(batch.pings) > MAX_PINGS_PER_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PINGS_PER_BATCH} pings per batch")
+    
+    crew_ids = {ping.crew_id for ping in batch.pings}
+    crew_pks = crew_tracker.resolve(db, crew_ids)
+    
+    received_at = time.time()
+    accepted = 0
+    for ping in batch.pings:
+        crew_pk = crew_pks.get(ping.crew_id)
+        if crew_pk is None or not (-90 <= ping.latitude <= 90 and -180 <= ping.longitude <= 180):
+            continue
+        crew_tracker.record(crew_pk, min(ping_time(ping.recorded_at), received_at), ping.latitude, ping.longitude)
+        accepted += 1
+    
+    return {
+        "accepted": accepted,
+        "rejected": len(batch.pings) - accepted,
+        "unknown_crews": sorted(crew_ids - crew_pks.keys()),
+    }
+
+
 @router.get("/{crew_id}", response_model=CrewResponse)
 async def get_crew(
     crew_id: str,
@@ -93,6 +132,27 @@ async def get_crew(
     return crew
 
 
+@router.get("/{crew_id}/track", response_model=List[CrewTrackPoint])
+async def get_crew_track(
+    crew_id: str,
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Recent positions from live tracking, oldest first, for track playback."""
+    crew = db.query(Crew).filter(
+        (Crew.crew_id == crew_id) | (Crew.id == int(crew_id) if crew_id.isdigit() else False)
+    ).first()
+    
+    if not crew:
+        raise HTTPException(status_code=404, detail="Crew not found")
+    
+    points = crew_tracker.track(crew.id, ping_time(since) if since else None)
+    return [
+        {"recorded_at": datetime.fromtimestamp(at, timezone.utc), "latitude": lat, "longitude": lng}
+        for at, lat, lng in points
+    ]
+
+
 @router.post("/{crew_id}/status", response_model=CrewResponse)
 async def update_crew_status(
     crew_id: str,
@@ -118,57 +178,54 @@ async def update_crew_status(
         crew.current_latitude = status_update.latitude
     if status_update.longitude:
         crew.current_longitude = status_update.longitude
+    if status_update.latitude or status_update.longitude:
+        # This position is newer than any buffered live-tracking ping
+        crew_tracker.forget(crew.id)
     if status_update.photo_url:
         crew.photo_url = status_update.photo_url
     
-    # If crew resolved, update assigned clusters
-    if status_update.status == "resolved":
-        assigned_clusters = db.query(Cluster).filter(
-            Cluster.assigned_crew_id == crew.id,
-            Cluster.resolved_at.is_(None)
-        ).all()
+    # Assigned clusters and their threads in one query
+    thread_updates = []
+    if status_update.status in ["resolved", "enroute", "onsite"]:
+        query = db.query(Cluster, Thread.id, Thread.thread_id).outerjoin(
+            Thread, Thread.cluster_id == Cluster.id
+        ).filter(Cluster.assigned_crew_id == crew.id)
+        if status_update.status == "resolved":
+            query = query.filter(Cluster.resolved_at.is_(None))
+        assigned = query.all()
         
-        for cluster in assigned_clusters:
-            cluster.resolved_at = datetime.utcnow()
-            cluster.sla_breached = False  # Clear breach if resolved
-            
-            # Add resolution message to thread
-            thread = db.query(Thread).filter(Thread.cluster_id == cluster.id).first()
-            if thread:
-                resolution_msg = Message(
-                    thread_id=thread.id,
-                    author_type="crew",
-                    author_id=crew.crew_id,
-                    author_name=crew.name,
-                    content=f"Issue resolved. {status_update.notes or 'Work completed.'}",
-                    message_type="status_update",
-                    message_metadata={"photo_url": status_update.photo_url} if status_update.photo_url else None,
-                )
-                db.add(resolution_msg)
-    
-    # If enroute or onsite, add status update to threads
-    elif status_update.status in ["enroute", "onsite"]:
-        assigned_clusters = db.query(Cluster).filter(
-            Cluster.assigned_crew_id == crew.id
-        ).all()
-        
-        status_messages = {
-            "enroute": f"Crew {crew.name} is on the way to the location.",
-            "onsite": f"Crew {crew.name} has arrived at the location and is working on the issue.",
-        }
+        if status_update.status == "resolved":
+            # If crew resolved, update assigned clusters
+            for cluster, _, _ in assigned:
+                cluster.resolved_at = datetime.utcnow()
+                cluster.sla_breached = False  # Clear breach if resolved
+            content = f"Issue resolved. {status_update.notes or 'Work completed.'}"
+            metadata = {"photo_url": status_update.photo_url} if status_update.photo_url else None
+        else:
+            status_messages = {
+                "enroute": f"Crew {crew.name} is on the way to the location.",
+                "onsite": f"Crew {crew.name} has arrived at the location and is working on the issue.",
+            }
+            content = status_messages.get(status_update.status, f"Status: {status_update.status}")
+            metadata = None
         
-        for cluster in assigned_clusters:
-            thread = db.query(Thread).filter(Thread.cluster_id == cluster.id).first()
-            if thread:
-                status_msg = Message(
-                    thread_id=thread.id,
-                    author_type="crew",
-                    author_id=crew.crew_id,
-                    author_name=crew.name,
-                    content=status_messages.get(status_update.status, f"Status: {status_update.status}"),
-                    message_type="status_update",
-                )
-                db.add(status_msg)
+        threads = {thread_pk: thread_uuid for _, thread_pk, thread_uuid in assigned if thread_pk}
+        if threads:
+            # One bulk INSERT ... RETURNING for every thread's status message
+            messages = db.scalars(insert(Message).returning(Message), [
+                {
+                    "thread_id": thread_pk,
+                    "author_type": "crew",
+                    "author_id": crew.crew_id,
+                    "author_name": crew.name,
+                    "content": content,
+                    "message_type": "status_update",
+                    "message_metadata": metadata,
+                }
+                for thread_pk in threads
+            ]).all()
+            # Payloads are built before commit expires the rows
+            thread_updates = [(threads[m.thread_id], message_payload(m), message_reference(m)) for m in messages]
     
     # Audit log
     create_audit_log(
@@ -179,6 +236,15 @@ async def update_crew_status(
     db.commit()
     db.refresh(crew)
     
+    # Live delivery to thread WebSockets on every worker; best-effort, the update is committed
+    if thread_updates:
+        results = await asyncio.gather(*(
+            broadcaster.publish(thread_channel(thread_uuid), payload, reference)
+            for thread_uuid, payload, reference in thread_updates
+        ), return_exceptions=True)
+        for error in (r for r in results if isinstance(r, Exception)):
+            print(f"❌ Crew Status Broadcast Error: {error}")
+    
     return crew
 
 
@@ -4,144 +4,42 @@ Points, badges, leaderboards, and achievement system.
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import User, Submission, Receipt
+from app.models import User, Submission, Receipt, SubmissionRollupHourly, CitizenScore
+from app.rollups import floor_hour
+from app.cache import cached
+from app.citizen_scores import (
+    BADGES, badges_from_mask, calculate_earned_badges, calculate_total_points, current_streak, recent_count,
+)
 
 router = APIRouter(prefix="/gamification", tags=["gamification"])
 
-# Badge definitions
-BADGES = {
-    "first_report": {
-        "id": "first_report",
-        "name": "First Voice",
-        "description": "Submitted your first complaint",
-        "icon": "🎤",
-        "points": 50,
-        "condition": lambda stats: stats["total_submissions"] >= 1
-    },
-    "neighborhood_hero": {
-        "id": "neighborhood_hero",
-        "name": "Neighborhood Hero",
-        "description": "5 complaints resolved in your ward",
-        "icon": "🦸",
-        "points": 200,
-        "condition": lambda stats: stats["resolved_count"] >= 5
-    },
-    "quick_responder": {
-        "id": "quick_responder",
-        "name": "Quick Responder",
-        "description": "Reported 3 issues within 24 hours",
-        "icon": "⚡",
-        "points": 100,
-        "condition": lambda stats: stats["submissions_24h"] >= 3
-    },
-    "photo_pro": {
-        "id": "photo_pro",
-        "name": "Photo Pro",
-        "description": "Attached photos to 5 complaints",
-        "icon": "📸",
-        "points": 75,
-        "condition": lambda stats: stats["with_photos"] >= 5
-    },
-    "verified_citizen": {
-        "id": "verified_citizen",
-        "name": "Verified Citizen",
-        "description": "Phone number verified",
-        "icon": "✓",
-        "points": 25,
-        "condition": lambda stats: stats["is_verified"]
-    },
-    "community_voice": {
-        "id": "community_voice",
-        "name": "Community Voice",
-        "description": "10 total submissions",
-        "icon": "📢",
-        "points": 150,
-        "condition": lambda stats: stats["total_submissions"] >= 10
-    },
-    "impact_maker": {
-        "id": "impact_maker",
-        "name": "Impact Maker",
-        "description": "Joined 3 existing complaints",
-        "icon": "🤝",
-        "points": 100,
-        "condition": lambda stats: stats["joined_count"] >= 3
-    },
-    "streak_master": {
-        "id": "streak_master",
-        "name": "Streak Master",
-        "description": "Active for 7 consecutive days",
-        "icon": "🔥",
-        "points": 300,
-        "condition": lambda stats: stats["streak_days"] >= 7
-    },
-}
 
-def calculate_user_stats(db: Session, user_id: int) -> dict:
-    """Calculate gamification stats for a user."""
+def calculate_user_stats(db: Session, user_id: int, score: Optional[CitizenScore] = None) -> dict:
+    """Gamification stats for a user, read from their city-wide citizen_scores row."""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return {}
-    
-    submissions = db.query(Submission).filter(Submission.user_id == user_id).all()
+    if score is None:
+        score = db.query(CitizenScore).filter(
+            CitizenScore.user_id == user_id, CitizenScore.ward == ""
+        ).first()
     
     now = datetime.utcnow()
-    day_ago = now - timedelta(days=1)
-    week_ago = now - timedelta(days=7)
-    
-    resolved = [s for s in submissions if s.status == "resolved"]
-    recent_24h = [s for s in submissions if s.created_at and s.created_at > day_ago]
-    with_photos = [s for s in submissions if s.uploaded_files]
-    
-    # Calculate streak (simplified)
-    dates_active = set()
-    for s in submissions:
-        if s.created_at:
-            dates_active.add(s.created_at.date())
-    
-    streak = 0
-    check_date = now.date()
-    while check_date in dates_active:
-        streak += 1
-        check_date -= timedelta(days=1)
-    
     return {
-        "total_submissions": len(submissions),
-        "resolved_count": len(resolved),
-        "submissions_24h": len(recent_24h),
-        "with_photos": len(with_photos),
+        "total_submissions": score.submissions if score else 0,
+        "resolved_count": score.resolved if score else 0,
+        "submissions_24h": recent_count(score.recent_submissions, now - timedelta(days=1)) if score else 0,
+        "with_photos": score.with_photos if score else 0,
         "is_verified": user.phone is not None,
-        "joined_count": 0,  # Would need separate tracking
-        "streak_days": streak,
+        "joined_count": score.joined if score else 0,
+        "streak_days": current_streak(score.streak_days, score.last_active_date, now.date()) if score else 0,
     }
 
-def calculate_earned_badges(stats: dict) -> List[dict]:
-    """Determine which badges a user has earned."""
-    earned = []
-    for badge_id, badge in BADGES.items():
-        if badge["condition"](stats):
-            earned.append({
-                "id": badge["id"],
-                "name": badge["name"],
-                "description": badge["description"],
-                "icon": badge["icon"],
-                "points": badge["points"],
-                "earned": True
-            })
-    return earned
-
-def calculate_total_points(badges: List[dict], stats: dict) -> int:
-    """Calculate total points from badges and activities."""
-    badge_points = sum(b["points"] for b in badges)
-    activity_points = stats.get("total_submissions", 0) * 10  # 10 pts per submission
-    activity_points += stats.get("resolved_count", 0) * 25  # 25 pts per resolution
-    return badge_points + activity_points
-
-
 @router.get("/profile/{user_id}")
 async def get_citizen_profile(user_id: int, db: Session = Depends(get_db)):
     """Get complete gamification profile for a citizen."""
@@ -149,8 +47,12 @@ async def get_citizen_profile(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    stats = calculate_user_stats(db, user_id)
-    badges = calculate_earned_badges(stats)
+    # One row lookup, however many submissions the citizen has filed
+    score = db.query(CitizenScore).filter(
+        CitizenScore.user_id == user_id, CitizenScore.ward == ""
+    ).first()
+    stats = calculate_user_stats(db, user_id, score)
+    badges = badges_from_mask(score.badges) if score else calculate_earned_badges(stats)
     total_points = calculate_total_points(badges, stats)
     
     # Determine level based on points
@@ -180,41 +82,31 @@ async def get_citizen_profile(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/leaderboard")
+@cached("gamification", ttl=30)
 async def get_leaderboard(
     ward: Optional[str] = None,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Get ward or city-wide leaderboard."""
-    # Get users with most submissions
-    query = db.query(
-        Submission.user_id,
-        func.count(Submission.id).label("submission_count"),
-        func.count(func.nullif(Submission.status != "resolved", True)).label("resolved_count")
-    ).group_by(Submission.user_id)
-    
-    if ward:
-        query = query.filter(Submission.ward == ward)
-    
-    results = query.order_by(func.count(Submission.id).desc()).limit(limit).all()
+    # One indexed scan of the score projection (ix_citizen_scores_ward_points)
+    results = db.query(CitizenScore, User.citizen_id_masked).join(
+        User, User.id == CitizenScore.user_id
+    ).filter(
+        CitizenScore.ward == (ward or "")
+    ).order_by(CitizenScore.points.desc(), CitizenScore.user_id).limit(limit).all()
     
     leaderboard = []
-    for rank, (user_id, sub_count, res_count) in enumerate(results, 1):
-        user = db.query(User).filter(User.id == user_id).first()
-        stats = {"total_submissions": sub_count, "resolved_count": res_count, 
-                 "submissions_24h": 0, "with_photos": 0, "is_verified": True, 
-                 "joined_count": 0, "streak_days": 0}
-        badges = calculate_earned_badges(stats)
-        points = calculate_total_points(badges, stats)
-        
+    for rank, (score, citizen_id_masked) in enumerate(results, 1):
+        badges = badges_from_mask(score.badges)
         leaderboard.append({
             "rank": rank,
-            "user_id": user_id,
-            "display_name": f"Citizen #{user_id}",
-            "phone_masked": user.citizen_id_masked if user else f"****{user_id}",
-            "points": points,
-            "submissions": sub_count,
-            "resolved": res_count,
+            "user_id": score.user_id,
+            "display_name": f"Citizen #{score.user_id}",
+            "phone_masked": citizen_id_masked or f"****{score.user_id}",
+            "points": score.points,
+            "submissions": score.submissions,
+            "resolved": score.resolved,
             "top_badge": badges[0] if badges else None,
         })
     
@@ -226,18 +118,24 @@ async def get_leaderboard(
 
 
 @router.get("/stats/city")
+@cached("gamification", ttl=30)
 async def get_city_stats(db: Session = Depends(get_db)):
     """Get city-wide gamification stats for public display."""
     now = datetime.utcnow()
     week_ago = now - timedelta(days=7)
     month_ago = now - timedelta(days=30)
     
-    total_submissions = db.query(Submission).count()
-    total_resolved = db.query(Submission).filter(Submission.status == "resolved").count()
-    week_resolved = db.query(Submission).filter(
-        Submission.status == "resolved",
-        Submission.updated_at >= week_ago
-    ).count()
+    # Counts from hourly rollups; week_resolved = resolved submissions created this week
+    rollup = SubmissionRollupHourly
+    is_resolved = rollup.status == "resolved"
+    counts = db.query(
+        func.sum(rollup.count).label("total"),
+        func.sum(case((is_resolved, rollup.count), else_=0)).label("resolved"),
+        func.sum(case((and_(is_resolved, rollup.hour >= floor_hour(week_ago)), rollup.count), else_=0)).label("week_resolved"),
+    ).one()
+    total_submissions = counts.total or 0
+    total_resolved = counts.resolved or 0
+    week_resolved = counts.week_resolved or 0
     
     total_citizens = db.query(User).count()
     active_citizens = db.query(func.distinct(Submission.user_id)).filter(
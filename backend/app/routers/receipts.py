@@ -1,25 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import Receipt, Submission
+from app.models import Receipt, Submission, KioskChainHead
 from app.schemas import ReceiptVerifyResponse
-from app.receipt import compute_receipt_hash
+from app.receipt import compute_receipt_hash, build_receipt_payload, batch_anchor_payload
+from app.merkle import verify_inclusion
 from app.routers.routing import get_routing_info
 import json
 
 router = APIRouter(prefix="/receipt", tags=["receipts"])
 
 
+def load_receipt_for_verification(db: Session, *criteria):
+    """
+    Fetch receipt, submission and the kiosk's chain length in one indexed round trip.
+    Returns (receipt, submission, chain_length) or None.
+    """
+    return db.query(Receipt, Submission, KioskChainHead.sequence).outerjoin(
+        Submission, Submission.id == Receipt.submission_id
+    ).outerjoin(
+        KioskChainHead, KioskChainHead.kiosk_id == Receipt.kiosk_id
+    ).filter(*criteria).first()
+
+
 @router.get("/verify-shortcode/{short_code}", response_model=ReceiptVerifyResponse)
 async def verify_receipt_by_shortcode(short_code: str, db: Session = Depends(get_db)):
     """
     Verify receipt hash chain integrity using short code.
     """
-    receipt = db.query(Receipt).filter(Receipt.short_code == short_code).first()
-    if not receipt:
+    row = load_receipt_for_verification(db, Receipt.short_code == short_code)
+    if not row:
         raise HTTPException(status_code=404, detail="Short code not found")
     
-    return await verify_receipt(receipt.receipt_id, db)
+    return verify_loaded_receipt(db, *row)
 
 @router.get("/{receipt_id}/verify", response_model=ReceiptVerifyResponse)
 async def verify_receipt(receipt_id: str, db: Session = Depends(get_db)):
@@ -27,21 +40,22 @@ async def verify_receipt(receipt_id: str, db: Session = Depends(get_db)):
     Verify receipt hash chain integrity.
     Returns verification status and chain position.
     """
-    receipt = db.query(Receipt).filter(Receipt.receipt_id == receipt_id).first()
-    if not receipt:
+    row = load_receipt_for_verification(db, Receipt.receipt_id == receipt_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Receipt not found")
     
-    # Get submission
-    submission = db.query(Submission).filter(Submission.id == receipt.submission_id).first()
+    return verify_loaded_receipt(db, *row)
+
+def verify_loaded_receipt(db: Session, receipt: Receipt, submission: Submission, chain_length: int) -> ReceiptVerifyResponse:
+    """Re-hash one receipt; position and length come from stored sequences, not counts."""
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
     # Prepare submission JSON
-    submission_json = {
-        "id": submission.id,
-        "intent": submission.intent,
-        "text": submission.text
-    }
+    submission_json = build_receipt_payload(submission)
+    
+    if receipt.batch_id:
+        return verify_batched_receipt(db, receipt, submission_json, chain_length or 0)
     
     # Recompute hash
     computed_hash = compute_receipt_hash(submission_json, receipt.prev_hash)
@@ -49,24 +63,56 @@ async def verify_receipt(receipt_id: str, db: Session = Depends(get_db)):
     # Verify
     verification = "OK" if computed_hash == receipt.receipt_hash else "FAIL"
     
-    # Calculate chain position and length for same kiosk
-    chain_position = db.query(Receipt).filter(
-        Receipt.kiosk_id == receipt.kiosk_id,
-        Receipt.created_at < receipt.created_at
-    ).count() + 1
-    chain_length = db.query(Receipt).filter(Receipt.kiosk_id == receipt.kiosk_id).count()
+    chain_position = receipt.sequence
+    if chain_position is None:
+        # Receipt predates sequence numbers and was never backfilled
+        chain_position = db.query(Receipt).filter(
+            Receipt.kiosk_id == receipt.kiosk_id,
+            Receipt.batch_id.is_(None),
+            Receipt.created_at < receipt.created_at
+        ).count() + 1
 
     return ReceiptVerifyResponse(
-        receipt_id=receipt_id,
+        receipt_id=receipt.receipt_id,
         verification=verification,
         verified=(computed_hash == receipt.receipt_hash),
         chain_position=chain_position,
-        chain_length=chain_length,
+        chain_length=max(chain_length or 0, chain_position),
         receipt_hash=receipt.receipt_hash,
         chain_hash=getattr(receipt, "chain_hash", receipt.receipt_hash),
         prev_hash=receipt.prev_hash
     )
 
+def verify_batched_receipt(db: Session, receipt: Receipt, submission_json: dict, chain_length: int) -> ReceiptVerifyResponse:
+    """
+    Verify a Merkle-mode receipt in O(log n):
+    leaf hash -> inclusion proof -> batch root -> batch anchor link in the kiosk chain.
+    Read-only: batches are sealed by the scheduled receipt_batches job.
+    """
+    batch = receipt.batch
+    
+    if batch.status != "sealed" or receipt.leaf_index is None:
+        verification = "PENDING_BATCH"
+    else:
+        leaf_ok = compute_receipt_hash(submission_json, None) == receipt.receipt_hash
+        included = verify_inclusion(receipt.receipt_hash, receipt.merkle_proof or [], batch.merkle_root)
+        anchored = compute_receipt_hash(batch_anchor_payload(batch), batch.prev_hash) == batch.anchor_hash
+        verification = "OK" if (leaf_ok and included and anchored) else "FAIL"
+    
+    return ReceiptVerifyResponse(
+        receipt_id=receipt.receipt_id,
+        verification=verification,
+        verified=(verification == "OK"),
+        chain_position=batch.sequence or 0,
+        chain_length=max(chain_length, batch.sequence or 0),
+        receipt_hash=receipt.receipt_hash,
+        chain_hash=batch.anchor_hash,
+        prev_hash=batch.prev_hash,
+        chain_mode="merkle",
+        merkle_root=batch.merkle_root,
+        merkle_proof=receipt.merkle_proof,
+    )
+
 @router.get("/by-submission/{submission_id}")
 async def get_receipt_by_submission(submission_id: int, db: Session = Depends(get_db)):
     """Get receipt for a submission (used after join flow)."""
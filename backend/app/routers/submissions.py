@@ -4,7 +4,10 @@ from typing import Optional
 from app.database import get_db
 from app.models import Submission, Receipt, User, PredictedEvent
 from app.schemas import SubmissionCreate, SubmissionResponse, ReceiptResponse
-from app.receipt import compute_receipt_hash, get_prev_hash, generate_receipt_id, generate_short_code, create_qr_data
+from app.receipt import (
+    append_to_chain, ChainConflictError, build_receipt_payload, get_open_batch,
+    compute_receipt_hash, generate_receipt_id, generate_short_code, create_qr_data
+)
 from app.auth import verify_token, get_current_user
 from app.config import settings
 import json
@@ -119,18 +122,19 @@ async def create_submission(
         db_submission.predicted_event_id = event.id
     
     # Prepare submission JSON for hash
-    submission_json = {
-        "id": db_submission.id,
-        "intent": db_submission.intent,
-        "text": db_submission.text,
-        "created_at": db_submission.created_at.isoformat() if db_submission.created_at else None
-    }
+    submission_json = build_receipt_payload(db_submission)
     
-    # Get previous hash for this kiosk
-    prev_hash = get_prev_hash(db, kiosk_id)
-    
-    # Compute receipt hash
-    receipt_hash = compute_receipt_hash(submission_json, prev_hash)
+    batch = get_open_batch(db, kiosk_id) if settings.RECEIPT_CHAIN_MODE == "merkle" else None
+    if batch:
+        # Leaf of this window's Merkle batch - anchored into the chain when the batch seals
+        receipt_hash, prev_hash, sequence = compute_receipt_hash(submission_json, None), None, None
+    else:
+        # Extend this kiosk's hash chain (locks the kiosk head until commit)
+        try:
+            receipt_hash, prev_hash, sequence = append_to_chain(db, kiosk_id, submission_json)
+        except ChainConflictError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Receipt chain busy, please retry")
     
     # Generate receipt ID and short_code
     receipt_id = generate_receipt_id()
@@ -143,7 +147,9 @@ async def create_submission(
         submission_id=db_submission.id,
         receipt_hash=receipt_hash,
         prev_hash=prev_hash,
-        kiosk_id=kiosk_id
+        kiosk_id=kiosk_id,
+        sequence=sequence,
+        batch_id=batch.id if batch else None
     )
     db.add(receipt)
     db.commit()
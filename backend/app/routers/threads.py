@@ -3,7 +3,9 @@ Threading router for two-way case management communication.
 Enables admin ↔ citizen chat for complaint resolution.
 """
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List, Optional
 from datetime import datetime
 import uuid
@@ -13,14 +15,16 @@ import asyncio
 from app.database import get_db
 from app.models import Thread, Message, Cluster, Submission, AuditLog
 from app.schemas import (
-    ThreadCreate, ThreadResponse, MessageCreate, MessageResponse
+    ThreadCreate, ThreadResponse, MessageCreate, MessageResponse, MessagePage
 )
 from app.config import settings
+from app.broadcast import broadcaster
 
 router = APIRouter(prefix="/threads", tags=["threads"])
 
-# Store active WebSocket connections per thread
-active_connections: dict[str, List[WebSocket]] = {}
+# Messages per history page, and served inline with a thread
+MESSAGE_PAGE_DEFAULT = 50
+MESSAGE_PAGE_MAX = 200
 
 
 def create_audit_log(db: Session, action: str, resource_type: str, resource_id: str, 
@@ -37,6 +41,51 @@ def create_audit_log(db: Session, action: str, resource_type: str, resource_id:
     db.flush()
 
 
+def _message_anchor(db: Session, thread_pk: int, message_id: int):
+    """(created_at, id) of a cursor message, as SQL expressions compared in the database."""
+    if not db.query(Message.id).filter(Message.id == message_id, Message.thread_id == thread_pk).first():
+        raise HTTPException(status_code=400, detail="Cursor message not found in this thread")
+    created_at = select(Message.created_at).where(Message.id == message_id).scalar_subquery()
+    return created_at, message_id
+
+
+def page_messages(db: Session, thread_pk: int, before: Optional[int] = None,
+                  since: Optional[int] = None, limit: int = MESSAGE_PAGE_DEFAULT) -> tuple:
+    """
+    One page of a thread's messages, oldest first, and whether there are more.
+    Default/before mode walks back from the newest message (or from `before`);
+    since mode walks forward from `since`. Keyset on (created_at, id).
+    """
+    query = db.query(Message).filter(Message.thread_id == thread_pk)
+    if since is not None:
+        created_at, message_id = _message_anchor(db, thread_pk, since)
+        query = query.filter(or_(
+            Message.created_at > created_at,
+            and_(Message.created_at == created_at, Message.id > message_id),
+        )).order_by(Message.created_at, Message.id)
+    else:
+        if before is not None:
+            created_at, message_id = _message_anchor(db, thread_pk, before)
+            query = query.filter(or_(
+                Message.created_at < created_at,
+                and_(Message.created_at == created_at, Message.id < message_id),
+            ))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return (rows if since is not None else rows[::-1]), has_more
+
+
+def with_recent_messages(db: Session, thread: Thread) -> Thread:
+    """Attach only the newest page of messages, instead of lazy-loading the full history."""
+    messages, has_more = page_messages(db, thread.id)
+    set_committed_value(thread, "messages", messages)
+    thread.has_older_messages = has_more
+    return thread
+
+
 @router.post("", response_model=ThreadResponse)
 async def create_thread(
     thread_data: ThreadCreate,
@@ -67,7 +116,7 @@ async def create_thread(
     
     if existing:
         # Return existing thread instead of creating duplicate
-        return existing
+        return with_recent_messages(db, existing)
     
     # Create new thread
     thread = Thread(
@@ -106,7 +155,7 @@ async def get_thread(
     thread_id: str,
     db: Session = Depends(get_db)
 ):
-    """Get thread with all messages."""
+    """Get thread with its newest messages (older ones via /threads/{id}/messages)."""
     thread = db.query(Thread).filter(
         (Thread.thread_id == thread_id) | (Thread.id == int(thread_id) if thread_id.isdigit() else False)
     ).first()
@@ -114,7 +163,43 @@ async def get_thread(
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    return thread
+    return with_recent_messages(db, thread)
+
+
+@router.get("/{thread_id}/messages", response_model=MessagePage)
+async def get_thread_messages(
+    thread_id: str,
+    before: Optional[int] = None,
+    since: Optional[int] = None,
+    limit: int = MESSAGE_PAGE_DEFAULT,
+    db: Session = Depends(get_db)
+):
+    """
+    Cursor-paginated message history, oldest first within a page.
+    - ?before=<message id>: the page of messages older than that message
+      (omit to start from the newest); continue with before=oldest_id while has_more.
+    - ?since=<message id>: messages newer than that one, for WebSocket clients
+      resyncing after a reconnect; continue with since=newest_id while has_more.
+    """
+    if before is not None and since is not None:
+        raise HTTPException(status_code=400, detail="Use either before or since, not both")
+    limit = max(1, min(limit, MESSAGE_PAGE_MAX))
+    
+    thread = db.query(Thread).filter(
+        (Thread.thread_id == thread_id) | (Thread.id == int(thread_id) if thread_id.isdigit() else False)
+    ).first()
+    
+    if not thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    
+    messages, has_more = page_messages(db, thread.id, before=before, since=since, limit=limit)
+    return {
+        "thread_id": thread.thread_id,
+        "messages": messages,
+        "has_more": has_more,
+        "oldest_id": messages[0].id if messages else None,
+        "newest_id": messages[-1].id if messages else None,
+    }
 
 
 @router.get("/by-cluster/{cluster_id}", response_model=Optional[ThreadResponse])
@@ -124,7 +209,7 @@ async def get_thread_by_cluster(
 ):
     """Get thread for a specific cluster."""
     thread = db.query(Thread).filter(Thread.cluster_id == cluster_id).first()
-    return thread
+    return with_recent_messages(db, thread) if thread else None
 
 
 @router.get("/by-submission/{submission_id}", response_model=Optional[ThreadResponse])
@@ -134,7 +219,7 @@ async def get_thread_by_submission(
 ):
     """Get thread for a specific submission."""
     thread = db.query(Thread).filter(Thread.submission_id == submission_id).first()
-    return thread
+    return with_recent_messages(db, thread) if thread else None
 
 
 @router.post("/{thread_id}/message", response_model=MessageResponse)
@@ -234,12 +319,13 @@ async def list_threads(
 
 
 # WebSocket for real-time updates
-async def broadcast_message(thread_id: str, message: Message):
-    """Broadcast message to all connected clients for a thread."""
-    if thread_id not in active_connections:
-        return
-    
-    message_data = {
+def thread_channel(thread_id: str) -> str:
+    return f"thread:{thread_id}"
+
+
+def message_payload(message: Message) -> dict:
+    """WebSocket event for one message."""
+    return {
         "id": message.id,
         "thread_id": message.thread_id,
         "author_type": message.author_type,
@@ -248,22 +334,24 @@ async def broadcast_message(thread_id: str, message: Message):
         "message_type": message.message_type,
         "created_at": message.created_at.isoformat() if message.created_at else None,
     }
-    
-    for connection in active_connections[thread_id]:
-        try:
-            await connection.send_json(message_data)
-        except Exception:
-            pass
+
+
+def message_reference(message: Message) -> dict:
+    """Compact stand-in for a message event too large to broadcast; clients fetch it with ?since=."""
+    payload = message_payload(message)
+    return {**{k: payload[k] for k in ("id", "thread_id", "message_type", "created_at")}, "truncated": True}
+
+
+async def broadcast_message(thread_id: str, message: Message):
+    """Broadcast message to all connected clients for a thread, on every worker."""
+    await broadcaster.publish(thread_channel(thread_id), message_payload(message), message_reference(message))
 
 
 @router.websocket("/ws/{thread_id}")
 async def websocket_thread(websocket: WebSocket, thread_id: str):
     """WebSocket endpoint for real-time thread updates."""
     await websocket.accept()
-    
-    if thread_id not in active_connections:
-        active_connections[thread_id] = []
-    active_connections[thread_id].append(websocket)
+    subscriber = broadcaster.subscribe(thread_channel(thread_id), websocket)
     
     try:
         while True:
@@ -271,6 +359,6 @@ async def websocket_thread(websocket: WebSocket, thread_id: str):
             data = await websocket.receive_text()
             # Could process incoming messages here if needed
     except WebSocketDisconnect:
-        active_connections[thread_id].remove(websocket)
-        if not active_connections[thread_id]:
-            del active_connections[thread_id]
+        pass
+    finally:
+        broadcaster.unsubscribe(subscriber)
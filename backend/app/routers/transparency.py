@@ -3,61 +3,98 @@ Transparency router for public data access and RTI compliance.
 Provides open data APIs and exportable reports.
 """
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
+from sqlalchemy import func, Integer, case, and_, or_, select
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import base64
+import os
 import csv
-import io
 import json
+import zlib
+from urllib.parse import unquote
 
-from app.database import get_db
-from app.models import Submission, Cluster, Crew
+from app.database import get_db, SessionLocal
+from app.models import Submission, Cluster, Crew, SubmissionRollupHourly, WardReport
+from app.rollups import floor_hour
+from app.cache import cached
+from app.open_data import PUBLIC_COLUMNS, public_record
+from app.ward_reports import build_ward_report
 
 router = APIRouter(prefix="/transparency", tags=["transparency"])
 
 
+OPEN_DATA_MAX_LIMIT = 1000
+
+
+def encode_cursor(created_at: datetime, submission_id: int) -> str:
+    payload = json.dumps({"t": created_at.isoformat(), "id": submission_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(created_at: datetime, submission_id: int):
+    """
+    Keyset condition for rows after (created_at, id).
+    Ties on created_at are matched within 1 microsecond instead of with "=",
+    because SQLite compares timestamp text and server defaults have no fraction.
+    """
+    tick = timedelta(microseconds=1)
+    return or_(
+        Submission.created_at > created_at,
+        and_(
+            Submission.created_at > created_at - tick,
+            Submission.created_at < created_at + tick,
+            Submission.id > submission_id,
+        ),
+    )
+
+
 @router.get("/open-data")
 async def get_open_data(
     ward: Optional[str] = None,
     intent: Optional[str] = None,
     days: int = 30,
+    limit: int = OPEN_DATA_MAX_LIMIT,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Public API for anonymized civic data.
     RTI-compliant, no PII exposed.
+    Ordered oldest first; pass the returned next_cursor to fetch the following page.
     """
+    limit = max(1, min(limit, OPEN_DATA_MAX_LIMIT))
     cutoff = datetime.utcnow() - timedelta(days=days)
     
-    query = db.query(Submission).filter(Submission.created_at >= cutoff)
+    query = select(*PUBLIC_COLUMNS).where(Submission.created_at >= cutoff)
     
     if ward:
-        query = query.filter(Submission.ward == ward)
+        query = query.where(Submission.ward == ward)
     if intent:
-        query = query.filter(Submission.intent == intent)
-    
-    submissions = query.limit(1000).all()
-    
-    # Anonymize and structure data
-    data = []
-    for sub in submissions:
-        data.append({
-            "id": sub.id,
-            "intent": sub.intent,
-            "ward": sub.ward,
-            "status": sub.status,
-            "priority": sub.priority,
-            "created_at": sub.created_at.isoformat() if sub.created_at else None,
-            # Round location to ward-level precision (privacy)
-            "latitude_rounded": round(sub.latitude, 2) if sub.latitude else None,
-            "longitude_rounded": round(sub.longitude, 2) if sub.longitude else None,
-        })
+        query = query.where(Submission.intent == intent)
+    if cursor:
+        query = query.where(after_cursor(*decode_cursor(cursor)))
+    
+    rows = db.execute(
+        query.order_by(Submission.created_at, Submission.id).limit(limit)
+    ).all()
+    
+    data = [public_record(row) for row in rows]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
     
     return {
         "data": data,
         "count": len(data),
+        "next_cursor": next_cursor,
         "period_days": days,
         "filters": {"ward": ward, "intent": intent},
         "generated_at": datetime.utcnow().isoformat(),
@@ -65,58 +102,166 @@ async def get_open_data(
     }
 
 
+# Rows fetched per round trip from the server-side cursor during exports
+EXPORT_BATCH_SIZE = 5000
+CSV_HEADER = [
+    "ID", "Intent", "Ward", "Status", "Priority",
+    "Created At", "Latitude (approx)", "Longitude (approx)"
+]
+
+
+class _LineWriter:
+    """File-like target that hands each CSV line back instead of buffering it."""
+    
+    def write(self, line: str) -> str:
+        return line
+
+
+def stream_export_batches(ward: Optional[str], days: int):
+    """
+    Yield batches of public-column rows from a server-side cursor.
+    Uses its own session because the response body is produced after the
+    request handler has returned.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    query = select(*PUBLIC_COLUMNS).where(Submission.created_at >= cutoff)
+    if ward:
+        query = query.where(Submission.ward == ward)
+    query = query.order_by(Submission.created_at, Submission.id)
+    
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def csv_chunks(batches):
+    writer = csv.writer(_LineWriter())
+    yield writer.writerow(CSV_HEADER)
+    for batch in batches:
+        yield "".join(
+            writer.writerow([
+                sub.id,
+                sub.intent,
+                sub.ward,
+                sub.status,
+                sub.priority,
+                sub.created_at.strftime("%Y-%m-%d %H:%M") if sub.created_at else "",
+                round(sub.latitude, 2) if sub.latitude else "",
+                round(sub.longitude, 2) if sub.longitude else "",
+            ])
+            for sub in batch
+        )
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(public_record(sub)) + "\n" for sub in batch)
+
+
+def gzip_chunks(chunks):
+    """Compress a text stream incrementally into a single gzip member."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(chunks, media_type: str, filename: str, gzip: bool) -> StreamingResponse:
+    if gzip:
+        body = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    else:
+        body = (chunk.encode("utf-8") for chunk in chunks)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/export/csv")
 async def export_csv(
     ward: Optional[str] = None,
     days: int = 30,
-    db: Session = Depends(get_db)
+    gzip: bool = False,
 ):
     """
     Export anonymized data as CSV for RTI requests.
+    Streams every matching row with constant memory; ?gzip=true compresses on the fly.
     """
-    cutoff = datetime.utcnow() - timedelta(days=days)
+    filename = f"civicpulse_data_{ward or 'city'}_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+    return export_response(csv_chunks(stream_export_batches(ward, days)), "text/csv", filename, gzip)
+
+
+@router.get("/export/ndjson")
+async def export_ndjson(
+    ward: Optional[str] = None,
+    days: int = 30,
+    gzip: bool = False,
+):
+    """
+    Export anonymized data as newline-delimited JSON (one open-data record per line).
+    Streams every matching row with constant memory; ?gzip=true compresses on the fly.
+    """
+    filename = f"civicpulse_data_{ward or 'city'}_{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+    return export_response(
+        ndjson_chunks(stream_export_batches(ward, days)), "application/x-ndjson", filename, gzip
+    )
+
+
+@router.get("/snapshots/manifest")
+async def get_snapshot_manifest():
+    """
+    Manifest of the latest daily Parquet snapshot of the open-data feed.
+    Files are partitioned by month and ward; download each via its `url`.
+    """
+    from app.snapshots import read_manifest
     
-    query = db.query(Submission).filter(Submission.created_at >= cutoff)
-    if ward:
-        query = query.filter(Submission.ward == ward)
-    
-    submissions = query.limit(1000).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
-        "ID", "Intent", "Ward", "Status", "Priority", 
-        "Created At", "Latitude (approx)", "Longitude (approx)"
-    ])
-    
-    # Data rows
-    for sub in submissions:
-        writer.writerow([
-            sub.id,
-            sub.intent,
-            sub.ward,
-            sub.status,
-            sub.priority,
-            sub.created_at.strftime("%Y-%m-%d %H:%M") if sub.created_at else "",
-            round(sub.latitude, 2) if sub.latitude else "",
-            round(sub.longitude, 2) if sub.longitude else "",
-        ])
-    
-    output.seek(0)
+    manifest = read_manifest()
+    if not manifest:
+        raise HTTPException(status_code=404, detail="No open-data snapshot has been published yet")
     
-    filename = f"civicpulse_data_{ward or 'city'}_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+    return {
+        **manifest,
+        "files": [
+            {**f, "url": f"/transparency/snapshots/files/{f['path']}"}
+            for f in manifest["files"]
+        ],
+    }
+
+
+@router.get("/snapshots/files/{file_path:path}")
+async def download_snapshot_file(file_path: str):
+    """Download one Parquet file listed in a published snapshot manifest."""
+    from app.snapshots import snapshot_root, SNAPSHOT_MANIFEST_NAME
     
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    root = snapshot_root()
+    snapshot_date = file_path.split("/", 1)[0]
+    manifest_path = os.path.join(root, snapshot_date, SNAPSHOT_MANIFEST_NAME)
+    if snapshot_date in ("", ".", "..") or not os.path.exists(manifest_path):
+        raise HTTPException(status_code=404, detail="Snapshot file not found")
+    
+    # Manifest paths are percent-encoded (ward=BTM%20Layout); the request path arrives decoded
+    with open(manifest_path) as f:
+        listed = {unquote(entry["path"]): entry["path"] for entry in json.load(f)["files"]}
+    stored_path = listed.get(file_path)
+    full_path = os.path.abspath(os.path.join(root, stored_path or ""))
+    if stored_path is None or not full_path.startswith(root + os.sep) or not os.path.exists(full_path):
+        raise HTTPException(status_code=404, detail="Snapshot file not found")
+    
+    return FileResponse(full_path, media_type="application/vnd.apache.parquet",
+                        filename=file_path.replace("/", "_"))
 
 
 @router.get("/metrics/public")
+@cached("transparency", ttl=60)
 async def get_public_metrics(db: Session = Depends(get_db)):
     """
     Public metrics dashboard data.
@@ -126,22 +271,24 @@ async def get_public_metrics(db: Session = Depends(get_db)):
     week_ago = now - timedelta(days=7)
     month_ago = now - timedelta(days=30)
     
-    # Aggregate stats
-    total = db.query(Submission).count()
-    resolved = db.query(Submission).filter(Submission.status == "resolved").count()
-    week_count = db.query(Submission).filter(Submission.created_at >= week_ago).count()
-    week_resolved = db.query(Submission).filter(
-        Submission.status == "resolved",
-        Submission.updated_at >= week_ago
-    ).count()
-    
-    # By ward stats
+    # Aggregate stats from hourly rollups (windows are hour-aligned, by creation time)
+    rollup = SubmissionRollupHourly
+    week_start = floor_hour(week_ago)
+    is_resolved = rollup.status == "resolved"
     ward_stats = db.query(
-        Submission.ward,
-        func.count(Submission.id).label("total"),
-        func.sum(func.cast(Submission.status == "resolved", Integer)).label("resolved")
-    ).group_by(Submission.ward).all()
+        rollup.ward,
+        func.sum(rollup.count).label("total"),
+        func.sum(case((is_resolved, rollup.count), else_=0)).label("resolved"),
+        func.sum(case((rollup.hour >= week_start, rollup.count), else_=0)).label("week_total"),
+        func.sum(case((and_(is_resolved, rollup.hour >= week_start), rollup.count), else_=0)).label("week_resolved"),
+    ).group_by(rollup.ward).all()
+    
+    total = sum(ws.total or 0 for ws in ward_stats)
+    resolved = sum(ws.resolved or 0 for ws in ward_stats)
+    week_count = sum(ws.week_total or 0 for ws in ward_stats)
+    week_resolved = sum(ws.week_resolved or 0 for ws in ward_stats)
     
+    # By ward stats
     ward_data = []
     for ws in ward_stats:
         if ws.ward:
@@ -156,10 +303,11 @@ async def get_public_metrics(db: Session = Depends(get_db)):
     ward_data.sort(key=lambda x: -x["resolution_rate"])
     
     # By intent stats
+    intent_count = func.sum(rollup.count)
     intent_stats = db.query(
-        Submission.intent,
-        func.count(Submission.id).label("count")
-    ).group_by(Submission.intent).order_by(func.count(Submission.id).desc()).limit(10).all()
+        rollup.intent,
+        intent_count.label("count")
+    ).group_by(rollup.intent).order_by(intent_count.desc()).limit(10).all()
     
     return {
         "summary": {
@@ -178,64 +326,26 @@ async def get_public_metrics(db: Session = Depends(get_db)):
 @router.get("/ward/{ward_name}/report")
 async def get_ward_report(
     ward_name: str,
+    report_date: Optional[date] = None,
     db: Session = Depends(get_db)
 ):
     """
     Detailed report for a specific ward.
     Suitable for councilor briefings.
+
+    Computed live by default; pass report_date for the briefing stored that night
+    (see app.ward_reports). Either way generated_at says when the figures were taken.
     """
-    now = datetime.utcnow()
-    month_ago = now - timedelta(days=30)
-    
-    # Get ward submissions
-    submissions = db.query(Submission).filter(
-        Submission.ward == ward_name,
-        Submission.created_at >= month_ago
-    ).all()
-    
-    if not submissions:
+    if report_date is not None:
+        stored = db.query(WardReport.payload).filter(
+            WardReport.ward == ward_name,
+            WardReport.report_date == report_date
+        ).first()
+        if not stored:
+            raise HTTPException(status_code=404, detail="No briefing stored for that ward and date")
+        return stored.payload
+
+    report = build_ward_report(db, ward_name, datetime.utcnow())
+    if report is None:
         raise HTTPException(status_code=404, detail="Ward not found or no data available")
-    
-    # Calculate metrics
-    total = len(submissions)
-    resolved = len([s for s in submissions if s.status == "resolved"])
-    pending = len([s for s in submissions if s.status == "pending"])
-    assigned = len([s for s in submissions if s.status == "assigned"])
-    
-    # By intent breakdown
-    intent_counts = {}
-    for sub in submissions:
-        intent = sub.intent or "unknown"
-        intent_counts[intent] = intent_counts.get(intent, 0) + 1
-    
-    # Priority distribution
-    priority_counts = {}
-    for sub in submissions:
-        priority = sub.priority or "normal"
-        priority_counts[priority] = priority_counts.get(priority, 0) + 1
-    
-    # Active clusters in ward
-    clusters = db.query(Cluster).filter(
-        Cluster.ward == ward_name,
-        Cluster.status != "resolved"
-    ).all()
-    
-    return {
-        "ward": ward_name,
-        "period": "last_30_days",
-        "summary": {
-            "total_submissions": total,
-            "resolved": resolved,
-            "pending": pending,
-            "assigned": assigned,
-            "resolution_rate": round(resolved / max(total, 1) * 100, 1),
-        },
-        "by_intent": [{"intent": k, "count": v} for k, v in sorted(intent_counts.items(), key=lambda x: -x[1])],
-        "by_priority": priority_counts,
-        "active_clusters": len(clusters),
-        "hot_spots": [
-            {"cluster_id": c.cluster_id, "intent": c.intent, "size": c.size, "priority": c.priority}
-            for c in clusters[:5]
-        ],
-        "generated_at": now.isoformat(),
-    }
+    return report
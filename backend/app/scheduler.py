@@ -0,0 +1,331 @@
+"""
+Periodic job scheduler with leader election.
+
+Every uvicorn worker starts a JobScheduler, but only the worker holding the
+`scheduler_leases` row runs jobs. The leader renews its lease every
+HEARTBEAT_SECONDS; if it dies, the lease expires after LEASE_SECONDS and the
+next worker to heartbeat takes over. Acquisition is a single conditional
+UPDATE (or INSERT for the first lease), so it is atomic on SQLite and Postgres
+alike.
+
+Job schedules and run metrics live in `scheduler_job_stats`, so a new leader
+carries on where the old one stopped instead of re-running every job.
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import SchedulerLease, SchedulerJobStat
+
+LEASE_NAME = "periodic-jobs"
+LEASE_SECONDS = 30
+HEARTBEAT_SECONDS = 10
+# How often the leader checks for due jobs
+TICK_SECONDS = 5
+
+
+class Job:
+    """A periodic job: a sync function (run in the executor) or a coroutine function."""
+
+    def __init__(self, name: str, interval_seconds: int, fn: Callable):
+        self.name = name
+        self.interval = timedelta(seconds=interval_seconds)
+        self.fn = fn
+
+
+class JobScheduler:
+    """Leader election plus a sequential runner for the registered jobs."""
+
+    def __init__(self, lease_name: str = LEASE_NAME):
+        self.lease_name = lease_name
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: List[Job] = []
+        self.is_leader = False
+        self.on_elected: List[Callable] = []  # Coroutine functions run when leadership is gained
+        self.on_demoted: List[Callable] = []  # Plain callables run when it is lost
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, interval_seconds: int, fn: Callable) -> None:
+        self.jobs.append(Job(name, interval_seconds, fn))
+
+    # ============== Leader election ==============
+
+    def try_acquire(self, now: Optional[datetime] = None) -> bool:
+        """Take or renew the lease. Returns True if this worker now holds it."""
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=LEASE_SECONDS)
+        db = SessionLocal()
+        try:
+            renewed = db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.lease_name,
+                or_(SchedulerLease.holder == self.worker_id, SchedulerLease.expires_at < now)
+            ).update({
+                SchedulerLease.acquired_at: case(
+                    (SchedulerLease.holder == self.worker_id, SchedulerLease.acquired_at), else_=now
+                ),
+                SchedulerLease.holder: self.worker_id,
+                SchedulerLease.heartbeat_at: now,
+                SchedulerLease.expires_at: expires_at,
+            }, synchronize_session=False)
+            if renewed:
+                db.commit()
+                return True
+            if db.query(SchedulerLease.name).filter(SchedulerLease.name == self.lease_name).first():
+                db.rollback()
+                return False
+            db.add(SchedulerLease(
+                name=self.lease_name, holder=self.worker_id,
+                acquired_at=now, heartbeat_at=now, expires_at=expires_at,
+            ))
+            db.commit()
+            return True
+        except IntegrityError:
+            # Another worker created the lease first
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self) -> None:
+        """Give up the lease so another worker can take over without waiting for expiry."""
+        db = SessionLocal()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.lease_name,
+                SchedulerLease.holder == self.worker_id
+            ).update({SchedulerLease.expires_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                leader = await loop.run_in_executor(None, self.try_acquire)
+            except Exception as e:
+                print(f"❌ Scheduler Heartbeat Error: {e}")
+                leader = False
+            if leader and not self.is_leader:
+                self.is_leader = True
+                print(f"👑 Scheduler leader: {self.worker_id}")
+                for callback in self.on_elected:
+                    try:
+                        await callback()
+                    except Exception as e:
+                        print(f"❌ Scheduler Election Hook Error: {e}")
+            elif not leader and self.is_leader:
+                self._demote()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    def _demote(self):
+        self.is_leader = False
+        print(f"🔻 Scheduler leadership lost: {self.worker_id}")
+        for callback in self.on_demoted:
+            callback()
+
+    # ============== Jobs ==============
+
+    def _due_jobs(self, now: datetime) -> List[Job]:
+        db = SessionLocal()
+        try:
+            last_started = dict(db.query(SchedulerJobStat.name, SchedulerJobStat.last_started_at))
+        finally:
+            db.close()
+        return [
+            job for job in self.jobs
+            if last_started.get(job.name) is None or last_started[job.name] + job.interval <= now
+        ]
+
+    def _record(self, name: str, started_at: datetime, duration_ms: float, error: Optional[str]) -> None:
+        db = SessionLocal()
+        try:
+            stat = db.get(SchedulerJobStat, name)
+            if stat is None:
+                stat = SchedulerJobStat(name=name, runs=0, failures=0, total_duration_ms=0.0)
+                db.add(stat)
+            stat.runs += 1
+            stat.failures += 1 if error else 0
+            stat.total_duration_ms += duration_ms
+            stat.last_duration_ms = duration_ms
+            stat.last_started_at = started_at
+            stat.last_finished_at = datetime.utcnow()
+            stat.last_error = error
+            stat.last_worker = self.worker_id
+            db.commit()
+        finally:
+            db.close()
+
+    async def run_job(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        error = None
+        try:
+            if asyncio.iscoroutinefunction(job.fn):
+                await job.fn()
+            else:
+                await loop.run_in_executor(None, job.fn)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"❌ Scheduler Job Error ({job.name}): {e}")
+        duration_ms = (time.perf_counter() - start) * 1000
+        await loop.run_in_executor(None, self._record, job.name, started_at, duration_ms, error)
+
+    async def _run_jobs(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.is_leader:
+                try:
+                    for job in await loop.run_in_executor(None, self._due_jobs, datetime.utcnow()):
+                        if not self.is_leader:
+                            break
+                        await self.run_job(job)
+                except Exception as e:
+                    print(f"❌ Scheduler Error: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    # ============== Lifecycle ==============
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._heartbeat()), asyncio.create_task(self._run_jobs())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self.is_leader:
+            self._demote()
+            await asyncio.get_running_loop().run_in_executor(None, self.release)
+
+    def status(self) -> Dict[str, Any]:
+        """Lease holder and per-job metrics, for /admin/scheduler."""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            lease = db.get(SchedulerLease, self.lease_name)
+            stats = {s.name: s for s in db.query(SchedulerJobStat)}
+        finally:
+            db.close()
+
+        jobs = []
+        for job in self.jobs:
+            stat = stats.get(job.name)
+            jobs.append({
+                "name": job.name,
+                "interval_seconds": int(job.interval.total_seconds()),
+                "runs": stat.runs if stat else 0,
+                "failures": stat.failures if stat else 0,
+                "avg_duration_ms": round(stat.total_duration_ms / stat.runs, 1) if stat and stat.runs else None,
+                "last_duration_ms": round(stat.last_duration_ms, 1) if stat and stat.last_duration_ms is not None else None,
+                "last_started_at": stat.last_started_at.isoformat() if stat and stat.last_started_at else None,
+                "next_run_at": (stat.last_started_at + job.interval).isoformat() if stat and stat.last_started_at else None,
+                "last_error": stat.last_error if stat else None,
+                "last_worker": stat.last_worker if stat else None,
+            })
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "lease": {
+                "holder": lease.holder,
+                "acquired_at": lease.acquired_at.isoformat(),
+                "heartbeat_at": lease.heartbeat_at.isoformat(),
+                "expires_at": lease.expires_at.isoformat(),
+                "expired": lease.expires_at < now,
+            } if lease else None,
+            "jobs": jobs,
+        }
+
+
+# ============== Job definitions ==============
+
+def reconcile_sla_deadlines():
+    from app.sla_scheduler import sla_deadline_scheduler
+
+    db = SessionLocal()
+    try:
+        sla_deadline_scheduler.reconcile(db)
+    finally:
+        db.close()
+
+
+def detect_predicted_events_job():
+    from app.detectors.predicted_events import detect_predicted_events
+
+    db = SessionLocal()
+    try:
+        events = detect_predicted_events(db)
+        if events:
+            print(f"🔮 Predicted {len(events)} new events")
+    finally:
+        db.close()
+
+
+def refresh_projections_job():
+    """
+    Rebuild the rollups, cost totals and citizen scores if they drifted from the
+    source rows (bulk SQL updates/deletes bypass the flush hooks that maintain them).
+    """
+    from app.citizen_scores import backfill_citizen_scores, score_drift
+    from app.costs import backfill_costs, cost_drift
+    from app.rollups import backfill_rollups, rollup_drift
+
+    db = SessionLocal()
+    try:
+        drift = rollup_drift(db)
+        if any(drift.values()):
+            print(f"📊 Rollup drift {drift}, rebuilding: {backfill_rollups(db)}")
+        drift = cost_drift(db)
+        if drift:
+            print(f"💰 Cost totals drifted for {drift} wards/clusters, rebuilt {backfill_costs(db)} clusters")
+        drift = score_drift(db)
+        if drift:
+            print(f"🏅 Citizen scores drifted for {drift} rows, rebuilt {backfill_citizen_scores(db)}")
+    finally:
+        db.close()
+
+
+def consolidate_clusters_job():
+    """Cluster recent submissions that no cluster has claimed yet."""
+    from app.clustering import clustering_service
+
+    db = SessionLocal()
+    try:
+        clusters = clustering_service.cluster_submissions(db, window_minutes=60, unclustered_only=True)
+        if clusters:
+            clustering_service.save_clusters(db, clusters)
+            print(f"🧩 Consolidated {len(clusters)} new clusters")
+    finally:
+        db.close()
+
+
+def create_scheduler() -> JobScheduler:
+    from app.receipt import seal_receipt_batches
+    from app.sla_scheduler import sla_deadline_scheduler
+    from app.snapshots import publish_open_data_snapshots
+    from app.ward_reports import precompute_ward_reports
+
+    scheduler = JobScheduler()
+    scheduler.register("sla_reconcile", 60, reconcile_sla_deadlines)
+    scheduler.register("receipt_batches", 60, seal_receipt_batches)
+    scheduler.register("predicted_events", 300, detect_predicted_events_job)
+    scheduler.register("cluster_consolidation", 600, consolidate_clusters_job)
+    scheduler.register("open_data_snapshots", 600, publish_open_data_snapshots)
+    scheduler.register("ward_reports", 600, precompute_ward_reports)
+    scheduler.register("projection_refresh", 3600, refresh_projections_job)
+
+    # The SLA deadline heap fires escalations itself, so it only runs on the leader
+    scheduler.on_elected.append(sla_deadline_scheduler.start)
+    scheduler.on_demoted.append(sla_deadline_scheduler.stop)
+    return scheduler
+
+
+job_scheduler = create_scheduler()
@@ -51,13 +51,16 @@ class ReceiptResponse(BaseModel):
 
 class ReceiptVerifyResponse(BaseModel):
     receipt_id: str
-    verification: str  # OK or FAIL
+    verification: str  # OK, FAIL, or PENDING_BATCH (Merkle batch not sealed yet)
     verified: bool
     chain_position: int
     chain_length: int
     receipt_hash: str
     chain_hash: Optional[str] = None
     prev_hash: Optional[str]
+    chain_mode: str = "linear"  # linear or merkle
+    merkle_root: Optional[str] = None
+    merkle_proof: Optional[List[Dict[str, str]]] = None
 
     class Config:
         from_attributes = True
@@ -130,6 +133,14 @@ class MessageResponse(BaseModel):
         from_attributes = True
 
 
+class MessagePage(BaseModel):
+    thread_id: str
+    messages: List[MessageResponse]  # Oldest first
+    has_more: bool  # Older messages exist (before mode) / newer ones do (since mode)
+    oldest_id: Optional[int]
+    newest_id: Optional[int]
+
+
 class ThreadCreate(BaseModel):
     submission_id: Optional[int] = None
     cluster_id: Optional[int] = None
@@ -142,6 +153,7 @@ class ThreadResponse(BaseModel):
     cluster_id: Optional[int]
     status: str
     messages: List[MessageResponse] = []
+    has_older_messages: bool = False  # Page back with /threads/{id}/messages?before=
     created_at: datetime
     updated_at: Optional[datetime]
     
@@ -166,6 +178,23 @@ class CrewStatusUpdate(BaseModel):
     photo_url: Optional[str] = None
 
 
+class CrewLocationPing(BaseModel):
+    crew_id: str
+    latitude: float
+    longitude: float
+    recorded_at: Optional[datetime] = None  # When the app took the fix (defaults to receipt time)
+
+
+class CrewLocationBatch(BaseModel):
+    pings: List[CrewLocationPing]
+
+
+class CrewTrackPoint(BaseModel):
+    recorded_at: datetime
+    latitude: float
+    longitude: float
+
+
 class CrewResponse(BaseModel):
     id: int
     crew_id: str
@@ -8,7 +8,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 import json
 
-from app.models import Submission, Cluster
+from app.models import Submission, Cluster, SubmissionRollupHourly
+from app.rollups import floor_hour
 
 
 class PredictionService:
@@ -104,19 +105,19 @@ class PredictionService:
         now = datetime.utcnow()
         current_month = now.month
         
-        # Get historical averages (last 30 days by intent)
+        # Get historical averages (last 30 days by intent) from the hourly rollups
         month_ago = now - timedelta(days=30)
         query = db.query(
-            Submission.intent,
-            func.count(Submission.id).label("count")
+            SubmissionRollupHourly.intent,
+            func.sum(SubmissionRollupHourly.count).label("count")
         ).filter(
-            Submission.created_at >= month_ago
+            SubmissionRollupHourly.hour >= floor_hour(month_ago)
         )
         
         if ward:
-            query = query.filter(Submission.ward == ward)
+            query = query.filter(SubmissionRollupHourly.ward == ward)
         
-        historical = {r.intent: r.count for r in query.group_by(Submission.intent).all()}
+        historical = {r.intent: r.count for r in query.group_by(SubmissionRollupHourly.intent).all()}
         daily_avg = {k: v / 30 for k, v in historical.items()}
         
         # Apply seasonal boost
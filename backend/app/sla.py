@@ -3,7 +3,9 @@ SLA and Cost-of-Delay computation utilities for CivicPulse.
 Provides government-grade SLA tracking and economic impact metrics.
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
 
 
 # SLA targets in hours based on priority
@@ -70,6 +72,11 @@ def get_size_bonus(citizen_count: int) -> float:
     return 1.0
 
 
+def get_hourly_rate(intent: str, citizen_count: int) -> float:
+    """Cost per hour an unresolved cluster of this intent and size incurs."""
+    return COST_CONSTANTS['per_citizen_hour'] * citizen_count * get_severity_multiplier(intent) * get_size_bonus(citizen_count)
+
+
 def compute_cost_of_delay(
     intent: str,
     citizen_count: int,
@@ -88,7 +95,7 @@ def compute_cost_of_delay(
     severity_mult = get_severity_multiplier(intent)
     size_bonus = get_size_bonus(citizen_count)
     
-    hourly_rate = base_rate * citizen_count * severity_mult * size_bonus
+    hourly_rate = get_hourly_rate(intent, citizen_count)
     total_cost = hourly_rate * hours_open
     
     return {
@@ -141,52 +148,181 @@ def compute_cluster_sla_status(cluster) -> dict:
     }
 
 
-def get_sla_summary(clusters: list) -> dict:
+# Size bonus thresholds, largest first (the order get_size_bonus walks them in)
+_SIZE_BONUS_STEPS = sorted(COST_CONSTANTS['size_bonus'].items(), reverse=True)
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(value: Optional[datetime]) -> float:
+    """Seconds since the epoch (naive values are UTC); NaN for None."""
+    if value is None:
+        return np.nan
+    if value.tzinfo is not None:
+        return value.timestamp()
+    return (value - _EPOCH).total_seconds()
+
+
+def _lookup(values: Sequence, table: dict, default: float) -> np.ndarray:
+    """Map a column of keys through a dict, one dict lookup per distinct key."""
+    memo = {}
+    return np.fromiter(
+        (memo[v] if v in memo else memo.setdefault(v, table.get(v, default)) for v in values),
+        dtype=float, count=len(values),
+    )
+
+
+def compute_sla_batch(
+    created_at: Sequence[datetime],
+    resolved_at: Sequence[Optional[datetime]],
+    priority: Sequence[Optional[str]],
+    intent: Sequence[Optional[str]],
+    size: Sequence[Optional[int]],
+    now: Optional[datetime] = None,
+    cost_estimate: Optional[Sequence[Optional[float]]] = None,
+    cost_hourly_rate: Optional[Sequence[Optional[float]]] = None,
+    cost_checkpoint_at: Optional[Sequence[Optional[datetime]]] = None,
+) -> dict:
     """
-    Get SLA summary statistics across all clusters.
+    SLA status and cost-of-delay for many clusters in one vectorized pass.
+
+    Takes parallel column arrays and returns a dict of NumPy arrays with the same
+    values compute_cluster_sla_status / compute_cost_of_delay give per cluster,
+    all measured against a single `now`. When the cost accumulator columns
+    (see app.costs) are passed, costs come from them for every cluster that
+    has a checkpoint, so they match /admin/cost-analysis.
     """
-    total = len(clusters)
-    breached = 0
-    at_risk = 0  # <1 hour remaining
-    on_track = 0
-    resolved = 0
-    
-    total_cost = 0
-    active_hourly_rate = 0
-    
-    for cluster in clusters:
-        sla_status = compute_cluster_sla_status(cluster)
-        is_resolved = getattr(cluster, 'resolved_at', None) is not None
-        
-        if is_resolved:
-            resolved += 1
-        elif sla_status['is_breached']:
-            breached += 1
-        elif sla_status['time_remaining_hours'] < 1:
-            at_risk += 1
-        else:
-            on_track += 1
-        
-        # Compute cost
-        citizen_count = getattr(cluster, 'size', 1) or 1
-        cost_info = compute_cost_of_delay(
-            cluster.intent,
-            citizen_count,
-            sla_status['hours_open'],
-            is_resolved
-        )
-        total_cost += cost_info['total_cost']
-        if not is_resolved:
-            active_hourly_rate += cost_info['hourly_rate']
-    
+    now = _epoch_seconds(now or datetime.utcnow())
+    created = np.fromiter((_epoch_seconds(v) for v in created_at), dtype=float, count=len(created_at))
+    resolved = np.fromiter((_epoch_seconds(v) for v in resolved_at), dtype=float, count=len(resolved_at))
+    is_resolved = ~np.isnan(resolved)
+    end = np.where(is_resolved, resolved, now)
+
+    target_hours = _lookup(priority, SLA_TARGETS, SLA_TARGETS['normal'])
+    deadline = created + target_hours * 3600
+    hours_open = (end - created) / 3600
+    time_remaining = np.where(is_resolved, 0.0, (deadline - now) / 3600)
+    is_breached = end > deadline
+
+    citizens = np.fromiter((s or 1 for s in size), dtype=float, count=len(size))
+    size_bonus = np.select(
+        [citizens >= threshold for threshold, _ in _SIZE_BONUS_STEPS],
+        [bonus for _, bonus in _SIZE_BONUS_STEPS],
+        default=1.0,
+    )
+    severity = _lookup(intent, COST_CONSTANTS['severity_multiplier'], 1.0)
+    hourly_rate = COST_CONSTANTS['per_citizen_hour'] * citizens * severity * size_bonus
+    total_cost = hourly_rate * hours_open
+    hourly_rate = np.where(is_resolved, 0.0, hourly_rate)
+
+    if cost_checkpoint_at is not None:
+        checkpoint = np.fromiter((_epoch_seconds(v) for v in cost_checkpoint_at), dtype=float, count=len(cost_checkpoint_at))
+        accrued = np.fromiter((v or 0.0 for v in cost_estimate), dtype=float, count=len(cost_estimate))
+        rate = np.fromiter((v or 0.0 for v in cost_hourly_rate), dtype=float, count=len(cost_hourly_rate))
+        tracked = ~np.isnan(checkpoint)
+        elapsed = np.maximum(np.where(tracked, now - checkpoint, 0.0), 0.0) / 3600
+        total_cost = np.where(tracked, accrued + rate * elapsed, total_cost)
+        hourly_rate = np.where(tracked, rate, hourly_rate)
+
     return {
-        'total_clusters': total,
+        'target_hours': target_hours,
+        'hours_open': hours_open,
+        'time_remaining_hours': time_remaining,
+        'is_breached': is_breached,
+        'is_resolved': is_resolved,
+        'citizen_count': citizens,
+        'severity_multiplier': severity,
+        'size_bonus': size_bonus,
+        'total_cost': total_cost,
+        'hourly_rate': hourly_rate,
+    }
+
+
+def compute_sla_batch_for(clusters: list, now: Optional[datetime] = None) -> dict:
+    """compute_sla_batch over cluster objects or rows with the matching attributes."""
+    return compute_sla_batch(
+        [c.created_at for c in clusters],
+        [getattr(c, 'resolved_at', None) for c in clusters],
+        [c.priority for c in clusters],
+        [c.intent for c in clusters],
+        [getattr(c, 'size', 1) for c in clusters],
+        now,
+        [getattr(c, 'cost_estimate', None) for c in clusters],
+        [getattr(c, 'cost_hourly_rate', None) for c in clusters],
+        [getattr(c, 'cost_checkpoint_at', None) for c in clusters],
+    )
+
+
+def batch_sla_status(batch: dict, i: int, cluster) -> dict:
+    """Row i of a batch (computed from `cluster`) in the compute_cluster_sla_status shape."""
+    priority = cluster.priority
+    is_breached = bool(batch['is_breached'][i])
+    is_resolved = bool(batch['is_resolved'][i])
+    return {
+        'sla_target_hours': SLA_TARGETS.get(priority, SLA_TARGETS['normal']),
+        'sla_deadline': compute_sla_deadline(cluster.created_at, priority).isoformat(),
+        'is_breached': is_breached,
+        'hours_open': round(float(batch['hours_open'][i]), 2),
+        'time_remaining_hours': round(float(batch['time_remaining_hours'][i]), 2),
+        'status': 'breached' if is_breached else ('resolved' if is_resolved else 'on_track'),
+        'priority': priority,
+    }
+
+
+def batch_cost_of_delay(batch: dict, i: int, cluster) -> dict:
+    """Row i of a batch (computed from `cluster`) in the compute_cost_of_delay shape."""
+    is_resolved = bool(batch['is_resolved'][i])
+    return {
+        'total_cost': round(float(batch['total_cost'][i]), 2),
+        'hourly_rate': round(float(batch['hourly_rate'][i]), 2),
+        'hours_open': round(float(batch['hours_open'][i]), 2),
+        'breakdown': {
+            'base_rate_per_citizen': COST_CONSTANTS['per_citizen_hour'],
+            'citizen_count': int(batch['citizen_count'][i]),
+            'severity_multiplier': float(batch['severity_multiplier'][i]),
+            'size_bonus': float(batch['size_bonus'][i]),
+            'intent': cluster.intent,
+        },
+        'currency': 'INR',
+        'is_resolved': is_resolved,
+    }
+
+
+def sla_buckets(batch: dict) -> dict:
+    """Boolean masks splitting a batch into resolved / breached / at_risk / on_track."""
+    open_ = ~batch['is_resolved']
+    breached = open_ & batch['is_breached']
+    # Same rule as the per-cluster path: under 1 hour left (after rounding) is at risk
+    at_risk = open_ & ~breached & (np.round(batch['time_remaining_hours'], 2) < 1)
+    return {
+        'resolved': batch['is_resolved'],
         'breached': breached,
         'at_risk': at_risk,
-        'on_track': on_track,
-        'resolved': resolved,
+        'on_track': open_ & ~breached & ~at_risk,
+    }
+
+
+def summarize_sla_batch(batch: dict) -> dict:
+    """get_sla_summary statistics from a precomputed batch."""
+    total = len(batch['is_resolved'])
+    buckets = sla_buckets(batch)
+    breached = int(buckets['breached'].sum())
+    return {
+        'total_clusters': total,
+        'breached': breached,
+        'at_risk': int(buckets['at_risk'].sum()),
+        'on_track': int(buckets['on_track'].sum()),
+        'resolved': int(buckets['resolved'].sum()),
         'breach_rate': round(breached / total * 100, 1) if total > 0 else 0,
-        'total_cost_incurred': round(total_cost, 2),
-        'active_hourly_rate': round(active_hourly_rate, 2),
+        'total_cost_incurred': round(float(batch['total_cost'].sum()), 2),
+        'active_hourly_rate': round(float(batch['hourly_rate'].sum()), 2),
         'currency': 'INR',
     }
+
+
+def get_sla_summary(clusters: list) -> dict:
+    """
+    Get SLA summary statistics across all clusters.
+    """
+    return summarize_sla_batch(compute_sla_batch_for(clusters))
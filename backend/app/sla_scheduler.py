@@ -1,43 +1,329 @@
+"""
+SLA deadline scheduler.
+
+Keeps every pending deadline in an in-process min-heap and sleeps until the
+earliest one, so escalations fire at their deadline instead of on the next
+60-second scan, and an empty heap costs nothing:
+
+- submission: a HIGH/URGENT submission still pending ESCALATE_AFTER after it
+  was filed is escalated to urgent, together with its cluster.
+- cluster: an unresolved cluster past its sla_deadline is marked sla_breached.
+
+The heap is loaded when this worker becomes the scheduler leader (see
+app.scheduler). After that, session hooks push the deadlines of rows committed
+with new or changed SLA fields in this worker, and the leader's reconcile job
+picks up rows committed by other workers. Entries are never removed early:
+when one fires its row is re-checked in SQL, so resolved, re-prioritised or
+already-escalated rows are skipped.
+
+Usage:
+    python -m app.sla_scheduler    # fire everything already due, once
+"""
 import asyncio
-from datetime import datetime, timedelta
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session
+
 from app.database import SessionLocal
 from app.models import Submission, Cluster
 
-async def check_sla_escalations():
+# How long a high-priority submission may stay pending before it is escalated
+ESCALATE_AFTER = timedelta(hours=2)
+ESCALATE_PRIORITIES = ('high', 'urgent')
+# Delay before deadlines are retried after a failed escalation run
+RETRY_AFTER = timedelta(minutes=1)
+# reconcile() reloads everything this often (catches priority changes made by other workers)
+FULL_RELOAD_AFTER = timedelta(hours=1)
+# Overlap between incremental reconcile windows, for clock skew with the database
+RECONCILE_OVERLAP = timedelta(seconds=5)
+
+SUBMISSION = "submission"
+CLUSTER = "cluster"
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _is_false(column):
+    return or_(column == False, column.is_(None))
+
+
+def fire_due(submission_ids: Set[int], cluster_ids: Set[int], now: Optional[datetime] = None) -> Tuple[int, int, list]:
     """
-    Background task to check for stalled high-priority issues.
-    If a HIGH priority issue is pending for > 2 hours, escalate it.
+    Apply the escalations that are due, in one transaction.
+    Returns (submissions escalated, clusters marked breached, entries to reschedule
+    for submissions that turned out not to be due yet).
     """
-    print("⏰ Running SLA Auto-Escalation Check...")
+    now = now or datetime.utcnow()
     db = SessionLocal()
     try:
-        # Time threshold (e.g., 2 hours ago)
-        threshold = datetime.utcnow() - timedelta(hours=2)
-        
-        # Find stalled high-priority submissions
-        stalled = db.query(Submission).filter(
-            Submission.status == 'pending',
-            Submission.priority.in_(['high', 'urgent']),
-            Submission.created_at <= threshold,
-            Submission.escalated == False  # New field or reuse logic
-        ).all()
-        
-        for sub in stalled:
-            print(f"⚠️ Auto-Escalating Submission #{sub.id}")
-            sub.priority = 'urgent'
-            sub.escalated = True # If field exists, otherwise just log/notify
-            
-            # Find related cluster
-            cluster = db.query(Cluster).filter(Cluster.submission_ids.contains([sub.id])).first()
-            if cluster:
-                cluster.escalated = True
-                cluster.priority = 'urgent'
-        
+        escalated, reschedule = [], []
+        if submission_ids:
+            candidates = db.query(Submission).filter(
+                Submission.id.in_(submission_ids),
+                Submission.status == 'pending',
+                Submission.priority.in_(ESCALATE_PRIORITIES),
+                _is_false(Submission.escalated)
+            ).all()
+            for sub in candidates:
+                deadline = _naive_utc(sub.created_at) + ESCALATE_AFTER
+                if deadline > now:
+                    reschedule.append((deadline, SUBMISSION, sub.id))
+                    continue
+                sub.priority = 'urgent'
+                sub.escalated = True
+                escalated.append(sub)
+
+            related = {sub.cluster_id for sub in escalated if sub.cluster_id}
+            if related:
+                for cluster in db.query(Cluster).filter(Cluster.id.in_(related)):
+                    cluster.escalated = True
+                    cluster.priority = 'urgent'
+
+        breached = []
+        if cluster_ids:
+            breached = db.query(Cluster).filter(
+                Cluster.id.in_(cluster_ids),
+                Cluster.resolved_at.is_(None),
+                Cluster.sla_deadline <= now,
+                _is_false(Cluster.sla_breached)
+            ).all()
+            for cluster in breached:
+                cluster.sla_breached = True
+
         db.commit()
-    except Exception as e:
-        print(f"❌ SLA Check Error: {e}")
+        return len(escalated), len(breached), reschedule
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class DeadlineScheduler:
+    """Min-heap of (deadline, kind, id) with a single sleeper task."""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str, int]] = []
+        self._queued: Set[Tuple[datetime, str, int]] = set()
+        self._last_submission_id = 0
+        self._reconciled_at: Optional[datetime] = None
+        self._loaded_at: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _query_deadlines(db: Session, after_submission_id: int = 0, since: Optional[datetime] = None) -> list:
+        """Pending deadlines in the database; optionally only rows added/changed recently."""
+        submissions = db.query(Submission.id, Submission.created_at).filter(
+            Submission.id > after_submission_id,
+            Submission.status == 'pending',
+            Submission.priority.in_(ESCALATE_PRIORITIES),
+            Submission.created_at.isnot(None),
+            _is_false(Submission.escalated)
+        )
+        clusters = db.query(Cluster.id, Cluster.sla_deadline).filter(
+            Cluster.sla_deadline.isnot(None),
+            Cluster.resolved_at.is_(None),
+            _is_false(Cluster.sla_breached)
+        )
+        if since is not None:
+            clusters = clusters.filter(or_(Cluster.created_at >= since, Cluster.updated_at >= since))
+        return (
+            [(_naive_utc(row.created_at) + ESCALATE_AFTER, SUBMISSION, row.id) for row in submissions]
+            + [(_naive_utc(row.sla_deadline), CLUSTER, row.id) for row in clusters]
+        )
+
+    def _mark_loaded(self, db: Session, now: datetime, full: bool) -> None:
+        newest = db.query(Submission.id).order_by(Submission.id.desc()).first()
+        self._last_submission_id = newest.id if newest else 0
+        self._reconciled_at = now
+        if full:
+            self._loaded_at = now
+
+    def load(self, db: Session) -> int:
+        """Rebuild the heap from the database (when elected)."""
+        now = datetime.utcnow()
+        heap = self._query_deadlines(db)
+        heapq.heapify(heap)
+        self._heap = heap
+        self._queued = set(heap)
+        self._mark_loaded(db, now, full=True)
+        return len(heap)
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Queue deadlines committed by other workers since the last call: new
+        submissions by id, clusters by created_at/updated_at, and everything
+        once per FULL_RELOAD_AFTER. Returns the number of deadlines found.
+        """
+        now = datetime.utcnow()
+        full = self._loaded_at is None or now - self._loaded_at >= FULL_RELOAD_AFTER
+        if full:
+            entries = self._query_deadlines(db)
+        else:
+            entries = self._query_deadlines(
+                db, self._last_submission_id, self._reconciled_at - RECONCILE_OVERLAP
+            )
+        self._mark_loaded(db, now, full)
+        self.schedule(entries)
+        return len(entries)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        db = SessionLocal()
+        try:
+            count = await self._loop.run_in_executor(None, self.load, db)
+        finally:
+            db.close()
+        print(f"⏰ SLA scheduler loaded {count} deadlines")
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._task = None
+        self._loop = None
+        self._heap, self._queued = [], set()
+        self._loaded_at = None
+
+    def schedule(self, entries: List[Tuple[datetime, str, int]]) -> None:
+        """Add deadlines; safe to call from any thread once started."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._push, entries)
+
+    def _push(self, entries):
+        if not entries:
+            return
+        earliest = self._heap[0][0] if self._heap else None
+        for entry in entries:
+            if entry not in self._queued:
+                self._queued.add(entry)
+                heapq.heappush(self._heap, entry)
+        # Only wake the sleeper if it now has to fire sooner
+        if earliest is None or self._heap[0][0] < earliest:
+            self._wakeup.set()
+
+    def pop_due(self, now: datetime) -> Tuple[Set[int], Set[int]]:
+        submission_ids, cluster_ids = set(), set()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            self._queued.discard(entry)
+            _, kind, row_id = entry
+            (submission_ids if kind == SUBMISSION else cluster_ids).add(row_id)
+        return submission_ids, cluster_ids
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if self._heap:
+                delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+            else:
+                delay = None  # Nothing scheduled: sleep until a deadline is pushed
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            submission_ids, cluster_ids = self.pop_due(datetime.utcnow())
+            try:
+                escalated, breached, reschedule = await self._loop.run_in_executor(
+                    None, fire_due, submission_ids, cluster_ids
+                )
+                self._push(reschedule)
+                if escalated or breached:
+                    print(f"⚠️ SLA: escalated {escalated} submissions, {breached} clusters breached")
+            except Exception as e:
+                print(f"❌ SLA Check Error: {e}")
+                retry_at = datetime.utcnow() + RETRY_AFTER
+                self._push([(retry_at, SUBMISSION, i) for i in submission_ids]
+                           + [(retry_at, CLUSTER, i) for i in cluster_ids])
+
+
+sla_deadline_scheduler = DeadlineScheduler()
+
+
+async def check_sla_escalations():
+    """
+    One-off catch-up: escalate everything already past its deadline.
+    The running service uses sla_deadline_scheduler instead.
+    """
+    scheduler = DeadlineScheduler()
+    db = SessionLocal()
+    try:
+        scheduler.load(db)
     finally:
         db.close()
+    escalated, breached, _ = fire_due(*scheduler.pop_due(datetime.utcnow()))
+    print(f"⏰ SLA: escalated {escalated} submissions, {breached} clusters breached")
+
+
+# ============== Session hooks ==============
+
+def _changed(obj, *attrs) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deadlines(session: Session, flush_context):
+    if not sla_deadline_scheduler.running:
+        return
+    entries = session.info.setdefault("sla_deadlines", [])
+    new = set(session.new)
+    for obj in list(session.new) + list(session.dirty):
+        # Read loaded values only; never trigger a refresh from inside a flush
+        state = obj.__dict__
+        if isinstance(obj, Submission):
+            if obj not in new and not _changed(obj, "priority", "status", "created_at"):
+                continue
+            if (state.get("status") or "pending") == "pending" and state.get("priority") in ESCALATE_PRIORITIES \
+                    and not state.get("escalated"):
+                filed = _naive_utc(state.get("created_at"))
+                if filed is not None:
+                    deadline = filed + ESCALATE_AFTER
+                elif obj in new:
+                    deadline = datetime.utcnow() + ESCALATE_AFTER  # created_at is filled in by the database
+                else:
+                    deadline = datetime.utcnow()  # Unknown: check now, fire_due reschedules it
+                entries.append((deadline, SUBMISSION, obj.id))
+        elif isinstance(obj, Cluster):
+            if obj not in new and not _changed(obj, "sla_deadline"):
+                continue
+            if state.get("sla_deadline") is not None and state.get("resolved_at") is None \
+                    and not state.get("sla_breached"):
+                entries.append((_naive_utc(state["sla_deadline"]), CLUSTER, obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_deadlines(session: Session):
+    entries = session.info.pop("sla_deadlines", None)
+    if entries:
+        sla_deadline_scheduler.schedule(entries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deadlines(session: Session):
+    session.info.pop("sla_deadlines", None)
+
 
 if __name__ == "__main__":
     asyncio.run(check_sla_escalations())
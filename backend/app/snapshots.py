@@ -0,0 +1,231 @@
+"""
+Daily columnar snapshots of the open-data feed.
+
+Writes the anonymized fields served by /transparency/open-data as Parquet files
+partitioned Hive-style by month and ward:
+
+    <OPEN_DATA_SNAPSHOT_DIR>/<YYYY-MM-DD>/month=2024-06/ward=Koramangala/part-0.parquet
+
+plus a _manifest.json describing every file. The newest manifest is copied to
+<OPEN_DATA_SNAPSHOT_DIR>/manifest.json only after all of its files are written,
+so readers never see a half-built snapshot.
+
+pyarrow is an optional dependency: without it the job logs once and does nothing.
+
+Usage:
+    python -m app.snapshots    # build today's snapshot now
+"""
+import hashlib
+import json
+import os
+import shutil
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Submission
+from app.open_data import PUBLIC_COLUMNS
+
+# Rows buffered per partition before they are written out as a row group
+ROW_GROUP_SIZE = 50000
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH_SIZE = 5000
+# Snapshots kept on disk (older ones are deleted after a successful build)
+SNAPSHOTS_KEPT = 3
+# Hive's name for the partition of NULL values
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+MANIFEST_NAME = "manifest.json"
+# Inside each snapshot directory; the leading underscore makes Parquet dataset readers skip it
+SNAPSHOT_MANIFEST_NAME = "_manifest.json"
+
+_missing_pyarrow_logged = False
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def snapshot_root() -> str:
+    return os.path.abspath(settings.OPEN_DATA_SNAPSHOT_DIR)
+
+
+def read_manifest() -> Optional[Dict[str, Any]]:
+    """Manifest of the latest published snapshot, if any."""
+    path = os.path.join(snapshot_root(), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _partition_dir(month: str, ward: Optional[str]) -> str:
+    return f"month={month}/ward={quote(ward, safe='') if ward else NULL_PARTITION}"
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_snapshot(snapshot_date: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stream every submission once and write one Parquet file per (month, ward).
+    Memory is bounded by ROW_GROUP_SIZE rows per open partition.
+    """
+    pa = _import_pyarrow()
+    if pa is None:
+        raise RuntimeError("pyarrow is required for open-data snapshots (pip install pyarrow)")
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("intent", pa.string()),
+        ("ward", pa.string()),
+        ("status", pa.string()),
+        ("priority", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("latitude_rounded", pa.float64()),
+        ("longitude_rounded", pa.float64()),
+    ])
+
+    snapshot_date = snapshot_date or datetime.utcnow().strftime("%Y-%m-%d")
+    root = snapshot_root()
+    target = os.path.join(root, snapshot_date)
+    building = os.path.join(root, f".building-{snapshot_date}")
+    shutil.rmtree(building, ignore_errors=True)
+
+    writers = {}
+    buffers = defaultdict(lambda: {name: [] for name in schema.names})
+    row_counts = defaultdict(int)
+
+    def flush(key):
+        columns = buffers.pop(key)
+        if not columns["id"]:
+            return
+        if key not in writers:
+            directory = os.path.join(building, _partition_dir(*key))
+            os.makedirs(directory, exist_ok=True)
+            writers[key] = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), schema, compression="zstd")
+        writers[key].write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    query = select(*PUBLIC_COLUMNS).order_by(Submission.created_at, Submission.id)
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        for batch in result.partitions():
+            for row in batch:
+                created_at = _utc(row.created_at)
+                key = (created_at.strftime("%Y-%m") if created_at else "unknown", row.ward)
+                columns = buffers[key]
+                columns["id"].append(row.id)
+                columns["intent"].append(row.intent)
+                columns["ward"].append(row.ward)
+                columns["status"].append(row.status)
+                columns["priority"].append(row.priority)
+                columns["created_at"].append(created_at)
+                # Same ward-level location precision as the open-data API
+                columns["latitude_rounded"].append(round(row.latitude, 2) if row.latitude else None)
+                columns["longitude_rounded"].append(round(row.longitude, 2) if row.longitude else None)
+                row_counts[key] += 1
+                if len(columns["id"]) >= ROW_GROUP_SIZE:
+                    flush(key)
+        for key in list(buffers):
+            flush(key)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        db.close()
+
+    files = []
+    for (month, ward) in sorted(writers, key=lambda k: (k[0], k[1] or "")):
+        relative = f"{_partition_dir(month, ward)}/part-0.parquet"
+        path = os.path.join(building, relative)
+        files.append({
+            "path": f"{snapshot_date}/{relative}",
+            "month": month,
+            "ward": ward,
+            "rows": row_counts[(month, ward)],
+            "bytes": os.path.getsize(path),
+            "sha256": _sha256(path),
+        })
+
+    manifest = {
+        "snapshot_date": snapshot_date,
+        "generated_at": datetime.utcnow().isoformat(),
+        "format": "parquet",
+        "compression": "zstd",
+        "partitioning": ["month", "ward"],
+        "schema": [{"name": field.name, "type": str(field.type)} for field in schema],
+        "row_count": sum(row_counts.values()),
+        "files": files,
+        "notice": "This data is anonymized and provided for public transparency. No PII included.",
+    }
+    os.makedirs(building, exist_ok=True)
+    with open(os.path.join(building, SNAPSHOT_MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publish: move the finished snapshot into place, then swap the top-level manifest
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(building, target)
+    latest = os.path.join(root, f".{MANIFEST_NAME}.tmp")
+    shutil.copyfile(os.path.join(target, SNAPSHOT_MANIFEST_NAME), latest)
+    os.replace(latest, os.path.join(root, MANIFEST_NAME))
+
+    _prune_old_snapshots(root)
+    return manifest
+
+
+def _prune_old_snapshots(root: str) -> None:
+    dated = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)) and not d.startswith("."))
+    for name in dated[:-SNAPSHOTS_KEPT]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+async def publish_open_data_snapshots():
+    """Background task: build today's snapshot once per day."""
+    global _missing_pyarrow_logged
+    import asyncio
+
+    if _import_pyarrow() is None:
+        if not _missing_pyarrow_logged:
+            print("⚠️ pyarrow not installed - open-data Parquet snapshots disabled")
+            _missing_pyarrow_logged = True
+        return
+
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    manifest = read_manifest()
+    if manifest and manifest.get("snapshot_date") == today:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+        manifest = await loop.run_in_executor(None, build_snapshot, today)
+        print(f"📦 Published open-data snapshot {today}: {manifest['row_count']} rows in {len(manifest['files'])} files")
+    except Exception as e:
+        print(f"❌ Open Data Snapshot Error: {e}")
+
+
+if __name__ == "__main__":
+    result = build_snapshot()
+    print(json.dumps({k: result[k] for k in ("snapshot_date", "row_count")}, indent=2))
+    print(f"{len(result['files'])} files in {snapshot_root()}")
@@ -0,0 +1,131 @@
+"""
+Nightly ward briefings.
+
+Once per UTC day, builds the /transparency/ward/{ward}/report payload for every
+ward with activity in the last 30 days and stores it in ward_reports, so each
+day's councilor briefing stays available as a single row lookup
+(?report_date=). The endpoint itself reports live figures by default.
+
+Usage:
+    python -m app.ward_reports    # build today's briefings now
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Cluster, Submission, SubmissionRollupHourly, WardReport
+from app.rollups import floor_hour
+
+# Days of briefings kept for archive lookups (?report_date=)
+REPORTS_KEPT_DAYS = 90
+
+
+def build_ward_report(db: Session, ward_name: str, now: datetime) -> Optional[dict]:
+    """
+    Councilor briefing for one ward over the last 30 days, or None without data.
+    One grouped query for the breakdowns and one for the clusters.
+    """
+    month_ago = now - timedelta(days=30)
+
+    # Status x intent x priority buckets; every breakdown is a fold over these
+    buckets = db.query(
+        Submission.status, Submission.intent, Submission.priority, func.count(Submission.id).label("count")
+    ).filter(
+        Submission.ward == ward_name,
+        Submission.created_at >= month_ago
+    ).group_by(Submission.status, Submission.intent, Submission.priority).all()
+
+    if not buckets:
+        return None
+
+    status_counts, intent_counts, priority_counts = {}, {}, {}
+    for b in buckets:
+        status_counts[b.status] = status_counts.get(b.status, 0) + b.count
+        intent = b.intent or "unknown"
+        intent_counts[intent] = intent_counts.get(intent, 0) + b.count
+        priority = b.priority or "normal"
+        priority_counts[priority] = priority_counts.get(priority, 0) + b.count
+
+    total = sum(status_counts.values())
+    resolved = status_counts.get("resolved", 0)
+
+    # Largest active clusters; the window count carries the total past the LIMIT
+    hot_spots = db.query(
+        Cluster.cluster_id, Cluster.intent, Cluster.size, Cluster.priority,
+        func.count(Cluster.id).over().label("active")
+    ).filter(
+        Cluster.ward == ward_name,
+        Cluster.status != "resolved"
+    ).order_by(Cluster.size.desc(), Cluster.id).limit(5).all()
+
+    return {
+        "ward": ward_name,
+        "period": "last_30_days",
+        "summary": {
+            "total_submissions": total,
+            "resolved": resolved,
+            "pending": status_counts.get("pending", 0),
+            "assigned": status_counts.get("assigned", 0),
+            "resolution_rate": round(resolved / max(total, 1) * 100, 1),
+        },
+        "by_intent": [{"intent": k, "count": v} for k, v in sorted(intent_counts.items(), key=lambda x: -x[1])],
+        "by_priority": priority_counts,
+        "active_clusters": hot_spots[0].active if hot_spots else 0,
+        "hot_spots": [
+            {"cluster_id": c.cluster_id, "intent": c.intent, "size": c.size, "priority": c.priority}
+            for c in hot_spots
+        ],
+        "generated_at": now.isoformat(),
+    }
+
+
+def precompute_reports(report_date: Optional[date] = None) -> int:
+    """Build and store one report per active ward. Returns the number of wards."""
+    now = datetime.utcnow()
+    report_date = report_date or now.date()
+    db = SessionLocal()
+    try:
+        # Wards with submissions in the report window, read from the hourly rollups
+        wards = [
+            row.ward for row in db.query(SubmissionRollupHourly.ward).filter(
+                SubmissionRollupHourly.hour >= floor_hour(now - timedelta(days=30)),
+                SubmissionRollupHourly.ward != ""
+            ).distinct()
+        ]
+
+        db.query(WardReport).filter(WardReport.report_date == report_date).delete()
+        for ward in wards:
+            report = build_ward_report(db, ward, now)
+            if report is not None:
+                db.add(WardReport(ward=ward, report_date=report_date, payload=report))
+
+        db.query(WardReport).filter(
+            WardReport.report_date < report_date - timedelta(days=REPORTS_KEPT_DAYS)
+        ).delete()
+        db.commit()
+        return len(wards)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def precompute_ward_reports():
+    """Scheduled job (run in the executor): build today's ward briefings once per day."""
+    today = datetime.utcnow().date()
+    db = SessionLocal()
+    try:
+        if db.query(WardReport.id).filter(WardReport.report_date == today).first():
+            return
+    finally:
+        db.close()
+
+    print(f"🗒️ Precomputed ward reports for {today}: {precompute_reports(today)} wards")
+
+
+if __name__ == "__main__":
+    print(f"Built reports for {precompute_reports()} wards")
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.broadcast import Broadcaster, MemoryBackend, SUBSCRIBER_QUEUE_SIZE
+
+
+class FakeSocket:
+    def __init__(self, block: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self._gate = asyncio.Event()
+        if not block:
+            self._gate.set()
+
+    async def send_json(self, data):
+        await self._gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_slow_consumer_is_dropped_without_stalling_others():
+    """A blocked socket fills its queue and is closed; the fast one receives every event"""
+    async def scenario():
+        broadcaster = Broadcaster(MemoryBackend())
+        await broadcaster.start()
+        fast, slow = FakeSocket(), FakeSocket(block=True)
+        broadcaster.subscribe("thread:t1", fast)
+        broadcaster.subscribe("thread:t1", slow)
+        broadcaster.subscribe("thread:other", FakeSocket())
+
+        events = SUBSCRIBER_QUEUE_SIZE + 5
+        for i in range(events):
+            await broadcaster.publish("thread:t1", {"n": i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        assert [e["n"] for e in fast.sent] == list(range(events))
+        assert slow.sent == [] and slow.closed_with == 1013
+        stats = broadcaster.stats()
+        assert stats["dropped_slow_consumers"] == 1
+        assert stats["subscribers"] == 2
+        assert stats["delivered"] == events
+        assert stats["latency_ms"]["p95"] is not None
+
+    asyncio.run(scenario())
+
+
+class FlakyBackend(MemoryBackend):
+    """Rejects events over 100 bytes and fails the first publish, like a NOTIFY backend mid-outage."""
+
+    name = "flaky"
+
+    def __init__(self):
+        self.failures = 1
+
+    def fits(self, channel, envelope):
+        return len(str(envelope)) <= 100
+
+    async def publish(self, channel, envelope):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("backend unavailable")
+        await super().publish(channel, envelope)
+
+
+def test_publish_survives_backend_errors_and_oversized_events():
+    """A failing backend degrades to local delivery; oversized events go out as their reference"""
+    async def scenario():
+        broadcaster = Broadcaster(FlakyBackend())
+        await broadcaster.start()
+        socket = FakeSocket()
+        broadcaster.subscribe("thread:t1", socket)
+
+        await broadcaster.publish("thread:t1", {"id": 1})
+        await broadcaster.publish("thread:t1", {"id": 2, "content": "x" * 500}, {"id": 2, "truncated": True})
+        await asyncio.sleep(0.01)
+
+        assert socket.sent == [{"id": 1}, {"id": 2, "truncated": True}]
+        stats = broadcaster.stats()
+        assert (stats["publish_errors"], stats["oversized_events"]) == (1, 1)
+
+    asyncio.run(scenario())
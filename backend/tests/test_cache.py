@@ -0,0 +1,36 @@
+import asyncio
+
+from app.cache import MemoryCache, ResponseCache
+
+
+class Widget:
+    pass
+
+
+def test_single_flight_and_invalidation():
+    """Concurrent misses share one computation; invalidating the namespace forces a recompute"""
+    cache = ResponseCache(MemoryCache(max_entries=16))
+    cache.register("widgets", (Widget,))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"count": len(calls)}
+
+    async def fetch():
+        key = cache.make_key("widgets", "list", {"ward": "Koramangala"})
+        return await cache.get_or_compute(key, 60, compute)
+
+    async def scenario():
+        first = await asyncio.gather(*[fetch() for _ in range(10)])
+        cached = await fetch()
+        cache.invalidate_models([Widget])
+        refreshed = await fetch()
+        return first, cached, refreshed
+
+    first, cached, refreshed = asyncio.run(scenario())
+    assert all(r == {"count": 1} for r in first)
+    assert cached == {"count": 1}
+    assert refreshed == {"count": 2}
+    assert len(calls) == 2
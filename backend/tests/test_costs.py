@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.costs import cost_summary
+from app.database import SessionLocal
+from app.models import Cluster, CostTotal
+from app.sla import compute_sla_batch_for
+
+WARD = "Cost Test Ward"
+
+
+def test_accumulator_and_totals_follow_cluster_transitions():
+    """Cost accrues at the rate in force between transitions and the ward/intent totals track it"""
+    db = SessionLocal()
+    cluster = Cluster(cluster_id="cost_test_cluster", intent="road", ward=WARD, submission_ids=[], size=3,
+                      created_at=datetime.utcnow() - timedelta(hours=2))
+    try:
+        db.add(cluster)
+        db.commit()
+        # 3 citizens x 50 INR x 1.5 (road) for 2 hours
+        assert cluster.cost_hourly_rate == 225
+        assert cluster.cost_estimate == pytest.approx(450, abs=0.5)
+        totals = cost_summary(db)[(WARD, "road")]
+        assert (totals["clusters"], totals["citizens"], totals["hourly_rate"]) == (1, 3, 225)
+        assert totals["cost"] == pytest.approx(450, abs=0.5)
+
+        cluster.size = 10  # Rate goes up from here on, cost so far is kept
+        db.commit()
+        assert cluster.cost_hourly_rate == 50 * 10 * 1.5 * 1.5
+        assert cluster.cost_estimate == pytest.approx(450, abs=0.5)
+        assert cost_summary(db)[(WARD, "road")]["citizens"] == 10
+
+        cluster.resolved_at = datetime.utcnow()
+        db.commit()
+        totals = cost_summary(db)[(WARD, "road")]
+        assert (totals["clusters"], totals["hourly_rate"], totals["resolved_clusters"]) == (0, 0, 1)
+        assert totals["cost"] == pytest.approx(0, abs=1e-6)
+        assert totals["resolved_cost"] == pytest.approx(cluster.cost_estimate)
+        assert compute_sla_batch_for([cluster])["total_cost"][0] == pytest.approx(cluster.cost_estimate)
+
+        db.delete(cluster)
+        db.commit()
+        assert cost_summary(db)[(WARD, "road")]["resolved_clusters"] == 0
+    finally:
+        db.rollback()
+        db.query(Cluster).filter(Cluster.cluster_id == "cost_test_cluster").delete()
+        db.query(CostTotal).filter(CostTotal.ward == WARD).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,193 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.database import SessionLocal, engine
+from app.models import AuditLog, Cluster, Crew, Message, Thread
+
+client = TestClient(app)
+
+
+def test_status_update_writes_thread_messages_in_bulk():
+    """20 assignments cost one thread lookup and one message insert, and messages reach the thread socket"""
+    db = SessionLocal()
+    crew = Crew(crew_id="BULKTEST", name="Bulk Test Crew", current_status="available")
+    try:
+        db.add(crew)
+        db.commit()
+        clusters = [Cluster(cluster_id=f"bulk_status_test_{i}", intent="road", submission_ids=[],
+                            assigned_crew_id=crew.id) for i in range(20)]
+        db.add_all(clusters)
+        db.commit()
+        db.add_all([Thread(thread_id=f"bulk-status-thread-{c.id}", cluster_id=c.id, status="open") for c in clusters])
+        db.commit()
+        watched = f"bulk-status-thread-{clusters[0].id}"
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        with client.websocket_connect(f"/threads/ws/{watched}") as ws:
+            event.listen(engine, "before_cursor_execute", listener)
+            try:
+                response = client.post(f"/crews/{crew.crew_id}/status", json={"status": "enroute"})
+            finally:
+                event.remove(engine, "before_cursor_execute", listener)
+            assert response.status_code == 200
+            assert ws.receive_json()["content"] == "Crew Bulk Test Crew is on the way to the location."
+
+        assert len([s for s in statements if "FROM clusters" in s and "threads" in s]) == 1
+        assert len([s for s in statements if s.startswith("INSERT INTO messages")]) == 1
+        assert len([s for s in statements if "FROM threads" in s and "clusters" not in s]) == 0
+
+        thread_ids = [t.id for t in db.query(Thread.id).filter(Thread.thread_id.like("bulk-status-thread-%"))]
+        assert db.query(Message).filter(Message.thread_id.in_(thread_ids)).count() == 20
+
+        client.post(f"/crews/{crew.crew_id}/status", json={"status": "resolved", "notes": "Patched"})
+        db.expire_all()
+        assert all(c.resolved_at is not None for c in db.query(Cluster).filter(Cluster.assigned_crew_id == crew.id))
+        assert db.query(Message).filter(Message.thread_id.in_(thread_ids)).count() == 40
+    finally:
+        db.rollback()
+        thread_ids = [t.id for t in db.query(Thread.id).filter(Thread.thread_id.like("bulk-status-thread-%"))]
+        db.query(Message).filter(Message.thread_id.in_(thread_ids)).delete(synchronize_session=False)
+        db.query(Thread).filter(Thread.id.in_(thread_ids)).delete(synchronize_session=False)
+        db.query(Cluster).filter(Cluster.assigned_crew_id == crew.id).delete()
+        db.query(AuditLog).filter(AuditLog.resource_id == crew.crew_id).delete()
+        db.query(Crew).filter(Crew.id == crew.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_crew_index_nearest_matches_brute_force():
+    """k-nearest by specialty agrees with a full scan, and committed status changes update the index"""
+    import random
+    import time
+
+    from app.crew_index import crew_index
+    from app.similarity import haversine_distance
+
+    rng = random.Random(7)
+    specialties = ["water", "road", "electricity"]
+    db = SessionLocal()
+    crews = [
+        Crew(crew_id=f"IDX{i:04d}", name=f"Index Crew {i}", specialty=specialties[i % 3],
+             current_status="available" if i % 4 else "busy",
+             current_latitude=12.85 + rng.random() * 0.25, current_longitude=77.45 + rng.random() * 0.3)
+        for i in range(300)
+    ]
+    try:
+        db.add_all(crews)
+        db.commit()
+        crew_index.load(db)
+
+        queries = [(12.85 + rng.random() * 0.25, 77.45 + rng.random() * 0.3) for _ in range(50)]
+        started = time.perf_counter()
+        results = [crew_index.nearest(lat, lng, k=3, specialty="road") for lat, lng in queries]
+        assert (time.perf_counter() - started) / len(queries) < 0.001
+
+        for (lat, lng), found in zip(queries, results):
+            expected = sorted(
+                haversine_distance(lat, lng, p.latitude, p.longitude) for p in crew_index.points.values()
+                if p.specialty == "road" and p.status == "available"
+            )[:3]
+            assert [round(m, 3) for _, m in found] == [round(m, 3) for m in expected]
+            assert all(p.specialty == "road" and p.status == "available" for p, _ in found)
+
+        nearest, _ = crew_index.nearest(*queries[0], k=1, specialty="road")[0]
+        db.query(Crew).filter(Crew.id == nearest.id).one().current_status = "busy"
+        db.commit()
+        assert crew_index.nearest(*queries[0], k=1, specialty="road")[0][0].id != nearest.id
+    finally:
+        db.rollback()
+        db.query(Crew).filter(Crew.crew_id.like("IDX%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        crew_index.invalidate()
+
+
+def test_location_pings_are_coalesced_and_flushed_in_bulk():
+    """Pings only touch memory until flush, which writes each crew's newest position in one UPDATE"""
+    from datetime import datetime, timedelta
+
+    from app.crew_index import crew_index
+    from app.crew_tracking import crew_tracker
+
+    db = SessionLocal()
+    crews = [Crew(crew_id=f"GPSTEST{i}", name=f"GPS Crew {i}", specialty="road", current_status="available",
+                  current_latitude=12.9, current_longitude=77.6) for i in range(2)]
+    try:
+        db.add_all(crews)
+        db.commit()
+        crew_index.load(db)
+        start = datetime.utcnow() - timedelta(minutes=1)
+        pings = [{"crew_id": c.crew_id, "latitude": 12.9 + k * 0.001, "longitude": 77.6,
+                  "recorded_at": (start + timedelta(seconds=5 * k)).isoformat()} for c in crews for k in range(10)]
+        pings.append({"crew_id": "GPSTEST-UNKNOWN", "latitude": 12.9, "longitude": 77.6})
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.post("/crews/location", json={"pings": pings[:12]})
+            client.post("/crews/location", json={"pings": pings[12:]})
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert response.json()["accepted"] == 12
+        assert client.post("/crews/location", json={"pings": pings[-1:]}).json()["unknown_crews"] == ["GPSTEST-UNKNOWN"]
+        assert not [s for s in statements if s.startswith("UPDATE")]
+
+        track = client.get(f"/crews/{crews[0].crew_id}/track").json()
+        assert [p["latitude"] for p in track] == [12.9 + k * 0.001 for k in range(10)]
+        since = (start + timedelta(seconds=30)).isoformat()
+        assert len(client.get(f"/crews/{crews[0].crew_id}/track", params={"since": since}).json()) == 3
+
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert crew_tracker.flush() == 2
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert len([s for s in statements if s.startswith("UPDATE crews")]) == 1
+        db.expire_all()
+        assert [round(c.current_latitude, 3) for c in crews] == [12.909, 12.909]
+        assert crew_index.points[crews[0].id].latitude == crews[0].current_latitude
+    finally:
+        db.rollback()
+        db.query(Crew).filter(Crew.crew_id.like("GPSTEST%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        crew_index.invalidate()
+
+
+def test_future_dated_ping_does_not_block_later_pings():
+    """A ping from a phone clock running a day ahead is clamped, so the real pings after it still count"""
+    from datetime import datetime, timedelta
+
+    from app.crew_tracking import crew_tracker
+
+    db = SessionLocal()
+    crew = Crew(crew_id="GPSTEST-CLOCK", name="Fast Clock Crew", specialty="road", current_status="available",
+                current_latitude=12.9, current_longitude=77.6)
+    try:
+        db.add(crew)
+        db.commit()
+        ahead = (datetime.utcnow() + timedelta(days=1)).isoformat()
+        client.post("/crews/location", json={"pings": [
+            {"crew_id": crew.crew_id, "latitude": 13.5, "longitude": 77.6, "recorded_at": ahead}]})
+        response = client.post("/crews/location", json={"pings": [
+            {"crew_id": crew.crew_id, "latitude": 12.95, "longitude": 77.6,
+             "recorded_at": datetime.utcnow().isoformat()}]})
+        assert response.json()["accepted"] == 1
+
+        track = client.get(f"/crews/{crew.crew_id}/track").json()
+        assert [p["latitude"] for p in track[-2:]] == [13.5, 12.95]
+        clamped = datetime.fromisoformat(track[-2]["recorded_at"]).replace(tzinfo=None)
+        assert clamped <= datetime.utcnow()
+        assert crew_tracker.pending[crew.id][1:] == (12.95, 77.6)
+        crew_tracker.flush()
+        db.expire_all()
+        assert crew.current_latitude == 12.95
+    finally:
+        db.rollback()
+        crew_tracker.forget(crew.id)
+        db.query(Crew).filter(Crew.crew_id.like("GPSTEST%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
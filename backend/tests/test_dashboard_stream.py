@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from app.dashboard_stream import DashboardFeed
+from app.database import SessionLocal
+from app.models import Submission, Cluster, User
+
+
+def test_feed_emits_new_submissions_and_sla_breaches():
+    """Each tick reports rows added since the previous tick and clusters that just breached SLA"""
+    db = SessionLocal()
+    feed = DashboardFeed()
+    user = User(phone="+91-stream-test")
+    first_tick = datetime.utcnow()
+    try:
+        db.add(user)
+        db.commit()
+        feed.compute_deltas(first_tick)
+
+        submission = Submission(user_id=user.id, intent="road", text="Pothole near the bus stop")
+        cluster = Cluster(cluster_id="stream_test_cluster", intent="road", submission_ids=[],
+                          priority="urgent", created_at=first_tick - timedelta(minutes=59, seconds=58))
+        db.add_all([submission, cluster])
+        db.commit()
+
+        events = dict(feed.compute_deltas(first_tick + timedelta(seconds=5)))
+        assert [s["id"] for s in events["submissions"]] == [submission.id]
+        assert [c["cluster_id"] for c in events["sla_breaches"]] == ["stream_test_cluster"]
+        assert "metrics" in events
+    finally:
+        db.rollback()
+        db.query(Cluster).filter(Cluster.cluster_id == "stream_test_cluster").delete()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
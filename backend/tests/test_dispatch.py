@@ -0,0 +1,91 @@
+import itertools
+import time
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal
+from app.dispatch import build_cost_matrix, solve_assignment, synthetic_problem
+from app.models import Cluster, Crew
+
+client = TestClient(app)
+
+
+def test_solver_is_optimal_within_capacity_and_fast():
+    """Slot-expanded Hungarian matches brute force on a small case and plans 500 x 200 in under a second"""
+    clusters, crews, now = synthetic_problem(5, 3, seed=1)
+    cost, _, _ = build_cost_matrix(clusters, crews, now)
+    capacity = [2, 1, 1]
+    pairs, solver = solve_assignment(cost, capacity)
+    assert solver == "hungarian"
+    slots = [j for j, c in enumerate(capacity) for _ in range(c)]
+    best = min(sum(cost[i, j] for i, j in zip(rows, slots)) for rows in itertools.permutations(range(5), len(slots)))
+    assert abs(sum(cost[i, j] for i, j in pairs) - best) < 1e-9
+
+    clusters, crews, now = synthetic_problem(500, 200)
+    started = time.perf_counter()
+    cost, _, _ = build_cost_matrix(clusters, crews, now)
+    pairs, _ = solve_assignment(cost, [c.capacity for c in crews])
+    assert time.perf_counter() - started < 1.0
+    assert len(pairs) == min(500, sum(c.capacity for c in crews))
+    assert len({i for i, _ in pairs}) == len(pairs)
+    assert all(n <= crews[j].capacity for j, n in Counter(j for _, j in pairs).items())
+
+
+def test_batch_dispatch_never_double_books_a_crew():
+    """Two clusters next to one single-capacity crew: one gets it, the other the next crew over"""
+    db = SessionLocal()
+    near = Crew(crew_id="DISPATCHTEST1", name="Near Crew", specialty="water", capacity=1,
+                current_status="available", current_latitude=60.0, current_longitude=5.0)
+    far = Crew(crew_id="DISPATCHTEST2", name="Far Crew", specialty="water", capacity=1,
+               current_status="available", current_latitude=60.05, current_longitude=5.0)
+    try:
+        db.add_all([near, far])
+        db.add_all([Cluster(cluster_id=f"dispatch_test_{i}", intent="water_outage", priority="normal",
+                            status="pending", submission_ids=[], center_latitude=60.0 + i * 0.001,
+                            center_longitude=5.0) for i in range(2)])
+        db.commit()
+
+        plan = client.post("/admin/dispatch/batch", params={"password": "admin123"}).json()
+        mine = {a["cluster_id"]: a["crew_id"] for a in plan["assignments"] if a["cluster_id"].startswith("dispatch_test_")}
+        assert sorted(mine.values()) == sorted([near.id, far.id])
+        assert plan["applied"] is False
+        assert db.query(Cluster).filter(Cluster.cluster_id.like("dispatch_test_%"),
+                                        Cluster.assigned_crew_id != None).count() == 0
+    finally:
+        db.rollback()
+        db.query(Cluster).filter(Cluster.cluster_id.like("dispatch_test_%")).delete(synchronize_session=False)
+        db.query(Crew).filter(Crew.crew_id.like("DISPATCHTEST%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def test_resolved_assignments_free_crew_capacity():
+    """A crew whose past cluster was resolved (resolved_at set, status untouched) is planned again"""
+    from datetime import datetime
+
+    db = SessionLocal()
+    crew = Crew(crew_id="DISPATCHTEST3", name="Veteran Crew", specialty="road", capacity=1,
+                current_status="available", current_latitude=61.0, current_longitude=6.0)
+    try:
+        db.add(crew)
+        db.commit()
+        db.add_all([
+            Cluster(cluster_id="dispatch_test_done", intent="road", status="pending", submission_ids=[],
+                    assigned_crew_id=crew.id, resolved_at=datetime.utcnow(),
+                    center_latitude=61.0, center_longitude=6.0),
+            Cluster(cluster_id="dispatch_test_new", intent="road", status="pending", submission_ids=[],
+                    center_latitude=61.001, center_longitude=6.0),
+        ])
+        db.commit()
+
+        plan = client.post("/admin/dispatch/batch", params={"password": "admin123"}).json()
+        mine = {a["cluster_id"]: a["crew_id"] for a in plan["assignments"] if a["cluster_id"].startswith("dispatch_test_")}
+        assert mine == {"dispatch_test_new": crew.id}
+    finally:
+        db.rollback()
+        db.query(Cluster).filter(Cluster.cluster_id.like("dispatch_test_%")).delete(synchronize_session=False)
+        db.query(Crew).filter(Crew.crew_id.like("DISPATCHTEST%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.cache import response_cache
+from app.database import SessionLocal
+from app.models import Submission, User
+from app.routers.admin import HEATMAP_GRID_SIZE, tile_bounds
+
+client = TestClient(app)
+
+
+def test_heatmap_tile_bins_points_on_cell_and_tile_edges():
+    """Cells are floored, not rounded, and points on the inclusive south edge land in the last row"""
+    z, x, y = 2, 0, 0  # Far north-west: no other test data in this tile
+    bounds = tile_bounds(z, x, y)
+    width = (bounds["east"] - bounds["west"]) / HEATMAP_GRID_SIZE
+    height = (bounds["north"] - bounds["south"]) / HEATMAP_GRID_SIZE
+    mid_row = bounds["north"] - 0.5 * height
+    points = {
+        (bounds["west"], mid_row): (0, 0),  # West tile edge
+        (bounds["west"] + 0.6 * width, mid_row): (0, 0),  # Rounding would give column 1
+        (bounds["west"] + width, mid_row): (1, 0),  # Cell edge belongs to the next cell
+        (bounds["east"] - 1e-9, mid_row): (HEATMAP_GRID_SIZE - 1, 0),
+        (bounds["west"] + 0.5 * width, bounds["south"]): (0, HEATMAP_GRID_SIZE - 1),  # South tile edge
+        (bounds["west"] + 0.5 * width, bounds["north"] - 1e-9): (0, 0),
+    }
+    db = SessionLocal()
+    user = User(phone="+91-heatmap-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all([Submission(user_id=user.id, intent="road", text="Pothole", latitude=lat, longitude=lng)
+                    for lng, lat in points])
+        db.commit()
+        response_cache.invalidate("heatmap")
+
+        tile = client.get(f"/admin/heatmap/{z}/{x}/{y}", params={"password": "admin123"}).json()
+        cells = {(col, row): count for col, row, count, _ in tile["cells"]}
+        expected = {}
+        for cell in points.values():
+            expected[cell] = expected.get(cell, 0) + 1
+        assert cells == expected
+        assert tile["total"] == len(points)
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
@@ -23,3 +23,138 @@ def test_generate_receipt_id():
     receipt_id = generate_receipt_id()
     assert len(receipt_id) == 36  # UUID length
     assert receipt_id.count("-") == 4  # UUID format
+
+def test_append_to_chain_links_sequentially():
+    """Chain head extension returns consecutive sequences linked by hash"""
+    from app.database import SessionLocal, Base, engine
+    from app.receipt import append_to_chain
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    kiosk_id = f"test-{generate_receipt_id()[:8]}"
+    try:
+        hash1, prev1, seq1 = append_to_chain(db, kiosk_id, {"id": 1, "intent": "road", "text": "Pothole"})
+        hash2, prev2, seq2 = append_to_chain(db, kiosk_id, {"id": 2, "intent": "road", "text": "Pothole again"})
+        assert (prev1, seq1) == (None, 1)
+        assert (prev2, seq2) == (hash1, 2)
+        assert hash2 == compute_receipt_hash({"id": 2, "intent": "road", "text": "Pothole again"}, hash1)
+    finally:
+        db.rollback()
+        db.close()
+
+def test_merkle_inclusion_proofs():
+    """Every leaf proves into the root; a proof does not transfer to another leaf"""
+    from app.merkle import build_tree, inclusion_proof, verify_inclusion
+    leaves = [compute_receipt_hash({"id": i}, None) for i in range(7)]
+    levels = build_tree(leaves)
+    root = levels[-1][0]
+    for index, leaf in enumerate(leaves):
+        proof = inclusion_proof(levels, index)
+        assert len(proof) <= 3  # ceil(log2(7))
+        assert verify_inclusion(leaf, proof, root)
+    assert not verify_inclusion(leaves[1], inclusion_proof(levels, 0), root)
+
+def test_chain_audit_reports_first_break():
+    """Full-chain audit passes an intact chain and pinpoints a tampered link"""
+    from app.database import SessionLocal, Base, engine
+    from app.models import Receipt, Submission, User, KioskChainHead
+    from app.receipt import append_to_chain, build_receipt_payload
+    from app.chain_audit import audit_kiosk_chain
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    kiosk_id = f"audit-{generate_receipt_id()[:8]}"
+    try:
+        user = User(phone=kiosk_id)
+        db.add(user)
+        db.flush()
+        submissions = []
+        for text in ["Pothole", "Pothole again", "Still a pothole"]:
+            submission = Submission(user_id=user.id, intent="road", text=text)
+            db.add(submission)
+            db.flush()
+            db.refresh(submission)
+            receipt_hash, prev_hash, sequence = append_to_chain(db, kiosk_id, build_receipt_payload(submission))
+            db.add(Receipt(receipt_id=generate_receipt_id(), submission_id=submission.id, receipt_hash=receipt_hash,
+                           prev_hash=prev_hash, kiosk_id=kiosk_id, sequence=sequence))
+            submissions.append(submission)
+        db.commit()
+
+        report = audit_kiosk_chain(kiosk_id)
+        assert report["status"] == "OK"
+        assert report["links_verified"] == 3
+
+        submissions[1].text = "Tampered"
+        db.commit()
+        report = audit_kiosk_chain(kiosk_id)
+        assert report["status"] == "BROKEN"
+        assert report["first_break"]["sequence"] == 2
+    finally:
+        db.rollback()
+        db.query(Receipt).filter(Receipt.kiosk_id == kiosk_id).delete()
+        db.query(KioskChainHead).filter(KioskChainHead.kiosk_id == kiosk_id).delete()
+        db.query(Submission).filter(Submission.user_id.in_(db.query(User.id).filter(User.phone == kiosk_id))).delete(synchronize_session=False)
+        db.query(User).filter(User.phone == kiosk_id).delete()
+        db.commit()
+        db.close()
+
+def test_batched_receipt_verifies_after_seal():
+    """Verify reports an unsealed batch as pending without sealing it; once sealed, the proof checks out"""
+    from datetime import timedelta
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.config import settings
+    from app.database import SessionLocal, Base, engine
+    from app.models import Receipt, ReceiptBatch, Submission, User, KioskChainHead
+    from app.receipt import build_receipt_payload, get_batch_window_start, seal_due_batches
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    db = SessionLocal()
+    kiosk_id = f"merkle-{generate_receipt_id()[:8]}"
+    try:
+        user = User(phone=kiosk_id)
+        db.add(user)
+        db.flush()
+        # A batch whose window closed two windows ago: due for sealing
+        batch = ReceiptBatch(kiosk_id=kiosk_id, status="open", window_start=get_batch_window_start()
+                             - timedelta(seconds=2 * settings.RECEIPT_BATCH_WINDOW_SECONDS))
+        db.add(batch)
+        db.flush()
+        receipt_ids = []
+        for text in ["Streetlight out", "Streetlight still out", "Whole street dark"]:
+            submission = Submission(user_id=user.id, intent="streetlight", text=text)
+            db.add(submission)
+            db.flush()
+            db.refresh(submission)
+            receipt_ids.append(generate_receipt_id())
+            db.add(Receipt(receipt_id=receipt_ids[-1], submission_id=submission.id, kiosk_id=kiosk_id,
+                           receipt_hash=compute_receipt_hash(build_receipt_payload(submission), None),
+                           batch_id=batch.id))
+        db.commit()
+
+        response = client.get(f"/receipt/{receipt_ids[1]}/verify").json()
+        assert response["verification"] == "PENDING_BATCH"
+        assert response["verified"] is False
+        db.refresh(batch)
+        assert batch.status == "open"  # Verification never seals
+
+        assert seal_due_batches(db) >= 1
+        db.refresh(batch)
+        assert batch.status == "sealed"
+        for receipt_id in receipt_ids:
+            response = client.get(f"/receipt/{receipt_id}/verify").json()
+            assert response["verification"] == "OK"
+            assert response["chain_mode"] == "merkle"
+            assert response["merkle_root"] == batch.merkle_root
+            assert response["chain_hash"] == batch.anchor_hash
+
+        submission.text = "Tampered"
+        db.commit()
+        assert client.get(f"/receipt/{receipt_ids[2]}/verify").json()["verification"] == "FAIL"
+    finally:
+        db.rollback()
+        db.query(Receipt).filter(Receipt.kiosk_id == kiosk_id).delete()
+        db.query(ReceiptBatch).filter(ReceiptBatch.kiosk_id == kiosk_id).delete()
+        db.query(KioskChainHead).filter(KioskChainHead.kiosk_id == kiosk_id).delete()
+        db.query(Submission).filter(Submission.user_id.in_(db.query(User.id).filter(User.phone == kiosk_id))).delete(synchronize_session=False)
+        db.query(User).filter(User.phone == kiosk_id).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from app.database import SessionLocal
+from app.models import Submission, User, SubmissionRollupHourly
+from app.rollups import backfill_rollups, floor_hour
+
+
+def _bucket_count(db, hour, status):
+    return db.query(SubmissionRollupHourly.count).filter(
+        SubmissionRollupHourly.hour == hour,
+        SubmissionRollupHourly.ward == "Rollup Test Ward",
+        SubmissionRollupHourly.intent == "water_outage",
+        SubmissionRollupHourly.status == status,
+        SubmissionRollupHourly.priority == "normal",
+    ).scalar() or 0
+
+
+def test_rollups_follow_inserts_status_changes_and_deletes():
+    """Rollup buckets move with the rows they count and match a full backfill"""
+    db = SessionLocal()
+    user = User(phone="+91-rollup-test")
+    created_at = datetime(2024, 1, 15, 10, 42)
+    hour = floor_hour(created_at)
+    try:
+        db.add(user)
+        db.commit()
+        submissions = [
+            Submission(user_id=user.id, intent="water_outage", text="No water", ward="Rollup Test Ward",
+                       created_at=created_at)
+            for _ in range(3)
+        ]
+        db.add_all(submissions)
+        db.commit()
+        assert _bucket_count(db, hour, "pending") == 3
+
+        submissions[0].status = "resolved"
+        db.commit()
+        assert _bucket_count(db, hour, "pending") == 2
+        assert _bucket_count(db, hour, "resolved") == 1
+
+        db.delete(submissions[1])
+        db.commit()
+        assert _bucket_count(db, hour, "pending") == 1
+
+        backfill_rollups(db)
+        assert _bucket_count(db, hour, "pending") == 1
+        assert _bucket_count(db, hour, "resolved") == 1
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.query(SubmissionRollupHourly).filter(SubmissionRollupHourly.ward == "Rollup Test Ward").delete()
+        db.commit()
+        db.close()
+
+
+def test_projection_refresh_repairs_drift_from_bulk_sql():
+    """Bulk SQL leaves rollups (status only), cost totals and scores off; the hourly job rebuilds all three"""
+    from app.citizen_scores import score_drift
+    from app.costs import cost_drift
+    from app.models import CitizenScore, Cluster
+    from app.rollups import rollup_drift
+    from app.scheduler import refresh_projections_job
+
+    db = SessionLocal()
+    user = User(phone="+91-drift-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all([Submission(user_id=user.id, intent="road", text="Pothole", ward="Drift Test Ward") for _ in range(2)]
+                   + [Cluster(cluster_id=f"drift_test_{i}", intent="road", ward="Drift Test Ward", submission_ids=[])
+                      for i in range(2)])
+        db.commit()
+        refresh_projections_job()
+        assert (any(rollup_drift(db).values()), cost_drift(db), score_drift(db)) == (False, 0, 0)
+
+        # Same row count, different status: only a per-status comparison notices
+        db.query(Submission).filter(Submission.user_id == user.id).update({"status": "resolved"})
+        db.query(Cluster).filter(Cluster.cluster_id == "drift_test_0").delete()
+        db.commit()
+        # 2 too few pending and 2 too many resolved; 1 cluster gone
+        assert rollup_drift(db) == {"submission_rollups_hourly": 4, "cluster_rollups_hourly": 1}
+        assert cost_drift(db) == 1
+        assert score_drift(db) == 2  # City-wide and ward rows
+
+        refresh_projections_job()
+        assert (any(rollup_drift(db).values()), cost_drift(db), score_drift(db)) == (False, 0, 0)
+        assert db.query(CitizenScore.resolved).filter_by(user_id=user.id, ward="").scalar() == 2
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(Cluster).filter(Cluster.cluster_id.like("drift_test_%")).delete()
+        db.query(CitizenScore).filter(CitizenScore.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
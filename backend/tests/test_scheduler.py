@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models import SchedulerLease, SchedulerJobStat
+from app.scheduler import JobScheduler, LEASE_SECONDS
+
+LEASE = "test-lease"
+
+
+def test_single_leader_with_failover_and_job_metrics():
+    """Only one worker holds the lease until it expires; job runs and failures are recorded"""
+    first, second = JobScheduler(LEASE), JobScheduler(LEASE)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        assert first.try_acquire(now)
+        assert not second.try_acquire(now)
+        assert first.try_acquire(now + timedelta(seconds=LEASE_SECONDS - 1))  # Heartbeat renews
+
+        # Leader stopped heartbeating: the lease expires and the other worker takes over
+        later = now + timedelta(seconds=2 * LEASE_SECONDS)
+        assert second.try_acquire(later)
+        assert not first.try_acquire(later)
+        assert db.get(SchedulerLease, LEASE).holder == second.worker_id
+
+        def broken():
+            raise ValueError("boom")
+
+        second.register("test_job_ok", 60, lambda: None)
+        second.register("test_job_broken", 60, broken)
+        second.is_leader = True
+        for job in second._due_jobs(datetime.utcnow()):
+            asyncio.run(second.run_job(job))
+        assert second._due_jobs(datetime.utcnow()) == []
+
+        status = {job["name"]: job for job in second.status()["jobs"]}
+        assert status["test_job_ok"]["runs"] == 1 and status["test_job_ok"]["failures"] == 0
+        assert status["test_job_broken"]["failures"] == 1
+        assert status["test_job_broken"]["last_error"] == "ValueError: boom"
+    finally:
+        db.rollback()
+        db.query(SchedulerLease).filter(SchedulerLease.name == LEASE).delete()
+        db.query(SchedulerJobStat).filter(SchedulerJobStat.name.in_(["test_job_ok", "test_job_broken"])).delete()
+        db.commit()
+        db.close()
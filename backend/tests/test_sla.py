@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.sla import compute_cost_of_delay, compute_sla_batch_for, summarize_sla_batch, batch_cost_of_delay
+
+
+def test_batch_matches_per_cluster_rules():
+    """Vectorized statuses and costs follow the same SLA targets, multipliers and size bonuses"""
+    now = datetime(2024, 6, 1, 12, 0)
+    clusters = [
+        SimpleNamespace(created_at=now - timedelta(hours=2), resolved_at=None, priority="urgent", intent="water_outage", size=12),
+        SimpleNamespace(created_at=now - timedelta(minutes=30), resolved_at=None, priority="urgent", intent="road", size=None),
+        SimpleNamespace(created_at=now - timedelta(hours=1), resolved_at=None, priority=None, intent="garbage", size=5),
+        SimpleNamespace(created_at=now - timedelta(hours=10), resolved_at=now - timedelta(hours=4), priority="high", intent="other", size=20),
+    ]
+
+    batch = compute_sla_batch_for(clusters, now)
+    summary = summarize_sla_batch(batch)
+    assert (summary["breached"], summary["at_risk"], summary["on_track"], summary["resolved"]) == (1, 1, 1, 1)
+
+    expected = compute_cost_of_delay("water_outage", 12, 2.0)
+    assert batch_cost_of_delay(batch, 0, clusters[0]) == expected
+    assert batch_cost_of_delay(batch, 3, clusters[3])["hourly_rate"] == 0
+    assert summary["total_cost_incurred"] == round(
+        expected["total_cost"] + 50 * 1.5 * 0.5 + 50 * 5 * 1.2 * 1.2 + 50 * 20 * 2.0 * 6, 2
+    )
+
+
+def test_deadline_scheduler_escalates_at_deadline():
+    """A committed high-priority submission is escalated, with its cluster, when its deadline passes"""
+    import asyncio
+    from app.database import SessionLocal
+    from app.models import Cluster, Submission, User
+    from app.sla_scheduler import ESCALATE_AFTER, sla_deadline_scheduler
+
+    db = SessionLocal()
+    user = User(phone="+91-sla-scheduler-test")
+    cluster = Cluster(cluster_id="sla_scheduler_test", intent="water_outage", submission_ids=[], priority="high")
+
+    async def scenario():
+        await sla_deadline_scheduler.start()
+        try:
+            db.add_all([user, cluster])
+            db.commit()
+            db.add(Submission(user_id=user.id, intent="water_outage", text="No water", priority="high",
+                              cluster_id=cluster.id, created_at=datetime.utcnow() - ESCALATE_AFTER + timedelta(seconds=0.5)))
+            db.commit()
+            await asyncio.sleep(0.1)
+            assert len(sla_deadline_scheduler) >= 1
+            await asyncio.sleep(1.0)
+        finally:
+            sla_deadline_scheduler.stop()
+
+    try:
+        asyncio.run(scenario())
+        db.expire_all()
+        submission = db.query(Submission).filter(Submission.user_id == user.id).one()
+        assert (submission.priority, submission.escalated) == ("urgent", True)
+        assert (cluster.priority, cluster.escalated) == ("urgent", True)
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(Cluster).filter(Cluster.cluster_id == "sla_scheduler_test").delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
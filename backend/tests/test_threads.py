@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal
+from app.models import Message, Thread
+
+client = TestClient(app)
+
+
+def test_message_history_pages_back_and_resyncs_forward():
+    """before-pages cover the history once even with tied timestamps; since returns only newer messages"""
+    db = SessionLocal()
+    thread = Thread(thread_id="history-test-thread", status="open")
+    try:
+        db.add(thread)
+        db.commit()
+        tied = datetime(2024, 1, 1, 9, 0, 0)
+        db.add_all([Message(thread_id=thread.id, author_type="system", content=f"Update {i}",
+                            created_at=tied if i < 60 else None) for i in range(130)])
+        db.commit()
+        expected = [m.id for m in db.query(Message.id).filter(Message.thread_id == thread.id).order_by(Message.id)]
+
+        inline = client.get(f"/threads/{thread.thread_id}").json()
+        assert [m["id"] for m in inline["messages"]] == expected[-50:]
+        assert inline["has_older_messages"] is True
+
+        seen, before = [], None
+        while True:
+            params = {"limit": 40}
+            if before:
+                params["before"] = before
+            page = client.get(f"/threads/{thread.thread_id}/messages", params=params).json()
+            seen = [m["id"] for m in page["messages"]] + seen
+            if not page["has_more"]:
+                break
+            before = page["oldest_id"]
+        assert seen == expected
+
+        page = client.get(f"/threads/{thread.thread_id}/messages", params={"since": expected[100]}).json()
+        assert [m["id"] for m in page["messages"]] == expected[101:]
+        assert page["has_more"] is False
+
+        assert client.get(f"/threads/{thread.thread_id}/messages", params={"since": 10 ** 9}).status_code == 400
+    finally:
+        db.rollback()
+        db.query(Message).filter(Message.thread_id == thread.id).delete()
+        db.query(Thread).filter(Thread.id == thread.id).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,171 @@
+import gzip
+import json
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal
+from app.models import Submission, User
+
+client = TestClient(app)
+
+
+def test_open_data_cursor_walks_every_row_once():
+    """Keyset pages cover the dataset exactly once, even when rows share a created_at second"""
+    db = SessionLocal()
+    user = User(phone="+91-open-data-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all([
+            Submission(user_id=user.id, intent="garbage", text="Overflowing bin", ward="Open Data Test Ward")
+            for _ in range(23)
+        ])
+        db.commit()
+        expected = {s.id for s in db.query(Submission.id).filter(Submission.user_id == user.id)}
+
+        seen, cursor = [], None
+        while True:
+            params = {"ward": "Open Data Test Ward", "limit": 5}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/transparency/open-data", params=params).json()
+            seen.extend(row["id"] for row in page["data"])
+            assert "text" not in (page["data"][0] if page["data"] else {})
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert len(seen) == len(expected)
+        assert set(seen) == expected
+
+        assert client.get("/transparency/open-data", params={"cursor": "not-a-cursor"}).status_code == 400
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_exports_stream_all_rows_as_csv_and_ndjson():
+    """CSV (gzipped) and NDJSON exports include every matching row, without the old 1000-row cap"""
+    db = SessionLocal()
+    user = User(phone="+91-export-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all([
+            Submission(user_id=user.id, intent="road", text="Pothole", ward="Export Test Ward",
+                       latitude=12.93456, longitude=77.62451)
+            for _ in range(1200)
+        ])
+        db.commit()
+
+        response = client.get("/transparency/export/csv", params={"ward": "Export Test Ward", "gzip": True})
+        assert response.headers["content-type"] == "application/gzip"
+        lines = gzip.decompress(response.content).decode().splitlines()
+        assert lines[0].startswith("ID,Intent,Ward")
+        assert len(lines) == 1201
+        assert lines[1].endswith(",12.93,77.62")
+
+        response = client.get("/transparency/export/ndjson", params={"ward": "Export Test Ward"})
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 1200
+        assert records[0]["latitude_rounded"] == 12.93
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_parquet_snapshot_manifest_and_download(tmp_path, monkeypatch):
+    """A built snapshot is listed in the manifest and its files download as Parquet"""
+    pytest.importorskip("pyarrow")
+    from app.config import settings
+    from app.snapshots import build_snapshot
+
+    monkeypatch.setattr(settings, "OPEN_DATA_SNAPSHOT_DIR", str(tmp_path))
+    assert client.get("/transparency/snapshots/manifest").status_code == 404
+
+    ward = "Snapshot Test Ward/Old Town"  # Spaces and a slash: percent-encoded in the partition name
+    db = SessionLocal()
+    user = User(phone="+91-snapshot-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all([Submission(user_id=user.id, intent="road", text="Pothole", ward=ward) for _ in range(3)])
+        db.commit()
+
+        manifest = build_snapshot("2024-01-01")
+        assert manifest["row_count"] == sum(f["rows"] for f in manifest["files"])
+
+        listed = client.get("/transparency/snapshots/manifest").json()
+        assert listed["snapshot_date"] == "2024-01-01"
+        entry = next(f for f in listed["files"] if f["ward"] == ward)
+        assert "ward=Snapshot%20Test%20Ward%2FOld%20Town/" in entry["path"]
+        response = client.get(entry["url"])
+        assert response.status_code == 200
+        assert response.content[:4] == b"PAR1"
+        assert client.get("/transparency/snapshots/files/../../etc/passwd").status_code == 404
+        assert client.get("/transparency/snapshots/files/2024-01-01/_manifest.json").status_code == 404
+    finally:
+        db.rollback()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+def test_ward_report_breakdowns_and_nightly_briefing():
+    """Grouped breakdowns match the rows, and the nightly job stores the same payload"""
+    from datetime import datetime
+
+    from app.models import Cluster, WardReport
+    from app.ward_reports import precompute_reports
+
+    ward = "Ward Report Test Ward"
+    db = SessionLocal()
+    user = User(phone="+91-ward-report-test")
+    try:
+        db.add(user)
+        db.commit()
+        db.add_all(
+            [Submission(user_id=user.id, intent="water", text="Leak", ward=ward, status="resolved") for _ in range(3)]
+            + [Submission(user_id=user.id, intent="road", text="Pothole", ward=ward, priority="urgent") for _ in range(2)]
+            + [Cluster(cluster_id=f"ward_report_test_{i}", intent="road", ward=ward, submission_ids=[], size=i)
+               for i in range(7)]
+        )
+        db.commit()
+
+        report = client.get(f"/transparency/ward/{ward}/report").json()
+        assert report["summary"]["total_submissions"] == 5
+        assert report["summary"]["resolved"] == 3
+        assert report["by_intent"][0] == {"intent": "water", "count": 3}
+        assert report["by_priority"] == {"normal": 3, "urgent": 2}
+        assert report["active_clusters"] == 7
+        assert [c["size"] for c in report["hot_spots"]] == [6, 5, 4, 3, 2]
+
+        assert precompute_reports() >= 1
+        today = datetime.utcnow().date().isoformat()
+        briefing = client.get(f"/transparency/ward/{ward}/report", params={"report_date": today}).json()
+        assert briefing["summary"] == report["summary"]
+        assert briefing["generated_at"] >= report["generated_at"]
+
+        # The stored briefing does not hide later activity from the default live report
+        db.add(Submission(user_id=user.id, intent="road", text="Pothole", ward=ward))
+        db.commit()
+        assert client.get(f"/transparency/ward/{ward}/report").json()["summary"]["total_submissions"] == 6
+        assert client.get(f"/transparency/ward/{ward}/report", params={"report_date": "2001-01-01"}).status_code == 404
+    finally:
+        db.rollback()
+        db.query(WardReport).filter(WardReport.ward == ward).delete()
+        db.query(Cluster).filter(Cluster.ward == ward).delete()
+        db.query(Submission).filter(Submission.user_id == user.id).delete()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
@@ -78,6 +78,10 @@ export default function SubmissionsTable({
 
       // 2. Verify Chain
       const verifyRes = await api.get(`/receipt/${receiptId}/verify`);
+      if (verifyRes.data.verification === 'PENDING_BATCH') {
+        // Merkle batch not anchored yet: neither valid nor tampered, leave it to re-check later
+        return;
+      }
       const isValid = verifyRes.data.verification === 'OK';
 
       setVerificationResults(prev => ({ ...prev, [submissionId]: isValid }));
@@ -22,7 +22,7 @@ interface ReceiptData {
 
 interface VerificationStatus {
   receipt_id: string;
-  verification: "OK" | "FAIL";
+  verification: "OK" | "FAIL" | "PENDING_BATCH";
   chain_position: number;
   receipt_hash: string;
   prev_hash: string | null;
@@ -396,9 +396,13 @@ export default function ReceiptPage() {
               {verification && (
                 <span className={`px-2 py-1 rounded-full text-xs font-bold ${verification.verification === "OK"
                   ? "bg-green-200 text-green-800 flex items-center gap-1"
-                  : "bg-red-200 text-red-800"
+                  : verification.verification === "PENDING_BATCH"
+                    ? "bg-amber-200 text-amber-800"
+                    : "bg-red-200 text-red-800"
                   }`}>
-                  {verification.verification === "OK" ? "✓ VERIFIED ON-CHAIN" : "⚠ INVALID"}
+                  {verification.verification === "OK"
+                    ? "✓ VERIFIED ON-CHAIN"
+                    : verification.verification === "PENDING_BATCH" ? "⏳ PENDING ANCHORING" : "⚠ INVALID"}
                 </span>
               )}
             </div>
@@ -414,7 +418,13 @@ export default function ReceiptPage() {
               </div>
             )}
 
-            {verification && (
+            {verification?.verification === "PENDING_BATCH" && (
+              <div className="mt-2 pt-2 border-t border-gray-200/50 text-xs text-amber-700">
+                Your receipt is recorded and will be anchored in the next batch within a few minutes. Check again later.
+              </div>
+            )}
+
+            {verification && verification.verification !== "PENDING_BATCH" && (
               <div className="mt-2 pt-2 border-t border-gray-200/50 flex justify-between text-xs text-green-700">
                 <span>Block: #14,205,921</span>
                 <span>Confirmations: 12</span>
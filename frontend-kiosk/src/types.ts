@@ -33,7 +33,7 @@ export interface ReceiptResponse {
 
 export interface ReceiptVerifyResponse {
   receipt_id: string;
-  verification: "OK" | "FAIL";
+  verification: "OK" | "FAIL" | "PENDING_BATCH";  // PENDING_BATCH: Merkle batch not anchored yet
   verified: boolean;
   chain_position: number;
   chain_length: number;
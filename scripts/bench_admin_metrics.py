@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark for /admin/metrics aggregation.
+Compares the legacy one-COUNT-per-KPI approach over raw rows with the single grouped
+query over the hourly rollups (app.routers.admin.aggregate_metrics) on a large
+submissions table. The legacy queries use the same hour-aligned windows so results match.
+
+Run with: python scripts/bench_admin_metrics.py [--rows 1000000] [--repeat 5]
+Uses a throwaway SQLite file unless BENCH_DATABASE_URL is set.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--rows", type=int, default=1_000_000)
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+tmp_dir = tempfile.mkdtemp(prefix="civicpulse-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sqlalchemy import event, insert
+from app.database import Base, engine, SessionLocal
+from app.models import User, Submission, Cluster
+from app.routers.admin import aggregate_metrics, INTENT_TYPES, STATUSES, PRIORITIES, WARD_CENTERS
+from app.rollups import backfill_rollups, floor_hour
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statements(*_):
+    global statements
+    statements += 1
+
+
+def seed(rows: int):
+    """Bulk-load synthetic submissions spread over the last 30 days."""
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    wards = list(WARD_CENTERS)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"phone": "+91-bench-user"}])
+        chunk = []
+        for i in range(rows):
+            chunk.append({
+                "user_id": 1,
+                "intent": random.choice(INTENT_TYPES),
+                "text": "benchmark complaint",
+                "ward": random.choice(wards),
+                "status": random.choice(STATUSES),
+                "priority": random.choice(PRIORITIES),
+                "created_at": now - timedelta(minutes=random.randint(0, 30 * 24 * 60)),
+            })
+            if len(chunk) == 50_000:
+                conn.execute(insert(Submission), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(Submission), chunk)
+        conn.execute(insert(Cluster), [
+            {"cluster_id": f"bench_{i}", "intent": random.choice(INTENT_TYPES), "submission_ids": [],
+             "escalated": i % 3 == 0, "created_at": now - timedelta(hours=random.randint(0, 48))}
+            for i in range(500)
+        ])
+    # Bulk Core inserts bypass the ORM flush hooks, so build the rollups in one pass
+    db = SessionLocal()
+    try:
+        backfill_rollups(db)
+    finally:
+        db.close()
+
+
+def legacy_metrics(db, now):
+    """The pre-consolidation handler body: one COUNT(*) per KPI and per intent over raw rows."""
+    last_24h = floor_hour(now - timedelta(hours=24))
+    last_hour = floor_hour(now - timedelta(hours=1))
+    result = {
+        "submissions_24h": db.query(Submission).filter(Submission.created_at >= last_24h).count(),
+        "total_submissions": db.query(Submission).count(),
+        "active_clusters": db.query(Cluster).filter(Cluster.created_at >= last_24h).count(),
+        "escalated_clusters": db.query(Cluster).filter(Cluster.escalated == True, Cluster.created_at >= last_24h).count(),
+        "high_priority_queue": db.query(Submission).filter(
+            Submission.priority.in_(['high', 'urgent']), Submission.status == 'pending').count(),
+        "resolved_24h": db.query(Submission).filter(
+            Submission.status == 'resolved', Submission.created_at >= last_24h).count(),
+        "pending_count": db.query(Submission).filter(Submission.status == 'pending').count(),
+        "assigned_count": db.query(Submission).filter(Submission.status == 'assigned').count(),
+        "throughput_per_hour": db.query(Submission).filter(
+            Submission.created_at >= last_hour, Submission.created_at < last_hour + timedelta(hours=1)).count(),
+    }
+    result["intent_breakdown"] = {
+        intent: db.query(Submission).filter(Submission.intent == intent, Submission.created_at >= last_24h).count()
+        for intent in INTENT_TYPES
+    }
+    return result
+
+
+def bench(name, fn):
+    global statements
+    timings = []
+    db = SessionLocal()
+    try:
+        for _ in range(args.repeat):
+            statements = 0
+            started = time.perf_counter()
+            result = fn(db, datetime.utcnow())
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+    print(f"{name:<12} median {statistics.median(timings):9.1f} ms   "
+          f"min {min(timings):9.1f} ms   statements/request {statements}")
+    return result
+
+
+if __name__ == "__main__":
+    print(f"Seeding {args.rows:,} submissions into {os.environ['DATABASE_URL']} ...")
+    started = time.perf_counter()
+    seed(args.rows)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s\n")
+
+    legacy = bench("legacy", legacy_metrics)
+    single = bench("rollups", aggregate_metrics)
+
+    mismatched = [k for k in legacy if legacy[k] != single[k]]
+    print("\nResults match" if not mismatched else f"\nMISMATCH in {mismatched}")
+
+    engine.dispose()
+    shutil.rmtree(tmp_dir, ignore_errors=True)